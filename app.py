@@ -11,8 +11,12 @@ st.set_page_config(
 
 import pandas as pd
 import os
+import time
+import logging
 from dotenv import load_dotenv
 from database import db_manager, cliente_crud, dados_crud
+from cache import clinic_cache
+from sync_service import sync_clinic, start_scheduler
 from auth import AuthManager, show_auth_page, show_logout_button, show_admin_panel, show_admin_register_clinic_form, show_clinic_management_panel
 from dashboard import (
     create_executive_summary, create_kpi_cards, create_funnel_analysis, create_revenue_analysis,
@@ -34,6 +38,10 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'chave_padrao_para_desenvolvimento')
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///prestige_clinic.db')
 GOOGLE_SHEETS_CREDENTIALS = os.getenv('GOOGLE_SHEETS_CREDENTIALS', '{}')
 DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
+PERIODO_PADRAO_MESES = 12  # Meses exibidos por padrão quando há mais de um ano de dados
+SYNC_POLL_SECONDS = 1  # Intervalo de atualização da barra de progresso da sincronização
+
+logger = logging.getLogger(__name__)
 
 # Inicializa o banco de dados
 @st.cache_resource
@@ -45,6 +53,102 @@ def init_database():
 # Inicializa o banco na primeira execução
 init_database()
 
+@st.cache_resource
+def init_sync_scheduler():
+    """Inicia a atualização periódica de todas as clínicas (uma vez por processo)"""
+    if not GOOGLE_SHEETS_CREDENTIALS or GOOGLE_SHEETS_CREDENTIALS == '{}':
+        return None
+    return start_scheduler()
+
+init_sync_scheduler()
+
+ETAPAS_SINCRONIZACAO = {
+    'leads': "📊 Sincronizando dados de Leads",
+    'procedimentos': "🏥 Importando dados de Procedimentos"
+}
+
+def _mostrar_progresso(job, barra):
+    """Desenha o progresso atual da sincronização em barra (st ou um st.empty())"""
+    estado = job.snapshot()
+    texto = ETAPAS_SINCRONIZACAO.get(estado['etapa'], "🔄 Iniciando sincronização")
+    barra.progress(estado['progresso'], text=f"{texto}... ({estado['concluidas']}/{estado['total']})")
+
+if hasattr(st, 'fragment'):
+    @st.fragment(run_every=SYNC_POLL_SECONDS)
+    def _acompanhar_sincronizacao():
+        """Atualiza apenas a barra de progresso; ao terminar, renderiza a página com o resumo e os dados novos"""
+        job = st.session_state.get('sincronizacao')
+        if job is not None and job.em_execucao:
+            _mostrar_progresso(job, st)
+        else:
+            st.rerun()
+
+def show_sync_progress(cliente_id):
+    """Mostra o progresso da sincronização da clínica ou o resumo ao terminar"""
+    job = st.session_state.get('sincronizacao')
+    if job is None or not job.cobre(cliente_id):
+        return
+    
+    estado = job.snapshot()
+    if estado['status'] in ('pendente', 'executando'):
+        if hasattr(st, 'fragment'):
+            _acompanhar_sincronizacao()
+        else:
+            # Sem st.fragment, poll_sync_progress agenda a próxima renderização depois que a página for exibida
+            _mostrar_progresso(job, st)
+            st.session_state['acompanhar_sincronizacao'] = True
+        return
+    
+    # Sincronização terminou: mostra o resumo uma única vez
+    st.session_state['sincronizacao'] = None
+    
+    if estado['status'] == 'erro':
+        st.error(f"❌ Erro ao executar sincronização: {estado['erro']}")
+        return
+    
+    # A sincronização geral pode ter coberto o clique: mostra apenas a clínica visualizada
+    resultados_leads = [r for r in estado['resultados']['leads'] if r['cliente_id'] == cliente_id]
+    resultados_procedimentos = [r for r in estado['resultados']['procedimentos'] if r['cliente_id'] == cliente_id]
+    falhas = [r for r in resultados_leads if not r['sucesso']]
+    
+    if not resultados_leads:
+        st.warning("⚠️ Esta clínica não tem planilha vinculada (link_empresa)")
+        return
+    if falhas:
+        st.warning(f"⚠️ {len(resultados_leads) - len(falhas)}/{len(resultados_leads)} clínicas sincronizadas")
+    else:
+        st.success("✅ Todos os dados foram atualizados com sucesso!")
+    
+    for resultado in resultados_leads:
+        if not resultado['sucesso']:
+            st.error(f"❌ {resultado['clinica']}: {resultado['erro'] or 'falha na sincronização'}")
+        elif resultado['sem_alteracoes']:
+            st.info(f"📊 {resultado['clinica']}: planilha sem alterações")
+        else:
+            st.info(f"📊 {resultado['clinica']}: {resultado['meses_atualizados']} meses atualizados")
+    
+    for resultado in resultados_procedimentos:
+        if resultado['sucesso'] and resultado['sem_alteracoes']:
+            st.info(f"🏥 {resultado['clinica']}: aba Procedimentos sem alterações")
+        elif resultado['sucesso']:
+            st.info(f"🏥 {resultado['clinica']}: {resultado['procedimentos_importados']} procedimentos importados")
+
+def poll_sync_progress():
+    """
+    Recarrega a página após um intervalo enquanto a sincronização roda
+
+    Usado nas versões do Streamlit sem st.fragment: a página já foi renderizada com o
+    progresso atual; espera um único intervalo (sem prender a thread do script até o fim
+    da sincronização) e agenda a próxima renderização, que mostra o novo progresso ou o resumo.
+    """
+    if not st.session_state.pop('acompanhar_sincronizacao', False):
+        return
+    job = st.session_state.get('sincronizacao')
+    if job is None:
+        return
+    time.sleep(SYNC_POLL_SECONDS)
+    st.rerun()
+
 def main_dashboard():
     """Função principal do dashboard"""
     auth = AuthManager()
@@ -76,115 +180,57 @@ def main_dashboard():
         elif selected_cliente_id:
             cliente_id = selected_cliente_id
     
+    # Clínica e data da última atualização, carregadas uma vez e reaproveitadas por toda a página
+    # (ficam no cache da clínica até a próxima escrita)
+    contexto = clinic_cache.get_or_load(cliente_id, 'contexto', lambda: cliente_crud.get_contexto_clinica(cliente_id))
+    nome_da_clinica = contexto.nome_da_clinica if contexto else user['nome_da_clinica']
+    
     # Informações de última atualização
-    dados = dados_crud.get_dados_by_cliente(cliente_id)
-    if dados:
-        ultima_atualizacao = max([d.data_criacao for d in dados])
-        st.info(f"📅 Última atualização: {ultima_atualizacao.strftime('%d/%m/%Y às %H:%M')}")
+    if contexto and contexto.ultima_atualizacao:
+        st.info(f"📅 Última atualização: {contexto.ultima_atualizacao.strftime('%d/%m/%Y às %H:%M')}")
     
     # Botão de atualização de dados
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         if st.button("🔄 Atualizar Dados do Google Sheets", type="primary", use_container_width=True):
-            with st.spinner("🔄 Sincronizando dados do Google Sheets..."):
-                try:
-                    # Usa script de sincronização inteligente
-                    import subprocess
-                    import sys
-                    import os
-                    
-                    # 1. Sincroniza dados da aba "Controle de Leads"
-                    st.info("📊 Sincronizando dados de Leads...")
-                    result_leads = subprocess.run([sys.executable, "sync_sheets.py"], 
-                                                capture_output=True, text=True, cwd=".", timeout=60)
-                    
-                    # 2. Importa dados da aba "Procedimentos"
-                    st.info("🏥 Importando dados de Procedimentos...")
-                    result_procedimentos = subprocess.run([sys.executable, "import_procedimentos.py"], 
-                                                        capture_output=True, text=True, cwd=".", timeout=60)
-                    
-                    # Verifica resultados
-                    success_leads = result_leads.returncode == 0
-                    success_procedimentos = result_procedimentos.returncode == 0
-                    
-                    if success_leads and success_procedimentos:
-                        st.success("✅ Todos os dados foram atualizados com sucesso!")
-                        st.info("🔄 Recarregue a página para ver os dados atualizados")
-                        
-                        # Mostra resumo da sincronização de leads
-                        if "sincronizada!" in result_leads.stdout:
-                            lines = result_leads.stdout.split('\n')
-                            for line in lines:
-                                if "sincronizada!" in line:
-                                    st.info(f"📊 {line}")
-                                    break
-                        
-                        # Mostra resumo da importação de procedimentos
-                        if "Importados" in result_procedimentos.stdout:
-                            lines = result_procedimentos.stdout.split('\n')
-                            for line in lines:
-                                if "Importados" in line and "procedimentos" in line:
-                                    st.info(f"🏥 {line}")
-                    else:
-                        if not success_leads:
-                            st.error(f"❌ Erro na sincronização de Leads (código {result_leads.returncode})")
-                            if result_leads.stderr:
-                                st.error(f"Detalhes do erro: {result_leads.stderr}")
-                            st.code(result_leads.stdout)
-                        if not success_procedimentos:
-                            st.error(f"❌ Erro na importação de Procedimentos (código {result_procedimentos.returncode})")
-                            if result_procedimentos.stderr:
-                                st.error(f"Detalhes do erro: {result_procedimentos.stderr}")
-                            st.code(result_procedimentos.stdout)
-                except subprocess.TimeoutExpired:
-                    st.error("⏰ Timeout: A sincronização demorou muito para responder")
-                except Exception as e:
-                    st.error(f"❌ Erro ao executar sincronização: {e}")
-                    st.write(f"Tipo do erro: {type(e).__name__}")
-    
-    # Carrega dados do banco
-    df = load_data_from_database(cliente_id)
-    
-    if df.empty:
+            # Sincroniza em segundo plano apenas a clínica visualizada
+            st.session_state['sincronizacao'] = sync_clinic(cliente_id)
+        
+        show_sync_progress(cliente_id)
+    
+    # Meses com atividade, usados para montar os filtros sem carregar todos os dados
+    periodos = clinic_cache.get_or_load(cliente_id, 'periodos_ativos', lambda: dados_crud.get_periodos_ativos(cliente_id))
+    
+    if not periodos:
         st.warning("Nenhum dado encontrado para esta clínica. Entre em contato com o suporte.")
         return
     
-    # Carrega dados de procedimentos
-    df_procedimentos = load_procedimentos_from_database(cliente_id)
-    
-    # Título do dashboard
-    if auth.is_admin() and cliente_id != auth.get_cliente_id():
-        # Se for admin visualizando outra clínica
-        cliente_selecionado = cliente_crud.get_cliente_by_id(cliente_id)
-        if cliente_selecionado:
-            st.title(f"GrowView | Clínica {cliente_selecionado.nome_da_clinica}")
-        else:
-            st.title(f"GrowView | Clínica {user['nome_da_clinica']}")
-    else:
-        # Se for a própria clínica
-        st.title(f"GrowView | Clínica {user['nome_da_clinica']}")
-    
-    # Se for admin, mostra o nome da clínica selecionada
-    if auth.is_admin() and cliente_id != auth.get_cliente_id():
-        cliente_selecionado = cliente_crud.get_cliente_by_id(cliente_id)
-        if cliente_selecionado:
-            st.markdown(f"**Clínica:** {cliente_selecionado.nome_da_clinica}")
-        else:
-            st.markdown(f"**Clínica:** {user['nome_da_clinica']}")
-    else:
-        st.markdown(f"**Clínica:** {user['nome_da_clinica']}")
+    # Título do dashboard e nome da clínica (a própria ou a escolhida pelo admin)
+    st.title(f"GrowView | Clínica {nome_da_clinica}")
+    st.markdown(f"**Clínica:** {nome_da_clinica}")
     
     st.markdown("Análise completa do funil de vendas, performance por canal e métricas financeiras")
     
     # Filtros na barra lateral
     st.sidebar.title("Filtros de Período")
     
-    # Meses ativos disponíveis para seleção
-    meses_ativos = df[(df['Leads_Totais'] > 0) | (df['Faturamento'] > 0) | (df['Valor_Investido_Total'] > 0)]['Meses'].tolist()
+    # Com mais de um ano de dados, escolhe o intervalo (por padrão os últimos meses)
+    inicio, fim = periodos[0], periodos[-1]
+    if inicio[0] != fim[0]:
+        indice_inicio, indice_fim = st.sidebar.select_slider(
+            "Intervalo",
+            options=range(len(periodos)),
+            value=(max(0, len(periodos) - PERIODO_PADRAO_MESES), len(periodos) - 1),
+            format_func=lambda indice: f"{periodos[indice][2][:3]}/{periodos[indice][0]}"
+        )
+        inicio, fim = periodos[indice_inicio], periodos[indice_fim]
+    periodos = [periodo for periodo in periodos if inicio <= periodo <= fim]
     
-    if not meses_ativos:
-        st.error("Nenhum dado ativo encontrado para esta clínica.")
-        return
+    # Meses ativos disponíveis para seleção (com o ano quando o intervalo passa de um ano)
+    varios_anos = inicio[0] != fim[0]
+    def rotulo(meses, anos):
+        return meses + '/' + anos.astype(str) if varios_anos else meses
+    meses_ativos = [f"{mes}/{ano}" if varios_anos else mes for ano, _, mes in periodos]
     
     # Opção para selecionar um ou mais meses
     meses_selecionados = st.sidebar.multiselect(
@@ -193,54 +239,73 @@ def main_dashboard():
         default=meses_ativos  # Seleciona todos os meses ativos por padrão
     )
     
-    # Aplica o filtro
-    df_filtrado = df[df['Meses'].isin(meses_selecionados)]
+    # Os DataFrames filtrados ficam no cache da clínica por estado do filtro: trocar de seção
+    # reaproveita o mesmo objeto (e os KPIs já calculados sobre ele) até a próxima escrita
+    filtro = (inicio[:2], fim[:2], tuple(meses_selecionados))
+    
+    def filtrar(df, coluna_mes, coluna_ano):
+        return df[rotulo(df[coluna_mes], df[coluna_ano]).isin(meses_selecionados)] if not df.empty else df
     
-    # Filtra procedimentos pelos meses selecionados
-    df_procedimentos_filtrado = df_procedimentos[df_procedimentos['Mes_Referencia'].isin(meses_selecionados)] if not df_procedimentos.empty else df_procedimentos
+    # Carrega do banco apenas o intervalo escolhido
+    df_filtrado = clinic_cache.get_or_load(cliente_id, ('dados_filtrados', filtro), lambda: filtrar(
+        load_data_from_database(cliente_id, inicio=inicio[:2], fim=fim[:2]), 'Meses', 'Ano'
+    ))
     
     # Garante que o DataFrame não está vazio
     if df_filtrado.empty:
         st.error("Nenhum dado encontrado para os meses selecionados. Por favor, ajuste o filtro na barra lateral.")
         return
     
-    # Cria as seções do dashboard, passando o DataFrame filtrado
-    create_executive_summary(df_filtrado)
-    st.markdown("---")
-    create_kpi_cards(df_filtrado)
-    st.markdown("---")
-    
-    # Novas análises do formato atualizado
-    create_conversion_analysis(df_filtrado)
-    st.markdown("---")
-    create_budget_analysis(df_filtrado)
-    st.markdown("---")
+    # Procedimentos são carregados apenas quando a seção é aberta
+    def procedimentos_filtrados():
+        return clinic_cache.get_or_load(cliente_id, ('procedimentos_filtrados', filtro), lambda: filtrar(
+            load_procedimentos_from_database(cliente_id, inicio=inicio[:2], fim=fim[:2]),
+            'Mes_Referencia', 'Ano_Referencia'
+        ))
     
-    # Análises existentes
-    create_funnel_analysis(df_filtrado)
-    st.markdown("---")
-    create_revenue_analysis(df_filtrado)
-    st.markdown("---")
-    create_channel_analysis(df_filtrado)
-    st.markdown("---")
-    create_cost_analysis(df_filtrado)
-    st.markdown("---")
-    create_monthly_trends(df_filtrado)
-    st.markdown("---")
+    # Os gráficos das seções ficam no cache de figuras pelo mesmo estado do filtro
+    escopo = (cliente_id, filtro)
     
-    # Nova seção de procedimentos
-    create_procedimentos_analysis(df_procedimentos_filtrado)
+    # Seções do dashboard: apenas a escolhida é montada (dados e gráficos) a cada execução
+    secoes = {
+        "🎯 Resumo Executivo": lambda: create_executive_summary(df_filtrado),
+        "📊 KPIs": lambda: create_kpi_cards(df_filtrado),
+        "🔄 Conversão": lambda: create_conversion_analysis(df_filtrado),
+        "💰 Orçamento": lambda: create_budget_analysis(df_filtrado, escopo),
+        "🔻 Funil": lambda: create_funnel_analysis(df_filtrado, escopo),
+        "💵 Faturamento": lambda: create_revenue_analysis(df_filtrado, escopo),
+        "📢 Canais": lambda: create_channel_analysis(df_filtrado, escopo),
+        "💸 Custos": lambda: create_cost_analysis(df_filtrado, escopo),
+        "📈 Tendências": lambda: create_monthly_trends(df_filtrado, escopo),
+        "🏥 Procedimentos": lambda: create_procedimentos_analysis(procedimentos_filtrados()),
+        "💡 Insights": lambda: create_insights_section(df_filtrado),
+    }
+    secao = st.radio(
+        "Seção do dashboard",
+        options=list(secoes),
+        horizontal=True,
+        key='secao_dashboard',
+        label_visibility="collapsed"
+    )
     st.markdown("---")
-    
-    create_insights_section(df_filtrado)
+    secoes[secao]()
 
 def main():
     """Função principal da aplicação"""
-    # Exibe botão de logout na sidebar
-    show_logout_button()
+    # Todas as consultas da renderização compartilham uma sessão do banco
+    with db_manager.unidade_de_trabalho() as unidade:
+        # Exibe botão de logout na sidebar
+        show_logout_button()
+        
+        # Executa o dashboard principal
+        main_dashboard()
+    
+    # Número de consultas da renderização, para acompanhar regressões
+    st.session_state['consultas_ultima_renderizacao'] = unidade.statements
+    logger.debug("🔎 Renderização: %d consultas ao banco em %.0f ms", unidade.statements, unidade.duracao * 1000)
     
-    # Executa o dashboard principal
-    main_dashboard()
+    # Atualiza o progresso da sincronização depois de renderizar a página
+    poll_sync_progress()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+Banco SQLite temporário compartilhado pelos scripts de teste.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+def url_temporaria(nome="teste.db"):
+    """
+    URL de um banco SQLite em um diretório temporário próprio, apagado ao final do processo de teste
+
+    Para os testes que criam o DatabaseManager com um perfil próprio.
+    """
+    diretorio = tempfile.mkdtemp(prefix="prestige_teste_")
+    atexit.register(shutil.rmtree, diretorio, ignore_errors=True)
+    return f"sqlite:///{os.path.join(diretorio, nome)}"
+
+def criar_banco_temporario(nome="teste.db"):
+    """
+    Cria um banco SQLite vazio, com as tabelas, em um diretório temporário próprio
+
+    O engine é descartado e o diretório apagado ao final do processo de teste.
+
+    Returns:
+        DatabaseManager apontando para o banco temporário
+    """
+    from database import DatabaseManager
+
+    manager = DatabaseManager(url_temporaria(nome))
+    # atexit roda na ordem inversa: fecha as conexões antes de apagar o diretório
+    atexit.register(manager.engine.dispose)
+    manager.create_tables()
+    return manager
+
+def criar_clinica(manager, nome, email=None, **kwargs):
+    """Cria uma clínica de teste com senha padrão (e-mail derivado do nome, se não informado)"""
+    from database import ClienteCRUD
+
+    return ClienteCRUD(manager).create_cliente(
+        nome=nome,
+        email=email or f"{nome.lower().replace(' ', '')}@clinica.com",
+        senha="teste123",
+        nome_da_clinica=nome,
+        **kwargs
+    )
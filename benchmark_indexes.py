@@ -0,0 +1,181 @@
+"""
+Benchmark dos índices compostos usados pelas consultas do dashboard.
+
+Cria um banco SQLite temporário com várias clínicas e anos de dados, executa as
+consultas do dashboard sem os índices compostos e depois de aplicar migrate_indexes,
+mostrando o plano de execução (EXPLAIN QUERY PLAN) e o tempo de cada consulta.
+
+Uso:
+  python benchmark_indexes.py [--clinicas 500] [--anos 5] [--procedimentos-por-mes 8] [--repeticoes 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from sqlalchemy import event, insert, text
+
+from database import DatabaseManager, DadosDashboardCRUD, AdminDashboardCRUD, ProcedimentoCRUD
+from migrate_database import migrate_indexes
+from models import Cliente, DadosDashboard, Procedimento, MES_ORDER
+
+# Índices compostos avaliados (removidos na medição "antes")
+INDICES_COMPOSTOS = [
+    'ix_clientes_admin_ativo',
+    'uq_dados_dashboard_cliente_ano_mes',
+    'ix_dados_dashboard_cliente_periodo',
+    'ix_procedimentos_cliente_periodo',
+]
+
+MESES_FILTRO = ['Outubro', 'Novembro', 'Dezembro']
+CLINICAS_POR_REPETICAO = 20
+
+def seed_database(manager, clinicas, anos, procedimentos_por_mes):
+    """Popula o banco com clínicas, meses de dados e procedimentos aleatórios"""
+    rng = random.Random(42)
+    ano_final = 2024
+    anos_seed = list(range(ano_final - anos + 1, ano_final + 1))
+
+    print(f"🌱 Populando banco: {clinicas} clínicas, {anos} anos, {procedimentos_por_mes} procedimentos por mês...")
+    inicio = time.perf_counter()
+
+    with manager.engine.begin() as conn:
+        conn.execute(insert(Cliente), [
+            {
+                'id': cliente_id,
+                'nome': f'Clínica {cliente_id}',
+                'email': f'clinica{cliente_id}@benchmark.com',
+                'senha_hash': 'benchmark',
+                'nome_da_clinica': f'Clínica {cliente_id}',
+                'is_admin': cliente_id == 1,
+                'ativo': cliente_id == 1 or rng.random() > 0.1,
+            }
+            for cliente_id in range(1, clinicas + 2)
+        ])
+
+        dados, procedimentos = [], []
+        for cliente_id in range(2, clinicas + 2):
+            for ano in anos_seed:
+                for mes in MES_ORDER:
+                    leads = rng.randint(20, 400)
+                    dados.append({
+                        'cliente_id': cliente_id, 'mes': mes, 'ano': ano,
+                        'leads_totais': leads,
+                        'consultas_marcadas_totais': leads // 3,
+                        'consultas_comparecidas': leads // 5,
+                        'fechamentos_totais': leads // 10,
+                        'faturamento': rng.uniform(5000, 200000),
+                        'valor_investido_total': rng.uniform(1000, 30000),
+                    })
+                    for i in range(procedimentos_por_mes):
+                        procedimentos.append({
+                            'cliente_id': cliente_id, 'mes_referencia': mes, 'ano_referencia': ano,
+                            'procedimento': f'Procedimento {i}',
+                            'valor_da_venda': rng.uniform(500, 30000),
+                        })
+        conn.execute(insert(DadosDashboard), dados)
+        conn.execute(insert(Procedimento), procedimentos)
+
+    print(f"   ✅ {len(dados)} meses e {len(procedimentos)} procedimentos em {time.perf_counter() - inicio:.1f}s")
+    return list(range(2, clinicas + 2)), anos_seed[-1]
+
+def consultas(manager, cliente_ids, ano):
+    """Consultas do dashboard avaliadas: (nome, função que recebe o ID da clínica, se depende da clínica)"""
+    dados_crud = DadosDashboardCRUD(manager)
+    procedimento_crud = ProcedimentoCRUD(manager)
+    admin_crud = AdminDashboardCRUD(manager)
+
+    return [
+        ("Dados da clínica por período",
+         lambda cliente_id: dados_crud.get_dados_by_cliente_and_period(cliente_id, MESES_FILTRO), True),
+        ("Procedimentos da clínica por período",
+         lambda cliente_id: procedimento_crud.get_procedimentos_by_period(cliente_id, MESES_FILTRO, ano), True),
+        ("Evolução mensal consolidada (admin)",
+         lambda cliente_id: admin_crud.get_monthly_evolution(MESES_FILTRO), False),
+        ("Comparação de clínicas (admin)",
+         lambda cliente_id: admin_crud.get_clinics_comparison(), False),
+    ]
+
+def query_plan(manager, func, cliente_id):
+    """Executa a consulta uma vez e retorna o plano de execução do último SELECT"""
+    capturados = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            capturados.append((statement, parameters))
+
+    event.listen(manager.engine, "before_cursor_execute", capturar)
+    try:
+        func(cliente_id)
+    finally:
+        event.remove(manager.engine, "before_cursor_execute", capturar)
+
+    statement, parameters = capturados[-1]
+    with manager.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+def measure(manager, cliente_ids, ano, repeticoes):
+    """Mostra o plano e a mediana do tempo de cada consulta"""
+    with manager.engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+    rng = random.Random(7)
+    tempos = {}
+    for nome, func, por_clinica in consultas(manager, cliente_ids, ano):
+        print(f"\n   📋 {nome}")
+        for linha in query_plan(manager, func, cliente_ids[0]):
+            print(f"      {linha}")
+
+        amostras = []
+        for _ in range(repeticoes):
+            if por_clinica:
+                amostra = rng.sample(cliente_ids, min(CLINICAS_POR_REPETICAO, len(cliente_ids)))
+            else:
+                amostra = cliente_ids[:1]
+            inicio = time.perf_counter()
+            for cliente_id in amostra:
+                func(cliente_id)
+            amostras.append((time.perf_counter() - inicio) / len(amostra) * 1000)
+        tempos[nome] = statistics.median(amostras)
+        print(f"      ⏱️ {tempos[nome]:.2f} ms por consulta")
+    return tempos
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos índices compostos do dashboard')
+    parser.add_argument('--clinicas', type=int, default=500, help='Número de clínicas')
+    parser.add_argument('--anos', type=int, default=5, help='Anos de dados por clínica')
+    parser.add_argument('--procedimentos-por-mes', type=int, default=8, help='Procedimentos por clínica e mês')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Repetições de cada medição')
+    args = parser.parse_args()
+
+    print("🚀 BENCHMARK DOS ÍNDICES DO DASHBOARD")
+    print("=" * 50)
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark_indexes.db')}"
+    manager = DatabaseManager(database_url)
+    manager.create_tables()
+    with manager.engine.begin() as conn:
+        for indice in INDICES_COMPOSTOS:
+            conn.execute(text(f"DROP INDEX IF EXISTS {indice}"))
+
+    cliente_ids, ano = seed_database(manager, args.clinicas, args.anos, args.procedimentos_por_mes)
+
+    print("\n📊 ANTES (sem índices compostos):")
+    antes = measure(manager, cliente_ids, ano, args.repeticoes)
+
+    print()
+    migrate_indexes(database_url)
+
+    print("\n📊 DEPOIS (com índices compostos):")
+    depois = measure(manager, cliente_ids, ano, args.repeticoes)
+
+    print("\n🎯 RESUMO")
+    print("=" * 50)
+    for nome in antes:
+        print(f"   {nome}: {antes[nome]:.2f} ms → {depois[nome]:.2f} ms ({antes[nome] / depois[nome]:.1f}x)")
+
+if __name__ == "__main__":
+    main()
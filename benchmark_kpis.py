@@ -0,0 +1,78 @@
+"""
+Benchmark do cálculo de KPIs.
+
+Compara, em DataFrames sintéticos no formato do dashboard:
+  - as colunas de KPI por linha: implementação anterior (uma divisão por coluna) x kpis.calcular_kpis
+  - os KPIs do período de uma página: cada seção filtrando e somando o DataFrame x
+    kpis.meses_ativos/kpis.totais memorizados por DataFrame
+
+Uso:
+  python benchmark_kpis.py [--linhas 12] [--linhas-admin 30000] [--repeticoes 50]
+"""
+
+import argparse
+import random
+import statistics
+import time
+import numpy as np
+
+import kpis
+from test_kpis import _frame_aleatorio, _referencia_calculate_kpis, _referencia_totais
+
+# Seções da página da clínica que filtram os meses ativos e somam o período
+SECOES_POR_PAGINA = 8
+
+def medir(func, repeticoes):
+    """Mediana do tempo de execução em milissegundos"""
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        amostras.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(amostras)
+
+def pagina_referencia(df):
+    """Cada seção refaz o filtro de meses ativos e as somas, como antes"""
+    for _ in range(SECOES_POR_PAGINA):
+        ativos = df[(df['Leads_Totais'] > 0) | (df['Faturamento'] > 0) | (df['Valor_Investido_Total'] > 0)]
+        _referencia_totais(ativos)
+
+def pagina_kpis(df):
+    """Cada seção pede os mesmos valores ao módulo de KPIs"""
+    for _ in range(SECOES_POR_PAGINA):
+        totais = kpis.totais(kpis.meses_ativos(df))
+        totais.roas, totais.ticket_medio, totais.conversao_csm_leads
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do cálculo de KPIs')
+    parser.add_argument('--linhas', type=int, default=12, help='Meses no DataFrame da clínica')
+    parser.add_argument('--linhas-admin', type=int, default=30000, help='Linhas no DataFrame consolidado')
+    parser.add_argument('--repeticoes', type=int, default=50, help='Repetições de cada medição')
+    args = parser.parse_args()
+
+    print("🚀 BENCHMARK DO CÁLCULO DE KPIs")
+    print("=" * 50)
+
+    rng = random.Random(42)
+    resultados = []
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for nome, linhas in (("Clínica", args.linhas), ("Consolidado", args.linhas_admin)):
+            df = _frame_aleatorio(rng, linhas).fillna(0)  # Colunas do banco têm default 0
+            antes = medir(lambda: _referencia_calculate_kpis(df.copy()), args.repeticoes)
+            depois = medir(lambda: kpis.calcular_kpis(df.copy()), args.repeticoes)
+            resultados.append((f"KPIs por linha - {nome} ({linhas} linhas)", antes, depois))
+
+    df = kpis.calcular_kpis(_frame_aleatorio(rng, args.linhas))
+    antes = medir(lambda: pagina_referencia(df), args.repeticoes)
+    # Um DataFrame novo por medição, como a cada rerun da página
+    depois = medir(lambda: pagina_kpis(df.copy()), args.repeticoes)
+    resultados.append((f"KPIs do período - {SECOES_POR_PAGINA} seções", antes, depois))
+
+    print("\n🎯 RESUMO")
+    print("=" * 50)
+    for nome, antes, depois in resultados:
+        print(f"   {nome}: {antes:.2f} ms → {depois:.2f} ms ({antes / depois:.1f}x)")
+
+if __name__ == "__main__":
+    main()
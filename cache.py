@@ -0,0 +1,199 @@
+"""
+Cache em memória dos DataFrames e dos gráficos do dashboard por clínica.
+Compartilhado por todas as sessões do Streamlit no mesmo processo e invalidado
+pelas operações de escrita do CRUD ou, para escritas de outros processos, pelo tempo.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+FIGURE_CACHE_MAX_MB = float(os.getenv('FIGURE_CACHE_MAX_MB', '32'))
+CLINIC_CACHE_TTL_SECONDS = float(os.getenv('CLINIC_CACHE_TTL_SECONDS', '300'))
+CLINIC_CACHE_MAX_ENTRADAS = int(os.getenv('CLINIC_CACHE_MAX_ENTRADAS', '32'))
+
+class ClinicDataCache:
+    """
+    Cache de dados por clínica com marcador de última escrita
+
+    As escritas do CRUD neste processo avançam o marcador na hora. As feitas por outros
+    processos (scripts de importação pela linha de comando) não passam por aqui: por isso
+    o marcador também avança ttl segundos depois de criado, e os dados e as figuras da
+    clínica são recarregados. Cada clínica guarda no máximo max_entradas valores (LRU),
+    já que cada estado do filtro de período gera uma entrada.
+    """
+
+    def __init__(self, ttl: float = CLINIC_CACHE_TTL_SECONDS, max_entradas: int = CLINIC_CACHE_MAX_ENTRADAS):
+        self._lock = threading.RLock()
+        self._ttl = ttl
+        self._max_entradas = max_entradas
+        self._entries: Dict[Optional[int], "OrderedDict[Hashable, Tuple[int, Any]]"] = {}
+        self._markers: Dict[Optional[int], int] = {}
+        self._criados: Dict[Optional[int], float] = {}
+        self._counter = itertools.count(1)
+
+    def _marker_atual(self, cliente_id: Optional[int]) -> int:
+        # Chamado com o lock: avança o marcador expirado antes de retorná-lo
+        agora = time.monotonic()
+        criado = self._criados.setdefault(cliente_id, agora)
+        if self._ttl > 0 and agora - criado >= self._ttl:
+            self._avancar(cliente_id, agora)
+        return self._markers.get(cliente_id, 0)
+
+    def _avancar(self, cliente_id: Optional[int], agora: float):
+        self._markers[cliente_id] = next(self._counter)
+        self._criados[cliente_id] = agora
+        self._entries.pop(cliente_id, None)
+
+    def get_write_marker(self, cliente_id: int) -> int:
+        """Retorna o marcador da última escrita ou expiração da clínica (0 se nunca houve nenhuma)"""
+        with self._lock:
+            return self._marker_atual(cliente_id)
+
+    def get_latest_marker(self) -> int:
+        """Retorna o marcador mais recente de qualquer clínica (para dados consolidados), que também expira"""
+        with self._lock:
+            self._marker_atual(None)
+            return max(self._markers.values(), default=0)
+
+    def get_or_load(self, cliente_id: int, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Retorna o valor em cache ou executa o loader e armazena o resultado
+
+        Args:
+            cliente_id: ID da clínica dona dos dados
+            key: Identificador do valor dentro da clínica (ex: tipo de dado + filtro)
+            loader: Função que carrega o valor do banco
+
+        Returns:
+            Valor armazenado. Os DataFrames retornados são compartilhados e não devem ser alterados.
+        """
+        with self._lock:
+            marker = self._marker_atual(cliente_id)
+            entradas = self._entries.get(cliente_id)
+            entry = entradas.get(key) if entradas else None
+            if entry is not None and entry[0] == marker:
+                entradas.move_to_end(key)
+                return entry[1]
+
+        value = loader()
+
+        with self._lock:
+            # Só armazena se nenhuma escrita ou expiração ocorreu durante o carregamento
+            if self._marker_atual(cliente_id) == marker:
+                entradas = self._entries.setdefault(cliente_id, OrderedDict())
+                entradas[key] = (marker, value)
+                entradas.move_to_end(key)
+                # Remove os valores usados há mais tempo (ex: filtros antigos)
+                while len(entradas) > self._max_entradas:
+                    entradas.popitem(last=False)
+
+        return value
+
+    def invalidate(self, cliente_id: int):
+        """Descarta os dados da clínica e avança seu marcador de escrita"""
+        with self._lock:
+            self._avancar(cliente_id, time.monotonic())
+
+class FigureCache:
+    """
+    Cache LRU de gráficos Plotly já montados (go.Figure), limitado pelo tamanho do JSON de cada figura
+
+    As figuras são guardadas já validadas: st.plotly_chart aceita um go.Figure sem validá-lo
+    de novo, então exibir uma figura do cache custa menos que montá-la. As figuras são
+    compartilhadas entre sessões e não devem ser alteradas por quem as recebe.
+
+    A chave inclui a clínica, o marcador da última escrita, o filtro do período e o
+    identificador do gráfico: uma escrita na clínica torna as figuras antigas inalcançáveis.
+    Com cliente_id None a figura é consolidada e usa o marcador mais recente de todas as clínicas.
+    """
+
+    def __init__(self, data_cache: ClinicDataCache, max_bytes: int):
+        self._lock = threading.RLock()
+        self._data_cache = data_cache
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def bytes_usados(self) -> int:
+        """Total de bytes das figuras armazenadas"""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _marker(self, cliente_id: Optional[int]) -> int:
+        if cliente_id is None:
+            return self._data_cache.get_latest_marker()
+        return self._data_cache.get_write_marker(cliente_id)
+
+    def get_or_build(self, cliente_id: Optional[int], filtro: Hashable, chart_id: str,
+                     construir: Callable[[], Any]) -> Any:
+        """
+        Retorna a figura em cache ou executa construir e armazena o resultado
+
+        Args:
+            cliente_id: ID da clínica dona dos dados (None para gráficos consolidados)
+            filtro: Estado do filtro de período (ex: meses selecionados)
+            chart_id: Identificador do gráfico na página
+            construir: Função que monta o go.Figure (ou retorna None se não houver dados)
+
+        Returns:
+            go.Figure montado por construir (None se não houver gráfico)
+        """
+        marker = self._marker(cliente_id)
+        chave = (cliente_id, marker, filtro, chart_id)
+        with self._lock:
+            entrada = self._entries.get(chave)
+            if entrada is not None:
+                self._entries.move_to_end(chave)
+                self.hits += 1
+                return entrada[0]
+            self.misses += 1
+
+        figura = construir()
+        tamanho = len(b'null') if figura is None else len(figura.to_json())
+
+        with self._lock:
+            # Só armazena se nenhuma escrita ocorreu durante a construção
+            if self._marker(cliente_id) == marker:
+                self._store(chave, (figura, tamanho))
+
+        return figura
+
+    def _store(self, chave: Tuple, entrada: Tuple[Any, int]):
+        tamanho = entrada[1]
+        if tamanho > self._max_bytes:
+            return
+
+        # Figuras da mesma clínica com marcador antigo não serão mais lidas
+        cliente_id, marker = chave[:2]
+        for antiga in [c for c in self._entries if c[0] == cliente_id and c[1] != marker]:
+            self._bytes -= self._entries.pop(antiga)[1]
+
+        anterior = self._entries.pop(chave, None)
+        if anterior is not None:
+            self._bytes -= anterior[1]
+        self._entries[chave] = entrada
+        self._bytes += tamanho
+
+        # Remove as figuras usadas há mais tempo até caber no limite
+        while self._bytes > self._max_bytes:
+            _, removida = self._entries.popitem(last=False)
+            self._bytes -= removida[1]
+
+    def clear(self):
+        """Descarta todas as figuras"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+# Instâncias globais do cache
+clinic_cache = ClinicDataCache()
+figure_cache = FigureCache(clinic_cache, int(FIGURE_CACHE_MAX_MB * 1024 * 1024))
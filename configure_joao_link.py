@@ -2,7 +2,7 @@
 Script para configurar o link da planilha do Dr. João
 """
 
-from database import dados_crud, cliente_crud, db_manager
+from database import dados_crud, cliente_crud
 from sqlalchemy.orm import sessionmaker
 
 def configure_joao_link():
@@ -33,20 +33,13 @@ def configure_joao_link():
     print(f"\\n📊 CONFIGURANDO NOVO LINK:")
     print(f"   {novo_link}")
     
-    # Atualizar no banco
-    session = db_manager.get_session()
-    try:
-        joao.link_empresa = novo_link
-        session.commit()
+    # Atualizar no banco (os clientes retornados pelo CRUD são somente leitura)
+    if cliente_crud.update_cliente(joao.id, link_empresa=novo_link):
         print(f"✅ Link atualizado com sucesso!")
         print(f"🔗 Novo link: {novo_link}")
         return True
-    except Exception as e:
-        print(f"❌ Erro ao atualizar: {e}")
-        session.rollback()
-        return False
-    finally:
-        session.close()
+    print(f"❌ Erro ao atualizar o link")
+    return False
 
 def test_sync_after_config():
     """Testa sincronização após configuração"""
@@ -0,0 +1,14 @@
+"""
+Configuração do pytest: os testes usam um banco temporário, nunca o prestige_clinic.db versionado.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+# Definido antes de qualquer teste importar database (instância global db_manager) ou app;
+# load_dotenv não sobrescreve variáveis já definidas
+_diretorio = tempfile.mkdtemp(prefix="prestige_teste_")
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_diretorio, 'pytest.db')}"
+atexit.register(shutil.rmtree, _diretorio, ignore_errors=True)
@@ -10,6 +10,33 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+import kpis
+from cache import figure_cache
+
+def rotulo_periodo(df, coluna_mes='Meses', coluna_ano='Ano'):
+    """Rótulos "Mês Ano" do eixo x, para que períodos de mais de 12 meses não se sobreponham"""
+    return df[coluna_mes] + ' ' + df[coluna_ano].astype(str)
+
+def mostrar_grafico(chart_id, construir, escopo=None):
+    """
+    Exibe um gráfico Plotly, reaproveitando a figura do cache quando o escopo é informado
+
+    Args:
+        chart_id: Identificador do gráfico na página
+        construir: Função que monta o go.Figure (incluindo as agregações que só ele usa)
+        escopo: Tupla (cliente_id, filtro) da página; sem escopo a figura é sempre montada
+    
+    Returns:
+        Figura exibida, ou None se construir não encontrou dados
+    """
+    if escopo is None:
+        figura = construir()
+    else:
+        figura = figure_cache.get_or_build(*escopo, chart_id, construir)
+    if figura is not None:
+        st.plotly_chart(figura)
+    return figura
+
 def create_kpi_cards(df_filtered):
     """Cria cards com KPIs principais"""
     
@@ -18,18 +45,19 @@ def create_kpi_cards(df_filtered):
     st.subheader(f"📊 KPIs Principais - Período Selecionado")
     
     # Filtra apenas meses com atividade (novo formato)
-    df_metrics = df_ativos[(df_ativos['Leads_Totais'] > 0) | (df_ativos['Faturamento'] > 0) | (df_ativos['Valor_Investido_Total'] > 0)]
+    df_metrics = kpis.meses_ativos(df_ativos)
     
     if df_metrics.empty:
         st.warning("Nenhum dado ativo neste período.")
         return
         
-    total_leads = df_metrics['Leads_Totais'].sum()
-    total_faturamento = df_metrics['Faturamento'].sum()
-    total_fechamentos = df_metrics['Fechamentos_Totais'].sum()
-    total_investimento = df_metrics['Valor_Investido_Total'].sum()
-    total_consultas_marcadas = df_metrics['Consultas_Marcadas_Totais'].sum()
-    total_consultas_comparecidas = df_metrics['Consultas_Comparecidas'].sum()
+    totais = kpis.totais(df_metrics)
+    total_leads = totais.leads_totais
+    total_faturamento = totais.faturamento
+    total_fechamentos = totais.fechamentos_totais
+    total_investimento = totais.valor_investido_total
+    total_consultas_marcadas = totais.consultas_marcadas_totais
+    total_consultas_comparecidas = totais.consultas_comparecidas
     
     col1, col2, col3 = st.columns(3)
     col4, col5, col6 = st.columns(3)
@@ -56,7 +84,7 @@ def create_kpi_cards(df_filtered):
         )
     
     with col4:
-        roas_medio = total_faturamento / total_investimento if total_investimento > 0 else 0
+        roas_medio = totais.roas
         st.metric(
             label="ROAS Médio",
             value=f"{roas_medio:.1f}x",
@@ -77,49 +105,46 @@ def create_kpi_cards(df_filtered):
             delta=f"{df_metrics['Consultas_Comparecidas'].mean():.0f}/mês"
         )
 
-def create_funnel_analysis(df_filtered):
+def create_funnel_analysis(df_filtered, escopo=None):
     """Análise do funil de conversão"""
     st.subheader("🔄 Análise do Funil de Conversão")
     
-    df_ativos = df_filtered[(df_filtered['Leads_Totais'] > 0) | (df_filtered['Faturamento'] > 0) | (df_filtered['Valor_Investido_Total'] > 0)]
+    df_ativos = kpis.meses_ativos(df_filtered)
     
     if df_ativos.empty:
         st.info("Nenhum Lead registrado no período selecionado.")
         return
         
-    # Dados consolidados do funil
-    total_leads = df_ativos['Leads_Totais'].sum()
-    total_consultas_marcadas = df_ativos['Consultas_Marcadas_Totais'].sum()
-    total_consultas_comparecidas = df_ativos['Consultas_Comparecidas'].sum()
-    total_fechamentos = df_ativos['Fechamentos_Totais'].sum()
-    
-    # Taxas de conversão CONSOLIDADAS (corrigindo o erro de usar média simples de percentuais)
-    taxa_leads_consulta = (total_consultas_marcadas / total_leads * 100) if total_leads > 0 else 0
-    taxa_consulta_comparecida = (total_consultas_comparecidas / total_consultas_marcadas * 100) if total_consultas_marcadas > 0 else 0
-    taxa_comparecida_fechamento = (total_fechamentos / total_consultas_comparecidas * 100) if total_consultas_comparecidas > 0 else 0
-    taxa_leads_fechamento = (total_fechamentos / total_leads * 100) if total_leads > 0 else 0
+    # Taxas de conversão CONSOLIDADAS (razão entre os totais, não média simples de percentuais)
+    totais = kpis.totais(df_ativos)
+    taxa_leads_consulta = totais.conversao_csm_leads
+    taxa_consulta_comparecida = totais.conversao_csc_csm
+    taxa_comparecida_fechamento = totais.conversao_fechamento_csc
+    taxa_leads_fechamento = totais.conversao_fechamento_leads
 
     
     # Gráfico de funil usa valores médios para visualização do fluxo, mas os KPIs usam totais.
-    fig_funnel = go.Figure(go.Funnel(
-        y=["Leads", "Consultas Marcadas", "Consultas Comparecidas", "Fechamentos"],
-        x=[df_ativos['Leads_Totais'].mean(), df_ativos['Consultas_Marcadas_Totais'].mean(), 
-           df_ativos['Consultas_Comparecidas'].mean(), df_ativos['Fechamentos_Totais'].mean()],
-        textinfo="value+percent initial",
-        opacity=0.8,
-        marker={"color": ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]}
-    ))
-    
-    fig_funnel.update_layout(
-        title="Funil de Vendas - Valores Médios Mensais",
-        height=400,
-        margin=dict(t=60, b=40, l=20, r=20)
-    )
+    def construir_funil():
+        fig_funnel = go.Figure(go.Funnel(
+            y=["Leads", "Consultas Marcadas", "Consultas Comparecidas", "Fechamentos"],
+            x=[df_ativos['Leads_Totais'].mean(), df_ativos['Consultas_Marcadas_Totais'].mean(), 
+               df_ativos['Consultas_Comparecidas'].mean(), df_ativos['Fechamentos_Totais'].mean()],
+            textinfo="value+percent initial",
+            opacity=0.8,
+            marker={"color": ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]}
+        ))
+        
+        fig_funnel.update_layout(
+            title="Funil de Vendas - Valores Médios Mensais",
+            height=400,
+            margin=dict(t=60, b=40, l=20, r=20)
+        )
+        return fig_funnel
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        st.plotly_chart(fig_funnel)
+        mostrar_grafico('funil', construir_funil, escopo)
     
     with col2:
         st.markdown("### 📈 Taxas de Conversão Consolidadas")
@@ -128,7 +153,7 @@ def create_funnel_analysis(df_filtered):
         st.metric("Comparecimentos → Fechamentos", f"{taxa_comparecida_fechamento:.1f}%")
         st.metric("Leads → Fechamentos", f"{taxa_leads_fechamento:.1f}%")
 
-def create_revenue_analysis(df_filtered):
+def create_revenue_analysis(df_filtered, escopo=None):
     """Análise de faturamento e investimento"""
     st.subheader("💰 Análise Financeira")
     
@@ -142,126 +167,139 @@ def create_revenue_analysis(df_filtered):
     
     with col1:
         # Faturamento vs Investimento
-        fig_revenue = go.Figure()
-        fig_revenue.add_trace(go.Bar(
-            x=df_ativos['Meses'],
-            y=df_ativos['Faturamento'],
-            name='Faturamento',
-            marker_color='#2ca02c'
-        ))
-        fig_revenue.add_trace(go.Scatter(
-            x=df_ativos['Meses'],
-            y=df_ativos['Valor_Investido_Total'],
-            name='Investimento Total',
-            mode='lines+markers',
-            line=dict(color='#ff7f0e', width=3),
-            yaxis='y2'
-        ))
+        def construir_faturamento():
+            fig_revenue = go.Figure()
+            fig_revenue.add_trace(go.Bar(
+                x=rotulo_periodo(df_ativos),
+                y=df_ativos['Faturamento'],
+                name='Faturamento',
+                marker_color='#2ca02c'
+            ))
+            fig_revenue.add_trace(go.Scatter(
+                x=rotulo_periodo(df_ativos),
+                y=df_ativos['Valor_Investido_Total'],
+                name='Investimento Total',
+                mode='lines+markers',
+                line=dict(color='#ff7f0e', width=3),
+                yaxis='y2'
+            ))
+            
+            fig_revenue.update_layout(
+                title="Faturamento vs Investimento por Mês",
+                yaxis=dict(title="Faturamento (R$)"),
+                yaxis2=dict(title="Investimento (R$)", overlaying='y', side='right'),
+                showlegend=True,
+                height=400,
+                margin=dict(t=60, b=40, l=20, r=20)
+            )
+            return fig_revenue
         
-        fig_revenue.update_layout(
-            title="Faturamento vs Investimento por Mês",
-            yaxis=dict(title="Faturamento (R$)"),
-            yaxis2=dict(title="Investimento (R$)", overlaying='y', side='right'),
-            showlegend=True,
-            height=400,
-            margin=dict(t=60, b=40, l=20, r=20)
-        )
-        st.plotly_chart(fig_revenue)
+        mostrar_grafico('faturamento_investimento', construir_faturamento, escopo)
     
     with col2:
         # ROAS e Ticket Médio
-        fig_roas = make_subplots(specs=[[{"secondary_y": True}]])
-        
-        fig_roas.add_trace(
-            go.Bar(x=df_ativos['Meses'], y=df_ativos['ROAS'], name="ROAS", marker_color='#17becf'),
-            secondary_y=False,
-        )
-        
-        fig_roas.add_trace(
-            go.Scatter(x=df_ativos['Meses'], y=df_ativos['Ticket_Medio'], 
-                      name="Ticket Médio", line=dict(color='#e377c2', width=3)),
-            secondary_y=True,
-        )
-        
-        fig_roas.update_layout(
-            title="ROAS e Ticket Médio",
-            height=400,
-            margin=dict(t=60, b=40, l=20, r=20)
-        )
-        
-        fig_roas.update_yaxes(title_text="ROAS (x)", secondary_y=False)
-        fig_roas.update_yaxes(title_text="Ticket Médio (R$)", secondary_y=True)
+        def construir_roas():
+            fig_roas = make_subplots(specs=[[{"secondary_y": True}]])
+            
+            fig_roas.add_trace(
+                go.Bar(x=rotulo_periodo(df_ativos), y=df_ativos['ROAS'], name="ROAS", marker_color='#17becf'),
+                secondary_y=False,
+            )
+            
+            fig_roas.add_trace(
+                go.Scatter(x=rotulo_periodo(df_ativos), y=df_ativos['Ticket_Medio'], 
+                          name="Ticket Médio", line=dict(color='#e377c2', width=3)),
+                secondary_y=True,
+            )
+            
+            fig_roas.update_layout(
+                title="ROAS e Ticket Médio",
+                height=400,
+                margin=dict(t=60, b=40, l=20, r=20)
+            )
+            
+            fig_roas.update_yaxes(title_text="ROAS (x)", secondary_y=False)
+            fig_roas.update_yaxes(title_text="Ticket Médio (R$)", secondary_y=True)
+            return fig_roas
         
-        st.plotly_chart(fig_roas)
+        mostrar_grafico('roas_ticket', construir_roas, escopo)
 
-def create_channel_analysis(df_filtered):
+def create_channel_analysis(df_filtered, escopo=None):
     """Análise de performance por canal"""
     st.subheader("📱 Performance por Canal de Aquisição")
     
-    df_ativos = df_filtered[(df_filtered['Leads_Totais'] > 0) | (df_filtered['Faturamento'] > 0) | (df_filtered['Valor_Investido_Total'] > 0)]
+    df_ativos = kpis.meses_ativos(df_filtered)
     
     if df_ativos.empty:
         st.info("Nenhum dado de Leads disponível no período selecionado.")
         return
         
-    # Agrupa dados totais por canal
-    channels_data = {
-        'Canal': ['Instagram Orgânico', 'Meta Ads', 'Google Ads', 'Indicação', 'Outros'],
-        'Leads': [
-            df_ativos['Leads_Instagram_Organico'].sum(),
-            df_ativos['Leads_Meta_Ads'].sum(),
-            df_ativos['Leads_Google_Ads'].sum(),
-            df_ativos['Leads_Indicacao'].sum(),
-            df_ativos['Leads_Origem_Desconhecida'].sum()
-        ],
-        'Fechamentos': [
-            df_ativos['Fechamentos_IG_Organico'].sum(),
-            df_ativos['Fechamentos_Meta_Ads'].sum(),
-            df_ativos['Fechamentos_Google_Ads'].sum(),
-            df_ativos['Fechamentos_Indicacao'].sum(),
-            df_ativos['Fechamentos_Outros'].sum()
-        ]
-    }
-    
-    channels_df = pd.DataFrame(channels_data)
-    # Recalculando Taxa de Conversão Consolidada
-    channels_df['Taxa_Conversao'] = np.where(channels_df['Leads'] != 0, 
-                                            (channels_df['Fechamentos'] / channels_df['Leads'] * 100), 0).round(2)
+    # Agrupa dados totais por canal; só calculado quando algum gráfico não está no cache
+    def tabela_canais():
+        channels_data = {
+            'Canal': ['Instagram Orgânico', 'Meta Ads', 'Google Ads', 'Indicação', 'Outros'],
+            'Leads': [
+                df_ativos['Leads_Instagram_Organico'].sum(),
+                df_ativos['Leads_Meta_Ads'].sum(),
+                df_ativos['Leads_Google_Ads'].sum(),
+                df_ativos['Leads_Indicacao'].sum(),
+                df_ativos['Leads_Origem_Desconhecida'].sum()
+            ],
+            'Fechamentos': [
+                df_ativos['Fechamentos_IG_Organico'].sum(),
+                df_ativos['Fechamentos_Meta_Ads'].sum(),
+                df_ativos['Fechamentos_Google_Ads'].sum(),
+                df_ativos['Fechamentos_Indicacao'].sum(),
+                df_ativos['Fechamentos_Outros'].sum()
+            ]
+        }
+        
+        channels_df = pd.DataFrame(channels_data)
+        # Recalculando Taxa de Conversão Consolidada
+        channels_df['Taxa_Conversao'] = kpis.razao(channels_df['Fechamentos'], channels_df['Leads'], 100).round(2)
+        
+        return channels_df
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Leads por canal
-        fig_leads = px.pie(
-            channels_df, 
-            values='Leads', 
-            names='Canal',
-            title='Distribuição de Leads por Canal',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        fig_leads.update_layout(height=350, margin=dict(t=60, b=20, l=20, r=20))
-        st.plotly_chart(fig_leads)
+        def construir_leads_canal():
+            fig_leads = px.pie(
+                tabela_canais(), 
+                values='Leads', 
+                names='Canal',
+                title='Distribuição de Leads por Canal',
+                color_discrete_sequence=px.colors.qualitative.Set3
+            )
+            fig_leads.update_layout(height=350, margin=dict(t=60, b=20, l=20, r=20))
+            return fig_leads
+        
+        mostrar_grafico('leads_por_canal', construir_leads_canal, escopo)
     
     with col2:
         # Taxa de conversão por canal
-        fig_conversion = px.bar(
-            channels_df,
-            x='Canal',
-            y='Taxa_Conversao',
-            title='Taxa de Conversão por Canal (%)',
-            color='Taxa_Conversao',
-            color_continuous_scale='Viridis',
-            text_auto='.1f' 
-        )
-        fig_conversion.update_layout(showlegend=False, height=350, margin=dict(t=60, b=40, l=20, r=20))
-        fig_conversion.update_xaxes(tickangle=-15)
-        st.plotly_chart(fig_conversion)
+        def construir_conversao_canal():
+            fig_conversion = px.bar(
+                tabela_canais(),
+                x='Canal',
+                y='Taxa_Conversao',
+                title='Taxa de Conversão por Canal (%)',
+                color='Taxa_Conversao',
+                color_continuous_scale='Viridis',
+                text_auto='.1f' 
+            )
+            fig_conversion.update_layout(showlegend=False, height=350, margin=dict(t=60, b=40, l=20, r=20))
+            fig_conversion.update_xaxes(tickangle=-15)
+            return fig_conversion
+        
+        mostrar_grafico('conversao_por_canal', construir_conversao_canal, escopo)
 
-def create_cost_analysis(df_filtered):
+def create_cost_analysis(df_filtered, escopo=None):
     """Análise de custos e eficiência"""
     st.subheader("💸 Análise de Custos e Eficiência")
     
-    df_ativos = df_filtered[(df_filtered['Leads_Totais'] > 0) | (df_filtered['Faturamento'] > 0) | (df_filtered['Valor_Investido_Total'] > 0)]
+    df_ativos = kpis.meses_ativos(df_filtered)
     
     if df_ativos.empty:
         st.info("Nenhum dado ativo para análise de custos no período selecionado.")
@@ -300,84 +338,89 @@ def create_cost_analysis(df_filtered):
         )
     
     # Evolução dos custos
-    fig_costs = go.Figure()
-    
-    fig_costs.add_trace(go.Scatter(
-        x=df_ativos['Meses'], y=df_ativos['Custo_por_Lead_Total'],
-        name='Custo por Lead', line=dict(color='#1f77b4', width=3)
-    ))
-    
-    fig_costs.add_trace(go.Scatter(
-        x=df_ativos['Meses'], y=df_ativos['Custo_por_Compra_Cirurgias'],
-        name='Custo por Compra', line=dict(color='#ff7f0e', width=3)
-    ))
-    
-    fig_costs.add_trace(go.Scatter(
-        x=df_ativos['Meses'], y=df_ativos['Custo_por_Consulta_Marcada'],
-        name='Custo por Consulta Marcada', line=dict(color='#2ca02c', width=3)
-    ))
-    
-    fig_costs.update_layout(
-        title="Evolução dos Custos por Mês",
-        yaxis_title="Custo (R$)",
-        height=400,
-        margin=dict(t=60, b=40, l=20, r=20)
-    )
+    def construir_custos():
+        fig_costs = go.Figure()
+        
+        fig_costs.add_trace(go.Scatter(
+            x=rotulo_periodo(df_ativos), y=df_ativos['Custo_por_Lead_Total'],
+            name='Custo por Lead', line=dict(color='#1f77b4', width=3)
+        ))
+        
+        fig_costs.add_trace(go.Scatter(
+            x=rotulo_periodo(df_ativos), y=df_ativos['Custo_por_Compra_Cirurgias'],
+            name='Custo por Compra', line=dict(color='#ff7f0e', width=3)
+        ))
+        
+        fig_costs.add_trace(go.Scatter(
+            x=rotulo_periodo(df_ativos), y=df_ativos['Custo_por_Consulta_Marcada'],
+            name='Custo por Consulta Marcada', line=dict(color='#2ca02c', width=3)
+        ))
+        
+        fig_costs.update_layout(
+            title="Evolução dos Custos por Mês",
+            yaxis_title="Custo (R$)",
+            height=400,
+            margin=dict(t=60, b=40, l=20, r=20)
+        )
+        return fig_costs
     
-    st.plotly_chart(fig_costs)
+    mostrar_grafico('evolucao_custos', construir_custos, escopo)
 
-def create_monthly_trends(df_filtered):
+def create_monthly_trends(df_filtered, escopo=None):
     """Tendências mensais e sazonais"""
     st.subheader("📈 Tendências e Sazonalidade")
     
-    df_ativos = df_filtered[(df_filtered['Leads_Totais'] > 0) | (df_filtered['Faturamento'] > 0) | (df_filtered['Valor_Investido_Total'] > 0)]
+    df_ativos = kpis.meses_ativos(df_filtered)
     
     if df_ativos.empty:
         st.info("Nenhum dado ativo para tendências no período selecionado.")
         return
         
-    fig_trends = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Leads Totais', 'Faturamento Mensal', 'Consultas Comparecidas', 'Fechamentos'),
-        vertical_spacing=0.12
-    )
-    
-    # Leads
-    fig_trends.add_trace(
-        go.Bar(x=df_ativos['Meses'], y=df_ativos['Leads_Totais'], name="Leads"),
-        row=1, col=1
-    )
-    
-    # Faturamento
-    fig_trends.add_trace(
-        go.Bar(x=df_ativos['Meses'], y=df_ativos['Faturamento'], name="Faturamento"),
-        row=1, col=2
-    )
-    
-    # Consultas Comparecidas
-    fig_trends.add_trace(
-        go.Bar(x=df_ativos['Meses'], y=df_ativos['Consultas_Comparecidas'], name="Consultas Comparecidas"),
-        row=2, col=1
-    )
-    
-    # Fechamentos
-    fig_trends.add_trace(
-        go.Bar(x=df_ativos['Meses'], y=df_ativos['Fechamentos_Totais'], name="Fechamentos"),
-        row=2, col=2
-    )
+    def construir_tendencias():
+        fig_trends = make_subplots(
+            rows=2, cols=2,
+            subplot_titles=('Leads Totais', 'Faturamento Mensal', 'Consultas Comparecidas', 'Fechamentos'),
+            vertical_spacing=0.12
+        )
+        
+        # Leads
+        fig_trends.add_trace(
+            go.Bar(x=rotulo_periodo(df_ativos), y=df_ativos['Leads_Totais'], name="Leads"),
+            row=1, col=1
+        )
+        
+        # Faturamento
+        fig_trends.add_trace(
+            go.Bar(x=rotulo_periodo(df_ativos), y=df_ativos['Faturamento'], name="Faturamento"),
+            row=1, col=2
+        )
+        
+        # Consultas Comparecidas
+        fig_trends.add_trace(
+            go.Bar(x=rotulo_periodo(df_ativos), y=df_ativos['Consultas_Comparecidas'], name="Consultas Comparecidas"),
+            row=2, col=1
+        )
+        
+        # Fechamentos
+        fig_trends.add_trace(
+            go.Bar(x=rotulo_periodo(df_ativos), y=df_ativos['Fechamentos_Totais'], name="Fechamentos"),
+            row=2, col=2
+        )
+        
+        fig_trends.update_layout(
+            height=600, 
+            showlegend=False,
+            margin=dict(t=60, b=40, l=20, r=20)
+        )
+        return fig_trends
     
-    fig_trends.update_layout(
-        height=600, 
-        showlegend=False,
-        margin=dict(t=60, b=40, l=20, r=20)
-    )
-    st.plotly_chart(fig_trends)
+    mostrar_grafico('tendencias_mensais', construir_tendencias, escopo)
 
 def create_conversion_analysis(df_filtered):
     """Cria análise de conversão com novos KPIs"""
     st.subheader("🔄 Análise de Conversão - Novo Formato")
     
-    df_ativos = df_filtered[(df_filtered['Leads_Totais'] > 0) | (df_filtered['Faturamento'] > 0) | (df_filtered['Valor_Investido_Total'] > 0)]
+    df_ativos = kpis.meses_ativos(df_filtered)
     
     if df_ativos.empty:
         st.warning("Nenhum dado ativo para análise de conversão.")
@@ -386,17 +429,12 @@ def create_conversion_analysis(df_filtered):
     # KPIs de conversão
     col1, col2, col3, col4 = st.columns(4)
     
-    # Calcular conversões usando totais (não média de percentuais)
-    total_leads = df_ativos['Leads_Totais'].sum()
-    total_consultas_marcadas = df_ativos['Consultas_Marcadas_Totais'].sum()
-    total_consultas_comparecidas = df_ativos['Consultas_Comparecidas'].sum()
-    total_fechamentos = df_ativos['Fechamentos_Totais'].sum()
-    
-    # Conversões calculadas corretamente
-    conversao_csm_leads = (total_consultas_marcadas / total_leads * 100) if total_leads > 0 else 0
-    conversao_csc_csm = (total_consultas_comparecidas / total_consultas_marcadas * 100) if total_consultas_marcadas > 0 else 0
-    conversao_fechamento_csc = (total_fechamentos / total_consultas_comparecidas * 100) if total_consultas_comparecidas > 0 else 0
-    conversao_fechamento_leads = (total_fechamentos / total_leads * 100) if total_leads > 0 else 0
+    # Conversões calculadas usando totais (não média de percentuais)
+    totais = kpis.totais(df_ativos)
+    conversao_csm_leads = totais.conversao_csm_leads
+    conversao_csc_csm = totais.conversao_csc_csm
+    conversao_fechamento_csc = totais.conversao_fechamento_csc
+    conversao_fechamento_leads = totais.conversao_fechamento_leads
     
     with col1:
         st.metric(
@@ -432,7 +470,7 @@ def create_conversion_analysis(df_filtered):
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        taxa_ideal_csm = 10.0
+        taxa_ideal_csm = kpis.TAXAS_IDEAIS['Taxa_Ideal_Csm']
         taxa_real_csm = conversao_csm_leads
         status_csm = "🟢" if taxa_real_csm >= taxa_ideal_csm else "🔴"
         st.metric(
@@ -443,7 +481,7 @@ def create_conversion_analysis(df_filtered):
         )
     
     with col2:
-        taxa_ideal_csc = 50.0
+        taxa_ideal_csc = kpis.TAXAS_IDEAIS['Taxa_Ideal_Csc']
         taxa_real_csc = conversao_csc_csm
         status_csc = "🟢" if taxa_real_csc >= taxa_ideal_csc else "🔴"
         st.metric(
@@ -454,7 +492,7 @@ def create_conversion_analysis(df_filtered):
         )
     
     with col3:
-        taxa_ideal_fechamentos = 40.0
+        taxa_ideal_fechamentos = kpis.TAXAS_IDEAIS['Taxa_Ideal_Fechamentos']
         taxa_real_fechamentos = conversao_fechamento_csc
         status_fechamentos = "🟢" if taxa_real_fechamentos >= taxa_ideal_fechamentos else "🔴"
         st.metric(
@@ -464,11 +502,11 @@ def create_conversion_analysis(df_filtered):
             help="Taxa ideal: >40%"
         )
 
-def create_budget_analysis(df_filtered):
+def create_budget_analysis(df_filtered, escopo=None):
     """Cria análise de orçamento com novos campos"""
     st.subheader("💰 Análise de Orçamento - Novo Formato")
     
-    df_ativos = df_filtered[(df_filtered['Leads_Totais'] > 0) | (df_filtered['Faturamento'] > 0) | (df_filtered['Valor_Investido_Total'] > 0)]
+    df_ativos = kpis.meses_ativos(df_filtered)
     
     if df_ativos.empty:
         st.warning("Nenhum dado ativo para análise de orçamento.")
@@ -511,32 +549,34 @@ def create_budget_analysis(df_filtered):
     
     # Gráfico de orçamento vs realizado
     if len(df_ativos) > 1:
-        fig_budget = go.Figure()
-        
-        fig_budget.add_trace(go.Bar(
-            x=df_ativos['Meses'],
-            y=df_ativos['Orcamento_Previsto_Total'],
-            name='Orçamento Previsto',
-            marker_color='#1f77b4'
-        ))
-        
-        fig_budget.add_trace(go.Bar(
-            x=df_ativos['Meses'],
-            y=df_ativos['Valor_Investido_Total'],
-            name='Valor Investido',
-            marker_color='#ff7f0e'
-        ))
-        
-        fig_budget.update_layout(
-            title="Orçamento Previsto vs Valor Investido",
-            xaxis_title="Meses",
-            yaxis_title="Valor (R$)",
-            barmode='group',
-            height=400,
-            margin=dict(t=60, b=40, l=20, r=20)
-        )
+        def construir_orcamento():
+            fig_budget = go.Figure()
+            
+            fig_budget.add_trace(go.Bar(
+                x=rotulo_periodo(df_ativos),
+                y=df_ativos['Orcamento_Previsto_Total'],
+                name='Orçamento Previsto',
+                marker_color='#1f77b4'
+            ))
+            
+            fig_budget.add_trace(go.Bar(
+                x=rotulo_periodo(df_ativos),
+                y=df_ativos['Valor_Investido_Total'],
+                name='Valor Investido',
+                marker_color='#ff7f0e'
+            ))
+            
+            fig_budget.update_layout(
+                title="Orçamento Previsto vs Valor Investido",
+                xaxis_title="Meses",
+                yaxis_title="Valor (R$)",
+                barmode='group',
+                height=400,
+                margin=dict(t=60, b=40, l=20, r=20)
+            )
+            return fig_budget
         
-        st.plotly_chart(fig_budget)
+        mostrar_grafico('orcamento_vs_investido', construir_orcamento, escopo)
 
 def create_admin_consolidated_dashboard():
     """Cria dashboard consolidado para administrador"""
@@ -594,45 +634,16 @@ def create_admin_consolidated_dashboard():
         key="admin_meses_filter"
     )
     
-    # Busca dados filtrados por meses selecionados
-    from database import dados_crud
+    # Gráficos consolidados ficam em cache por meses selecionados até a próxima escrita em qualquer clínica
+    escopo_admin = (None, tuple(meses_selecionados))
     
-    # Busca todos os dados de todas as clínicas
-    all_data = []
-    clientes = cliente_crud.get_all_clientes()
-    for cliente in clientes:
-        if not cliente.is_admin and cliente.ativo:
-            dados_cliente = dados_crud.get_dados_by_cliente(cliente.id)
-            if dados_cliente:
-                df_cliente = dados_crud.dados_to_dataframe(dados_cliente)
-                # Filtra pelos meses selecionados
-                df_filtrado = df_cliente[df_cliente['Meses'].isin(meses_selecionados)]
-                if not df_filtrado.empty:
-                    all_data.append(df_filtrado)
-    
-    if not all_data:
+    # Métricas consolidadas calculadas no banco para os meses selecionados
+    metrics = admin_dashboard_crud.get_consolidated_metrics(meses_selecionados)
+    
+    if not metrics or metrics.meses_ativos == 0:
         create_modern_alert("Nenhuma clínica ativa encontrada para exibir métricas consolidadas.", "warning")
         return
     
-    # Concatena todos os dados filtrados
-    import pandas as pd
-    df_consolidado = pd.concat(all_data, ignore_index=True)
-    
-    # Calcula métricas consolidadas filtradas
-    metrics = {
-        'total_leads': df_consolidado['Leads_Totais'].sum(),
-        'total_consultas_marcadas': df_consolidado['Consultas_Marcadas_Totais'].sum(),
-        'total_consultas_comparecidas': df_consolidado['Consultas_Comparecidas'].sum(),
-        'total_fechamentos': df_consolidado['Fechamentos_Totais'].sum(),
-        'total_faturamento': df_consolidado['Faturamento'].sum(),
-        'total_investimento': df_consolidado['Valor_Investido_Total'].sum(),
-        'roas_medio': (df_consolidado['Faturamento'].sum() / df_consolidado['Valor_Investido_Total'].sum()) if df_consolidado['Valor_Investido_Total'].sum() > 0 else 0,
-        'custo_por_lead_medio': (df_consolidado['Valor_Investido_Total'].sum() / df_consolidado['Leads_Totais'].sum()) if df_consolidado['Leads_Totais'].sum() > 0 else 0,
-        'ticket_medio': (df_consolidado['Faturamento'].sum() / df_consolidado['Fechamentos_Totais'].sum()) if df_consolidado['Fechamentos_Totais'].sum() > 0 else 0,
-        'clinicas_ativas': len(set(df_consolidado['Cliente_ID'])),
-        'meses_ativos': len(set(df_consolidado['Meses']))
-    }
-    
     # KPIs principais consolidados com design moderno
     st.markdown("### Métricas Principais")
     
@@ -641,25 +652,25 @@ def create_admin_consolidated_dashboard():
     
     with col1:
         create_metric_card(
-            value=f"{metrics['total_leads']:,.0f}".replace(",", "."),
+            value=f"{metrics.leads_totais:,.0f}".replace(",", "."),
             label="Total de Leads"
         )
     
     with col2:
         create_metric_card(
-            value=f"R$ {metrics['total_faturamento']:,.0f}".replace(",", "."),
+            value=f"R$ {metrics.faturamento:,.0f}".replace(",", "."),
             label="Faturamento Total"
         )
     
     with col3:
         create_metric_card(
-            value=f"{metrics['roas_medio']:.1f}x",
+            value=f"{metrics.roas:.1f}x",
             label="ROAS Médio"
         )
     
     with col4:
         create_metric_card(
-            value=f"{metrics['clinicas_ativas']}",
+            value=f"{metrics.clinicas_ativas}",
             label="Clínicas Ativas"
         )
     
@@ -668,56 +679,49 @@ def create_admin_consolidated_dashboard():
     
     with col5:
         create_metric_card(
-            value=f"{metrics['total_consultas_marcadas']:,.0f}".replace(",", "."),
+            value=f"{metrics.consultas_marcadas_totais:,.0f}".replace(",", "."),
             label="Consultas Marcadas"
         )
     
     with col6:
         create_metric_card(
-            value=f"{metrics['total_fechamentos']:,.0f}".replace(",", "."),
+            value=f"{metrics.fechamentos_totais:,.0f}".replace(",", "."),
             label="Fechamentos"
         )
     
     with col7:
         create_metric_card(
-            value=f"R$ {metrics['custo_por_lead_medio']:,.0f}".replace(",", "."),
+            value=f"R$ {metrics.custo_por_lead_total:,.0f}".replace(",", "."),
             label="Custo por Lead Médio"
         )
     
     with col8:
         create_metric_card(
-            value=f"R$ {metrics['ticket_medio']:,.0f}".replace(",", "."),
+            value=f"R$ {metrics.ticket_medio:,.0f}".replace(",", "."),
             label="Ticket Médio"
         )
     
     # Gráfico de evolução mensal consolidada
     st.subheader("📈 Evolução Mensal Consolidada")
     
-    monthly_data = admin_dashboard_crud.get_monthly_evolution()
-    if monthly_data:
-        df_monthly = pd.DataFrame(monthly_data)
-        
-        # Ordena os meses corretamente
-        mes_order = {
-            'Janeiro': 1, 'Fevereiro': 2, 'Março': 3, 'Abril': 4,
-            'Maio': 5, 'Junho': 6, 'Julho': 7, 'Agosto': 8,
-            'Setembro': 9, 'Outubro': 10, 'Novembro': 11, 'Dezembro': 12
-        }
-        df_monthly['mes_order'] = df_monthly['mes'].map(mes_order)
-        df_monthly = df_monthly.sort_values(['ano', 'mes_order']).drop('mes_order', axis=1)
+    def construir_evolucao():
+        monthly_data = admin_dashboard_crud.get_monthly_evolution(meses_selecionados)
+        if not monthly_data:
+            return None
+        df_monthly = pd.DataFrame(monthly_data)  # Já em ordem cronológica
         
         # Cria gráfico de evolução
         fig_evolution = go.Figure()
         
         fig_evolution.add_trace(go.Scatter(
-            x=df_monthly['mes'] + ' ' + df_monthly['ano'].astype(str),
+            x=rotulo_periodo(df_monthly, 'mes', 'ano'),
             y=df_monthly['total_leads'],
             name='Leads',
             line=dict(color='#1f77b4', width=3)
         ))
         
         fig_evolution.add_trace(go.Scatter(
-            x=df_monthly['mes'] + ' ' + df_monthly['ano'].astype(str),
+            x=rotulo_periodo(df_monthly, 'mes', 'ano'),
             y=df_monthly['total_faturamento'],
             name='Faturamento',
             line=dict(color='#2ca02c', width=3),
@@ -731,9 +735,9 @@ def create_admin_consolidated_dashboard():
             yaxis2=dict(title="Faturamento (R$)", overlaying="y", side="right"),
             height=400
         )
-        
-        st.plotly_chart(fig_evolution)
-    else:
+        return fig_evolution
+    
+    if mostrar_grafico('evolucao_mensal', construir_evolucao, escopo_admin) is None:
         st.info("Nenhum dado mensal encontrado para exibir evolução.")
     
     st.markdown("---")
@@ -741,63 +745,67 @@ def create_admin_consolidated_dashboard():
     # Comparativo entre clínicas
     st.subheader("🏥 Comparativo entre Clínicas")
     
-    clinics_data = admin_dashboard_crud.get_clinics_comparison()
+    clinics_data = admin_dashboard_crud.get_clinics_comparison(meses_selecionados)
     if clinics_data:
         df_clinics = pd.DataFrame(clinics_data)
         
         # Gráfico de barras comparativo - Leads vs Fechamentos (escalas similares)
-        fig_comparison = go.Figure()
-        
-        fig_comparison.add_trace(go.Bar(
-            x=df_clinics['nome_da_clinica'],
-            y=df_clinics['total_leads'],
-            name='Leads',
-            marker_color='#3B82F6',
-            text=df_clinics['total_leads'],
-            textposition='auto'
-        ))
-        
-        fig_comparison.add_trace(go.Bar(
-            x=df_clinics['nome_da_clinica'],
-            y=df_clinics['total_fechamentos'],
-            name='Fechamentos',
-            marker_color='#10B981',
-            text=df_clinics['total_fechamentos'],
-            textposition='auto'
-        ))
-        
-        fig_comparison.update_layout(
-            title="Comparativo de Performance entre Clínicas",
-            xaxis_title="Clínicas",
-            yaxis_title="Quantidade",
-            barmode='group',
-            height=400,
-            showlegend=True
-        )
+        def construir_comparativo():
+            fig_comparison = go.Figure()
+            
+            fig_comparison.add_trace(go.Bar(
+                x=df_clinics['nome_da_clinica'],
+                y=df_clinics['total_leads'],
+                name='Leads',
+                marker_color='#3B82F6',
+                text=df_clinics['total_leads'],
+                textposition='auto'
+            ))
+            
+            fig_comparison.add_trace(go.Bar(
+                x=df_clinics['nome_da_clinica'],
+                y=df_clinics['total_fechamentos'],
+                name='Fechamentos',
+                marker_color='#10B981',
+                text=df_clinics['total_fechamentos'],
+                textposition='auto'
+            ))
+            
+            fig_comparison.update_layout(
+                title="Comparativo de Performance entre Clínicas",
+                xaxis_title="Clínicas",
+                yaxis_title="Quantidade",
+                barmode='group',
+                height=400,
+                showlegend=True
+            )
+            return fig_comparison
         
-        st.plotly_chart(fig_comparison)
+        mostrar_grafico('comparativo_clinicas', construir_comparativo, escopo_admin)
         
         # Gráfico de faturamento separado
         st.markdown("### 💰 Faturamento por Clínica")
-        fig_faturamento = go.Figure()
-        
-        fig_faturamento.add_trace(go.Bar(
-            x=df_clinics['nome_da_clinica'],
-            y=df_clinics['total_faturamento'],
-            name='Faturamento',
-            marker_color='#F59E0B',
-            text=[f"R$ {x:,.0f}".replace(",", ".") for x in df_clinics['total_faturamento']],
-            textposition='auto'
-        ))
-        
-        fig_faturamento.update_layout(
-            title="Faturamento Total por Clínica",
-            xaxis_title="Clínicas",
-            yaxis_title="Faturamento (R$)",
-            height=400
-        )
+        def construir_faturamento_clinicas():
+            fig_faturamento = go.Figure()
+            
+            fig_faturamento.add_trace(go.Bar(
+                x=df_clinics['nome_da_clinica'],
+                y=df_clinics['total_faturamento'],
+                name='Faturamento',
+                marker_color='#F59E0B',
+                text=[f"R$ {x:,.0f}".replace(",", ".") for x in df_clinics['total_faturamento']],
+                textposition='auto'
+            ))
+            
+            fig_faturamento.update_layout(
+                title="Faturamento Total por Clínica",
+                xaxis_title="Clínicas",
+                yaxis_title="Faturamento (R$)",
+                height=400
+            )
+            return fig_faturamento
         
-        st.plotly_chart(fig_faturamento)
+        mostrar_grafico('faturamento_por_clinica', construir_faturamento_clinicas, escopo_admin)
         
         # Tabela de ranking
         st.markdown("### 🏆 Ranking de Performance")
@@ -825,46 +833,50 @@ def create_admin_consolidated_dashboard():
     # Análise por canal
     st.subheader("📊 Análise por Canal de Marketing")
     
-    channel_data = admin_dashboard_crud.get_channel_analysis()
+    channel_data = admin_dashboard_crud.get_channel_analysis(meses_selecionados)
     if channel_data:
         # Gráfico de pizza para leads por canal
-        fig_pie = go.Figure(data=[go.Pie(
-            labels=['Google Ads', 'Meta Ads', 'Instagram Orgânico', 'Indicação', 'Origem Desconhecida'],
-            values=[
-                channel_data['leads_google'],
-                channel_data['leads_meta'],
-                channel_data['leads_instagram'],
-                channel_data['leads_indicacao'],
-                channel_data['leads_desconhecida']
-            ],
-            hole=0.3
-        )])
-        
-        fig_pie.update_layout(
-            title="Distribuição de Leads por Canal",
-            height=400
-        )
+        def construir_canais():
+            fig_pie = go.Figure(data=[go.Pie(
+                labels=['Google Ads', 'Meta Ads', 'Instagram Orgânico', 'Indicação', 'Origem Desconhecida'],
+                values=[
+                    channel_data['leads_google'],
+                    channel_data['leads_meta'],
+                    channel_data['leads_instagram'],
+                    channel_data['leads_indicacao'],
+                    channel_data['leads_desconhecida']
+                ],
+                hole=0.3
+            )])
+            
+            fig_pie.update_layout(
+                title="Distribuição de Leads por Canal",
+                height=400
+            )
+            return fig_pie
         
-        st.plotly_chart(fig_pie)
+        mostrar_grafico('leads_por_canal', construir_canais, escopo_admin)
         
         # Gráfico de investimento vs retorno
-        fig_investment = go.Figure()
-        
-        fig_investment.add_trace(go.Bar(
-            x=['Google Ads', 'Meta Ads'],
-            y=[channel_data['investimento_google'], channel_data['investimento_facebook']],
-            name='Investimento',
-            marker_color='#ff7f0e'
-        ))
-        
-        fig_investment.update_layout(
-            title="Investimento por Canal",
-            xaxis_title="Canal",
-            yaxis_title="Valor Investido (R$)",
-            height=300
-        )
+        def construir_investimento():
+            fig_investment = go.Figure()
+            
+            fig_investment.add_trace(go.Bar(
+                x=['Google Ads', 'Meta Ads'],
+                y=[channel_data['investimento_google'], channel_data['investimento_facebook']],
+                name='Investimento',
+                marker_color='#ff7f0e'
+            ))
+            
+            fig_investment.update_layout(
+                title="Investimento por Canal",
+                xaxis_title="Canal",
+                yaxis_title="Valor Investido (R$)",
+                height=300
+            )
+            return fig_investment
         
-        st.plotly_chart(fig_investment)
+        mostrar_grafico('investimento_por_canal', construir_investimento, escopo_admin)
     else:
         st.info("Nenhum dado de canais encontrado para análise.")
     
@@ -873,27 +885,12 @@ def create_admin_consolidated_dashboard():
     # Análise de Procedimentos Consolidada
     st.subheader("🏥 Análise de Procedimentos Consolidada")
     
-    # Busca dados de procedimentos de todas as clínicas
+    # Busca em uma única consulta os procedimentos de todas as clínicas para os meses selecionados
     from database import procedimento_crud
     
-    all_procedimentos_data = []
-    for cliente in clientes:
-        if not cliente.is_admin and cliente.ativo:
-            procedimentos = procedimento_crud.get_procedimentos_by_cliente(cliente.id)
-            if procedimentos:
-                df_procedimentos = procedimento_crud.procedimentos_to_dataframe(procedimentos)
-                # Filtra pelos meses selecionados
-                if 'Mes_Referencia' in df_procedimentos.columns:
-                    df_procedimentos_filtrado = df_procedimentos[df_procedimentos['Mes_Referencia'].isin(meses_selecionados)]
-                    if not df_procedimentos_filtrado.empty:
-                        df_procedimentos_filtrado['Cliente_ID'] = cliente.id
-                        df_procedimentos_filtrado['Nome_Clinica'] = cliente.nome_da_clinica
-                        all_procedimentos_data.append(df_procedimentos_filtrado)
-    
-    if all_procedimentos_data:
-        # Concatena todos os dados de procedimentos
-        df_procedimentos_consolidado = pd.concat(all_procedimentos_data, ignore_index=True)
-        
+    df_procedimentos_consolidado = procedimento_crud.get_procedimentos_consolidados(meses_selecionados)
+    
+    if not df_procedimentos_consolidado.empty:
         # Calcula métricas consolidadas de procedimentos
         procedimentos_metrics = {
             'total_procedimentos': len(df_procedimentos_consolidado),
@@ -946,49 +943,53 @@ def create_admin_consolidated_dashboard():
         
         with col_chart1:
             # Gráfico de quantidade de procedimentos
-            fig_procedimentos_qty = go.Figure()
-            fig_procedimentos_qty.add_trace(go.Bar(
-                x=procedimentos_por_clinica['Clinica'],
-                y=procedimentos_por_clinica['Total_Procedimentos'],
-                name='Procedimentos',
-                marker_color='#3B82F6',
-                text=procedimentos_por_clinica['Total_Procedimentos'],
-                textposition='auto'
-            ))
-            
-            fig_procedimentos_qty.update_layout(
-                title="Quantidade de Procedimentos por Clínica",
-                xaxis_title="Clínicas",
-                yaxis_title="Número de Procedimentos",
-                height=340,
-                margin=dict(t=60, b=40, l=20, r=20)
-            )
-            fig_procedimentos_qty.update_xaxes(tickangle=-20, categoryorder='total descending')
+            def construir_procedimentos_qtd():
+                fig_procedimentos_qty = go.Figure()
+                fig_procedimentos_qty.add_trace(go.Bar(
+                    x=procedimentos_por_clinica['Clinica'],
+                    y=procedimentos_por_clinica['Total_Procedimentos'],
+                    name='Procedimentos',
+                    marker_color='#3B82F6',
+                    text=procedimentos_por_clinica['Total_Procedimentos'],
+                    textposition='auto'
+                ))
+                
+                fig_procedimentos_qty.update_layout(
+                    title="Quantidade de Procedimentos por Clínica",
+                    xaxis_title="Clínicas",
+                    yaxis_title="Número de Procedimentos",
+                    height=340,
+                    margin=dict(t=60, b=40, l=20, r=20)
+                )
+                fig_procedimentos_qty.update_xaxes(tickangle=-20, categoryorder='total descending')
+                return fig_procedimentos_qty
             
-            st.plotly_chart(fig_procedimentos_qty)
+            mostrar_grafico('procedimentos_por_clinica', construir_procedimentos_qtd, escopo_admin)
         
         with col_chart2:
             # Gráfico de faturamento de procedimentos
-            fig_procedimentos_fat = go.Figure()
-            fig_procedimentos_fat.add_trace(go.Bar(
-                x=procedimentos_por_clinica['Clinica'],
-                y=procedimentos_por_clinica['Faturamento_Total'],
-                name='Faturamento',
-                marker_color='#10B981',
-                text=[f"R$ {x:,.0f}".replace(",", ".") for x in procedimentos_por_clinica['Faturamento_Total']],
-                textposition='auto'
-            ))
-            
-            fig_procedimentos_fat.update_layout(
-                title="Faturamento de Procedimentos por Clínica",
-                xaxis_title="Clínicas",
-                yaxis_title="Faturamento (R$)",
-                height=340,
-                margin=dict(t=60, b=40, l=20, r=20)
-            )
-            fig_procedimentos_fat.update_xaxes(tickangle=-20, categoryorder='total descending')
+            def construir_procedimentos_fat():
+                fig_procedimentos_fat = go.Figure()
+                fig_procedimentos_fat.add_trace(go.Bar(
+                    x=procedimentos_por_clinica['Clinica'],
+                    y=procedimentos_por_clinica['Faturamento_Total'],
+                    name='Faturamento',
+                    marker_color='#10B981',
+                    text=[f"R$ {x:,.0f}".replace(",", ".") for x in procedimentos_por_clinica['Faturamento_Total']],
+                    textposition='auto'
+                ))
+                
+                fig_procedimentos_fat.update_layout(
+                    title="Faturamento de Procedimentos por Clínica",
+                    xaxis_title="Clínicas",
+                    yaxis_title="Faturamento (R$)",
+                    height=340,
+                    margin=dict(t=60, b=40, l=20, r=20)
+                )
+                fig_procedimentos_fat.update_xaxes(tickangle=-20, categoryorder='total descending')
+                return fig_procedimentos_fat
             
-            st.plotly_chart(fig_procedimentos_fat)
+            mostrar_grafico('faturamento_procedimentos', construir_procedimentos_fat, escopo_admin)
         
         # Análise por tipo de procedimento
         if 'Tipo' in df_procedimentos_consolidado.columns and df_procedimentos_consolidado['Tipo'].notna().any():
@@ -1005,91 +1006,90 @@ def create_admin_consolidated_dashboard():
             
             with col_tipo1:
                 # Gráfico de pizza - distribuição por tipo
-                fig_tipo_pie = go.Figure(data=[go.Pie(
-                    labels=tipo_analysis['Tipo'],
-                    values=tipo_analysis['Quantidade'],
-                    hole=0.3
-                )])
+                def construir_tipo_pizza():
+                    fig_tipo_pie = go.Figure(data=[go.Pie(
+                        labels=tipo_analysis['Tipo'],
+                        values=tipo_analysis['Quantidade'],
+                        hole=0.3
+                    )])
+                    
+                    fig_tipo_pie.update_layout(
+                        title="Distribuição por Tipo de Procedimento",
+                        height=320,
+                        margin=dict(t=60, b=20, l=20, r=20)
+                    )
+                    return fig_tipo_pie
                 
-                fig_tipo_pie.update_layout(
-                    title="Distribuição por Tipo de Procedimento",
-                    height=320,
-                    margin=dict(t=60, b=20, l=20, r=20)
-                )
-                
-                st.plotly_chart(fig_tipo_pie)
+                mostrar_grafico('procedimentos_por_tipo', construir_tipo_pizza, escopo_admin)
             
             with col_tipo2:
                 # Gráfico de barras - faturamento por tipo
-                fig_tipo_bar = go.Figure()
-                fig_tipo_bar.add_trace(go.Bar(
-                    x=tipo_analysis['Tipo'],
-                    y=tipo_analysis['Faturamento'],
-                    name='Faturamento',
-                    marker_color='#F59E0B',
-                    text=[f"R$ {x:,.0f}".replace(",", ".") for x in tipo_analysis['Faturamento']],
-                    textposition='auto'
-                ))
+                def construir_tipo_barras():
+                    fig_tipo_bar = go.Figure()
+                    fig_tipo_bar.add_trace(go.Bar(
+                        x=tipo_analysis['Tipo'],
+                        y=tipo_analysis['Faturamento'],
+                        name='Faturamento',
+                        marker_color='#F59E0B',
+                        text=[f"R$ {x:,.0f}".replace(",", ".") for x in tipo_analysis['Faturamento']],
+                        textposition='auto'
+                    ))
+                    
+                    fig_tipo_bar.update_layout(
+                        title="Faturamento por Tipo de Procedimento",
+                        xaxis_title="Tipo",
+                        yaxis_title="Faturamento (R$)",
+                        height=320,
+                        margin=dict(t=60, b=40, l=20, r=20)
+                    )
+                    fig_tipo_bar.update_xaxes(tickangle=-20)
+                    return fig_tipo_bar
                 
-                fig_tipo_bar.update_layout(
-                    title="Faturamento por Tipo de Procedimento",
-                    xaxis_title="Tipo",
-                    yaxis_title="Faturamento (R$)",
-                    height=320,
-                    margin=dict(t=60, b=40, l=20, r=20)
-                )
-                fig_tipo_bar.update_xaxes(tickangle=-20)
-                
-                st.plotly_chart(fig_tipo_bar)
+                mostrar_grafico('faturamento_por_tipo', construir_tipo_barras, escopo_admin)
         
-        # Análise temporal de procedimentos
+        # Análise temporal de procedimentos: agregada e ordenada por (ano, número do mês) no banco
         if 'Mes_Referencia' in df_procedimentos_consolidado.columns:
             st.markdown("### 📅 Evolução Temporal de Procedimentos")
             
-            procedimentos_mensais = df_procedimentos_consolidado.groupby('Mes_Referencia').agg({
-                'Procedimento': 'count',
-                'Valor_da_Venda': 'sum'
-            }).reset_index()
-            procedimentos_mensais.columns = ['Mes', 'Quantidade', 'Faturamento']
-            
-            # Ordena os meses corretamente
-            mes_order = {
-                'Janeiro': 1, 'Fevereiro': 2, 'Março': 3, 'Abril': 4,
-                'Maio': 5, 'Junho': 6, 'Julho': 7, 'Agosto': 8,
-                'Setembro': 9, 'Outubro': 10, 'Novembro': 11, 'Dezembro': 12
-            }
-            procedimentos_mensais['mes_order'] = procedimentos_mensais['Mes'].map(mes_order)
-            procedimentos_mensais = procedimentos_mensais.sort_values('mes_order').drop('mes_order', axis=1)
-            
-            fig_procedimentos_temporal = go.Figure()
-            
-            fig_procedimentos_temporal.add_trace(go.Scatter(
-                x=procedimentos_mensais['Mes'],
-                y=procedimentos_mensais['Quantidade'],
-                name='Quantidade de Procedimentos',
-                line=dict(color='#3B82F6', width=3),
-                mode='lines+markers'
-            ))
-            
-            fig_procedimentos_temporal.add_trace(go.Scatter(
-                x=procedimentos_mensais['Mes'],
-                y=procedimentos_mensais['Faturamento'],
-                name='Faturamento (R$)',
-                line=dict(color='#10B981', width=3),
-                mode='lines+markers',
-                yaxis='y2'
-            ))
-            
-            fig_procedimentos_temporal.update_layout(
-                title="Evolução Mensal de Procedimentos",
-                xaxis_title="Meses",
-                yaxis_title="Quantidade de Procedimentos",
-                yaxis2=dict(title="Faturamento (R$)", overlaying="y", side="right"),
-                height=360,
-                margin=dict(t=60, b=40, l=20, r=20)
-            )
+            def construir_procedimentos_temporal():
+                procedimentos_mensais = pd.DataFrame(procedimento_crud.get_evolucao_procedimentos(meses_selecionados))
+                if procedimentos_mensais.empty:
+                    return None
+                procedimentos_mensais = procedimentos_mensais.rename(
+                    columns={'quantidade': 'Quantidade', 'faturamento': 'Faturamento'}
+                )
+                procedimentos_mensais['Mes'] = rotulo_periodo(procedimentos_mensais, 'mes', 'ano')
+                
+                fig_procedimentos_temporal = go.Figure()
+                
+                fig_procedimentos_temporal.add_trace(go.Scatter(
+                    x=procedimentos_mensais['Mes'],
+                    y=procedimentos_mensais['Quantidade'],
+                    name='Quantidade de Procedimentos',
+                    line=dict(color='#3B82F6', width=3),
+                    mode='lines+markers'
+                ))
+                
+                fig_procedimentos_temporal.add_trace(go.Scatter(
+                    x=procedimentos_mensais['Mes'],
+                    y=procedimentos_mensais['Faturamento'],
+                    name='Faturamento (R$)',
+                    line=dict(color='#10B981', width=3),
+                    mode='lines+markers',
+                    yaxis='y2'
+                ))
+                
+                fig_procedimentos_temporal.update_layout(
+                    title="Evolução Mensal de Procedimentos",
+                    xaxis_title="Meses",
+                    yaxis_title="Quantidade de Procedimentos",
+                    yaxis2=dict(title="Faturamento (R$)", overlaying="y", side="right"),
+                    height=360,
+                    margin=dict(t=60, b=40, l=20, r=20)
+                )
+                return fig_procedimentos_temporal
             
-            st.plotly_chart(fig_procedimentos_temporal)
+            mostrar_grafico('evolucao_procedimentos', construir_procedimentos_temporal, escopo_admin)
         
         # Tabela de ranking de procedimentos
         st.markdown("### 🏆 Ranking de Procedimentos por Clínica")
@@ -1112,54 +1112,57 @@ def create_admin_consolidated_dashboard():
     else:
         st.info("Nenhum dado de procedimentos encontrado para análise consolidada.")
 
+    # Uso do pool de conexões do processo (todas as sessões abertas no servidor)
+    from database import db_manager
+
+    with st.expander("🔌 Conexões com o Banco de Dados"):
+        pool = db_manager.get_pool_metrics()
+        col_pool1, col_pool2, col_pool3, col_pool4 = st.columns(4)
+        with col_pool1:
+            st.metric("Em uso", f"{pool['em_uso']}/{pool.get('limite', '-')}", delta=f"Pico: {pool['pico_em_uso']}", delta_color="off")
+        with col_pool2:
+            st.metric("Espera média", f"{pool['espera_media_ms']:.1f} ms", delta=f"Máxima: {pool['espera_maxima_ms']:.0f} ms", delta_color="off")
+        with col_pool3:
+            st.metric("Timeouts", pool['timeouts'])
+        with col_pool4:
+            st.metric("Checkouts", f"{pool['checkouts']:,}".replace(",", "."), delta=f"{pool['conexoes_criadas']} conexões abertas", delta_color="off")
+
 def create_executive_summary(df_filtered):
     """Cria seção de resumo executivo com 10 KPIs mais importantes"""
     st.subheader("🎯 Resumo Executivo - Visão Geral")
     
-    df_ativos = df_filtered[(df_filtered['Leads_Totais'] > 0) | (df_filtered['Faturamento'] > 0) | (df_filtered['Valor_Investido_Total'] > 0)]
+    df_ativos = kpis.meses_ativos(df_filtered)
     
     if df_ativos.empty:
         st.warning("Nenhum dado ativo para resumo executivo.")
         return
     
-    # Ordena por mês para comparação
-    df_ativos = df_ativos.sort_values('Meses')
-    
     # Calcula métricas principais
-    total_leads = df_ativos['Leads_Totais'].sum()
-    total_faturamento = df_ativos['Faturamento'].sum()
-    total_fechamentos = df_ativos['Fechamentos_Totais'].sum()
-    total_investimento = df_ativos['Valor_Investido_Total'].sum()
-    total_consultas_marcadas = df_ativos['Consultas_Marcadas_Totais'].sum()
-    total_consultas_comparecidas = df_ativos['Consultas_Comparecidas'].sum()
+    totais = kpis.totais(df_ativos)
+    total_leads = totais.leads_totais
+    total_faturamento = totais.faturamento
+    total_fechamentos = totais.fechamentos_totais
+    total_consultas_marcadas = totais.consultas_marcadas_totais
+    total_consultas_comparecidas = totais.consultas_comparecidas
     
     # Métricas calculadas
-    roas = total_faturamento / total_investimento if total_investimento > 0 else 0
-    taxa_conversao_leads = (total_fechamentos / total_leads * 100) if total_leads > 0 else 0
-    taxa_comparecimento = (total_consultas_comparecidas / total_consultas_marcadas * 100) if total_consultas_marcadas > 0 else 0
-    ticket_medio = total_faturamento / total_fechamentos if total_fechamentos > 0 else 0
-    custo_por_lead = total_investimento / total_leads if total_leads > 0 else 0
+    roas = totais.roas
+    taxa_conversao_leads = totais.conversao_fechamento_leads
+    taxa_comparecimento = totais.conversao_csc_csm
+    ticket_medio = totais.ticket_medio
+    custo_por_lead = totais.custo_por_lead_total
     
-    # Comparação com mês anterior (se houver mais de 1 mês)
+    # Comparação com mês anterior (se houver mais de 1 mês); as linhas já vêm em ordem cronológica
     comparacao_mes_anterior = {}
     if len(df_ativos) > 1:
         mes_atual = df_ativos.iloc[-1]
         mes_anterior = df_ativos.iloc[-2]
         
-        # Calcula ROAS de forma segura
-        roas_atual = mes_atual['Faturamento'] / mes_atual['Valor_Investido_Total'] if mes_atual['Valor_Investido_Total'] > 0 else 0
-        roas_anterior = mes_anterior['Faturamento'] / mes_anterior['Valor_Investido_Total'] if mes_anterior['Valor_Investido_Total'] > 0 else 0
-        
-        # Calcula variação de ROAS de forma segura
-        variacao_roas = 0
-        if roas_anterior > 0:
-            variacao_roas = ((roas_atual - roas_anterior) / roas_anterior) * 100
-        
         comparacao_mes_anterior = {
-            'leads': ((mes_atual['Leads_Totais'] - mes_anterior['Leads_Totais']) / mes_anterior['Leads_Totais'] * 100) if mes_anterior['Leads_Totais'] > 0 else 0,
-            'faturamento': ((mes_atual['Faturamento'] - mes_anterior['Faturamento']) / mes_anterior['Faturamento'] * 100) if mes_anterior['Faturamento'] > 0 else 0,
-            'fechamentos': ((mes_atual['Fechamentos_Totais'] - mes_anterior['Fechamentos_Totais']) / mes_anterior['Fechamentos_Totais'] * 100) if mes_anterior['Fechamentos_Totais'] > 0 else 0,
-            'roas': variacao_roas
+            'leads': kpis.variacao(mes_atual['Leads_Totais'], mes_anterior['Leads_Totais']),
+            'faturamento': kpis.variacao(mes_atual['Faturamento'], mes_anterior['Faturamento']),
+            'fechamentos': kpis.variacao(mes_atual['Fechamentos_Totais'], mes_anterior['Fechamentos_Totais']),
+            'roas': kpis.variacao(mes_atual['ROAS'], mes_anterior['ROAS'])
         }
     
     # Função para criar alertas visuais
@@ -1445,42 +1448,41 @@ def create_procedimentos_analysis(df_procedimentos):
     # Análise temporal
     st.markdown("### 📅 Evolução Mensal")
     
+    # Agrupa por (ano, mês) na ordem cronológica em que os procedimentos vêm do banco
+    if 'Mes_Referencia' in df_procedimentos.columns:
+        por_mes = df_procedimentos.groupby(['Ano_Referencia', 'Mes_Referencia'], sort=False).agg(
+            Quantidade=('Procedimento', 'size'), Faturamento=('Valor_da_Venda', 'sum')
+        ).reset_index()
+        rotulos = rotulo_periodo(por_mes, 'Mes_Referencia', 'Ano_Referencia')
+    
     col1, col2 = st.columns(2)
     
     with col1:
         # Procedimentos por mês
         if 'Mes_Referencia' in df_procedimentos.columns:
-            procedimentos_mes = df_procedimentos['Mes_Referencia'].value_counts()
             fig_mes = px.bar(
-                x=procedimentos_mes.index,
-                y=procedimentos_mes.values,
+                x=rotulos,
+                y=por_mes['Quantidade'],
                 title="Quantidade por Mês",
-                color=procedimentos_mes.values,
+                color=por_mes['Quantidade'],
                 color_continuous_scale='Blues',
-                text=procedimentos_mes.values
+                text=por_mes['Quantidade']
             )
             fig_mes.update_layout(showlegend=False, height=300, margin=dict(t=60, b=40, l=20, r=20))
-            fig_mes.update_xaxes(categoryorder='array', categoryarray=[
-                'Janeiro','Fevereiro','Março','Abril','Maio','Junho','Julho','Agosto','Setembro','Outubro','Novembro','Dezembro'
-            ])
             st.plotly_chart(fig_mes)
     
     with col2:
         # Faturamento por mês
         if 'Mes_Referencia' in df_procedimentos.columns:
-            faturamento_mes = df_procedimentos.groupby('Mes_Referencia')['Valor_da_Venda'].sum()
             fig_faturamento_mes = px.bar(
-                x=faturamento_mes.index,
-                y=faturamento_mes.values,
+                x=rotulos,
+                y=por_mes['Faturamento'],
                 title="Faturamento por Mês",
-                color=faturamento_mes.values,
+                color=por_mes['Faturamento'],
                 color_continuous_scale='Greens',
-                text=[f"R$ {x:,.0f}".replace(",", ".") for x in faturamento_mes.values]
+                text=[f"R$ {x:,.0f}".replace(",", ".") for x in por_mes['Faturamento']]
             )
             fig_faturamento_mes.update_layout(showlegend=False, height=300, margin=dict(t=60, b=40, l=20, r=20))
-            fig_faturamento_mes.update_xaxes(categoryorder='array', categoryarray=[
-                'Janeiro','Fevereiro','Março','Abril','Maio','Junho','Julho','Agosto','Setembro','Outubro','Novembro','Dezembro'
-            ])
             st.plotly_chart(fig_faturamento_mes)
     
     # Análise de formas de pagamento
@@ -1570,43 +1572,55 @@ def create_procedimentos_analysis(df_procedimentos):
         hide_index=True
     )
 
-def load_data_from_database(cliente_id: int, meses_selecionados: list = None) -> pd.DataFrame:
+def load_data_from_database(cliente_id: int, meses_selecionados: list = None,
+                            inicio: tuple = None, fim: tuple = None) -> pd.DataFrame:
     """
     Carrega dados do banco de dados para um cliente específico
     
     Args:
         cliente_id: ID do cliente
         meses_selecionados: Lista de meses para filtrar (opcional)
+        inicio: Primeiro período (ano, mês) a carregar (opcional)
+        fim: Último período (ano, mês) a carregar (opcional)
     
     Returns:
         pd.DataFrame: DataFrame com os dados do dashboard
     """
     from database import dados_crud
+    from cache import clinic_cache
     
-    if meses_selecionados:
-        dados = dados_crud.get_dados_by_cliente_and_period(cliente_id, meses_selecionados)
-    else:
-        dados = dados_crud.get_dados_by_cliente(cliente_id)
-    
-    return dados_crud.dados_to_dataframe(dados)
+    meses = tuple(meses_selecionados) if meses_selecionados else None
+    return clinic_cache.get_or_load(
+        cliente_id,
+        ('dados', meses, inicio, fim),
+        lambda: dados_crud.get_dataframe_by_cliente(cliente_id, list(meses) if meses else None, inicio, fim)
+    )
 
-def load_procedimentos_from_database(cliente_id: int, meses_selecionados: list = None) -> pd.DataFrame:
+def load_procedimentos_from_database(cliente_id: int, meses_selecionados: list = None,
+                                     inicio: tuple = None, fim: tuple = None) -> pd.DataFrame:
     """
     Carrega dados de procedimentos do banco de dados para um cliente específico
     
     Args:
         cliente_id: ID do cliente
         meses_selecionados: Lista de meses para filtrar (opcional)
+        inicio: Primeiro período (ano, mês) a carregar (opcional)
+        fim: Último período (ano, mês) a carregar (opcional)
     
     Returns:
         pd.DataFrame: DataFrame com os dados de procedimentos
     """
     from database import procedimento_crud
+    from cache import clinic_cache
     
-    if meses_selecionados:
-        procedimentos = procedimento_crud.get_procedimentos_by_period(cliente_id, meses_selecionados)
-    else:
-        procedimentos = procedimento_crud.get_procedimentos_by_cliente(cliente_id)
+    meses = tuple(meses_selecionados) if meses_selecionados else None
+    
+    def carregar():
+        if meses or inicio or fim:
+            procedimentos = procedimento_crud.get_procedimentos_by_range(cliente_id, inicio, fim, list(meses) if meses else None)
+        else:
+            procedimentos = procedimento_crud.get_procedimentos_by_cliente(cliente_id)
+        return procedimento_crud.procedimentos_to_dataframe(procedimentos)
     
-    return procedimento_crud.procedimentos_to_dataframe(procedimentos)
+    return clinic_cache.get_or_load(cliente_id, ('procedimentos', meses, inicio, fim), carregar)
 
@@ -4,52 +4,520 @@ Gerencia a conexão com SQLite e operações CRUD.
 """
 
 import os
+import threading
+import time
+from contextlib import contextmanager
 import pandas as pd
-import numpy as np
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text, insert, update, delete, select, func, literal, tuple_, cast, and_, or_, DateTime, String
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.exc import SQLAlchemyError
-from typing import Optional, List, Dict, Any
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 import bcrypt
+from dataclasses import dataclass
 from datetime import datetime
 from dotenv import load_dotenv
 
-from models import Base, Cliente, DadosDashboard, Procedimento
+from models import (
+    Base, Cliente, DadosDashboard, Procedimento, EstadoSincronizacao, ResumoMensal,
+    ClienteLeitura, DadosDashboardLeitura, ProcedimentoLeitura
+)
+from cache import clinic_cache
+from kpis import RAZOES, Totais, calcular_kpis
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
+# Ano gravado pelos importadores quando a planilha não informa o ano
+ANO_REFERENCIA = int(os.getenv('ANO_REFERENCIA', '2024'))
+
+@dataclass(frozen=True)
+class PerfilEngine:
+    """Configuração do pool de conexões e dos timeouts do banco"""
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0  # Segundos esperando uma conexão livre
+    pool_recycle: int = 1800  # Segundos até reabrir a conexão (-1 desativa)
+    pool_pre_ping: bool = True
+    statement_timeout_ms: int = 30000  # PostgreSQL (0 desativa)
+    sqlite_journal_mode: Optional[str] = None  # None mantém o modo do arquivo (WAL só por opção)
+    sqlite_synchronous: Optional[str] = None  # None mantém o padrão do SQLite (NORMAL só é seguro com WAL)
+    sqlite_busy_timeout: float = 30.0  # Segundos esperando o lock de escrita do SQLite
+
+    @classmethod
+    def do_ambiente(cls) -> 'PerfilEngine':
+        """Lê o perfil das variáveis de ambiente DB_*, mantendo o padrão das ausentes"""
+        return cls(
+            pool_size=int(os.getenv('DB_POOL_SIZE', cls.pool_size)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', cls.max_overflow)),
+            pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', cls.pool_timeout)),
+            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', cls.pool_recycle)),
+            pool_pre_ping=os.getenv('DB_POOL_PRE_PING', str(cls.pool_pre_ping)).lower() == 'true',
+            statement_timeout_ms=int(os.getenv('DB_STATEMENT_TIMEOUT_MS', cls.statement_timeout_ms)),
+            sqlite_journal_mode=os.getenv('DB_SQLITE_JOURNAL_MODE') or cls.sqlite_journal_mode,
+            sqlite_synchronous=os.getenv('DB_SQLITE_SYNCHRONOUS') or cls.sqlite_synchronous,
+            sqlite_busy_timeout=float(os.getenv('DB_SQLITE_BUSY_TIMEOUT', cls.sqlite_busy_timeout)),
+        )
+
+def opcoes_engine(database_url: str, perfil: PerfilEngine) -> Dict[str, Any]:
+    """
+    Monta os argumentos de create_engine para o banco e o perfil informados
+
+    SQLite em arquivo e bancos em servidor usam um pool com tamanho e espera limitados
+    (compartilhado pelas sessões do Streamlit, que rodam em threads do mesmo processo).
+    SQLite em memória mantém o pool padrão, com uma conexão por thread.
+    """
+    url = make_url(database_url)
+    opcoes: Dict[str, Any] = {'echo': False}
+    connect_args: Dict[str, Any] = {}
+
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return opcoes
+        connect_args.update(check_same_thread=False, timeout=perfil.sqlite_busy_timeout)
+    else:
+        opcoes.update(pool_recycle=perfil.pool_recycle, pool_pre_ping=perfil.pool_pre_ping)
+        if url.get_backend_name() == 'postgresql' and perfil.statement_timeout_ms > 0:
+            connect_args['options'] = f"-c statement_timeout={perfil.statement_timeout_ms}"
+
+    opcoes.update(
+        poolclass=QueuePoolMedido,
+        pool_size=perfil.pool_size,
+        max_overflow=perfil.max_overflow,
+        pool_timeout=perfil.pool_timeout,
+        connect_args=connect_args
+    )
+    return opcoes
+
+class MetricasPool:
+    """Contadores de uso e de espera do pool de conexões"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.conexoes_criadas = 0
+        self.checkouts = 0
+        self.em_uso = 0
+        self.pico_em_uso = 0
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.timeouts = 0
+
+    def registrar_conexao(self):
+        with self._lock:
+            self.conexoes_criadas += 1
+
+    def registrar_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.em_uso += 1
+            self.pico_em_uso = max(self.pico_em_uso, self.em_uso)
+
+    def registrar_checkin(self):
+        with self._lock:
+            self.em_uso = max(0, self.em_uso - 1)
+
+    def registrar_espera(self, segundos: float, timeout: bool = False):
+        with self._lock:
+            self.esperas += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+            if timeout:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Cópia dos contadores, com os tempos de espera em milissegundos
+
+        A espera de um checkout inclui a abertura de uma conexão nova quando nenhuma está livre;
+        esperas longas ou timeouts indicam o pool saturado.
+        """
+        with self._lock:
+            return {
+                'conexoes_criadas': self.conexoes_criadas,
+                'checkouts': self.checkouts,
+                'em_uso': self.em_uso,
+                'pico_em_uso': self.pico_em_uso,
+                'espera_media_ms': self.espera_total / self.esperas * 1000 if self.esperas else 0.0,
+                'espera_maxima_ms': self.espera_maxima * 1000,
+                'timeouts': self.timeouts,
+            }
+
+class QueuePoolMedido(QueuePool):
+    """QueuePool que mede quanto cada checkout esperou por uma conexão livre"""
+
+    metricas: Optional[MetricasPool] = None
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except PoolTimeoutError:
+            if self.metricas is not None:
+                self.metricas.registrar_espera(time.perf_counter() - inicio, timeout=True)
+            raise
+        if self.metricas is not None:
+            self.metricas.registrar_espera(time.perf_counter() - inicio)
+        return conexao
+
+    def recreate(self):
+        # engine.dispose() recria o pool: as métricas continuam acumulando no novo
+        pool = super().recreate()
+        pool.metricas = self.metricas
+        return pool
+
+class UnidadeDeTrabalho:
+    """Sessão compartilhada pelas operações do CRUD de uma renderização da página ou de uma sincronização"""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.statements = 0
+        self._inicio = time.perf_counter()
+
+    @property
+    def duracao(self) -> float:
+        """Segundos desde o início da unidade de trabalho"""
+        return time.perf_counter() - self._inicio
+
+# Período de referência: (ano, número do mês), ex.: (2024, 10) para Outubro/2024
+Periodo = Tuple[int, int]
+
+# Mapeamento coluna do DataFrame -> atributo do modelo DadosDashboard
+COLUNAS_DADOS_DATAFRAME = {
+    'Cliente_ID': 'cliente_id',
+    'Meses': 'mes',
+    'Ano': 'ano',
+    'Leads_Totais': 'leads_totais',
+    'Leads_Google_Ads': 'leads_google_ads',
+    'Leads_Meta_Ads': 'leads_meta_ads',
+    'Leads_Instagram_Organico': 'leads_instagram_organico',
+    'Leads_Indicacao': 'leads_indicacao',
+    'Leads_Origem_Desconhecida': 'leads_origem_desconhecida',
+
+    'Consultas_Marcadas_Totais': 'consultas_marcadas_totais',
+    'Consultas_Marcadas_Google_Ads': 'consultas_marcadas_google_ads',
+    'Consultas_Marcadas_Meta_Ads': 'consultas_marcadas_meta_ads',
+    'Consultas_Marcadas_IG_Organico': 'consultas_marcadas_ig_organico',
+    'Consultas_Marcadas_Indicacao': 'consultas_marcadas_indicacao',
+    'Consultas_Marcadas_Outros': 'consultas_marcadas_outros',
+
+    'Consultas_Comparecidas': 'consultas_comparecidas',
+    'Fechamentos_Totais': 'fechamentos_totais',
+    'Fechamentos_Google_Ads': 'fechamentos_google_ads',
+    'Fechamentos_Meta_Ads': 'fechamentos_meta_ads',
+    'Fechamentos_IG_Organico': 'fechamentos_ig_organico',
+    'Fechamentos_Indicacao': 'fechamentos_indicacao',
+    'Fechamentos_Outros': 'fechamentos_outros',
+
+    'Faturamento': 'faturamento',
+    'Valor_Investido_Total': 'valor_investido_total',
+    'Orcamento_Previsto_Total': 'orcamento_previsto_total',
+    'Orcamento_Realizado_Facebook': 'orcamento_realizado_facebook',
+    'Orcamento_Previsto_Facebook': 'orcamento_previsto_facebook',
+    'Orcamento_Realizado_Google': 'orcamento_realizado_google',
+    'Orcamento_Previsto_Google': 'orcamento_previsto_google',
+}
+
+# Campos de DadosDashboard gravados pela sincronização com o Google Sheets
+CAMPOS_SINCRONIZADOS = [attr for attr in COLUNAS_DADOS_DATAFRAME.values() if attr not in ('cliente_id', 'mes', 'ano')]
+
+# Mapeamento coluna do DataFrame -> atributo do modelo Procedimento
+COLUNAS_PROCEDIMENTOS_DATAFRAME = {
+    'ID': 'id',
+    'Cliente_ID': 'cliente_id',
+    'Data_Primeiro_Contato': 'data_primeiro_contato',
+    'Data_Compareceu_Consulta': 'data_compareceu_consulta',
+    'Data_Fechou_Cirurgia': 'data_fechou_cirurgia',
+    'Procedimento': 'procedimento',
+    'Tipo': 'tipo',
+    'Quantidade_na_Mesma_Venda': 'quantidade_na_mesma_venda',
+    'Forma_Pagamento': 'forma_pagamento',
+    'Valor_da_Venda': 'valor_da_venda',
+    'Valor_Parcelado': 'valor_parcelado',
+    'Mes_Referencia': 'mes_referencia',
+    'Ano_Referencia': 'ano_referencia',
+    'Data_Criacao': 'data_criacao',
+}
+
+# Chave natural de DadosDashboard (índice único uq_dados_dashboard_cliente_ano_mes)
+CHAVE_DADOS_DASHBOARD = ['cliente_id', 'ano', 'mes']
+
+# Campos de DadosDashboard somados por mês na tabela resumo_mensal
+CAMPOS_RESUMO_MENSAL = [
+    'leads_totais', 'leads_google_ads', 'leads_meta_ads', 'leads_instagram_organico',
+    'leads_indicacao', 'leads_origem_desconhecida',
+    'consultas_marcadas_totais', 'consultas_comparecidas', 'fechamentos_totais',
+    'faturamento', 'valor_investido_total', 'orcamento_realizado_facebook', 'orcamento_realizado_google',
+]
+
+# INSERT com suporte a ON CONFLICT por dialeto
+INSERT_ON_CONFLICT = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+@dataclass(frozen=True)
+class MetricasConsolidadas(Totais):
+    """Métricas consolidadas das clínicas ativas (exceto admin) no período filtrado"""
+    clinicas_ativas: int = 0
+    meses_ativos: int = 0
+
+def razao_das_somas(kpi: str):
+    """Expressão SQL do KPI de kpis.RAZOES como razão entre as somas de DadosDashboard (NULL se o denominador for 0)"""
+    numerador, denominador, fator = RAZOES[kpi]
+    soma_numerador = func.sum(getattr(DadosDashboard, COLUNAS_DADOS_DATAFRAME[numerador]))
+    soma_denominador = func.sum(getattr(DadosDashboard, COLUNAS_DADOS_DATAFRAME[denominador]))
+    if fator != 1:
+        soma_numerador = soma_numerador * fator
+    return soma_numerador / func.nullif(soma_denominador, 0)
+
+def filtro_periodo(coluna_ano, coluna_mes, inicio: Optional[Periodo] = None, fim: Optional[Periodo] = None) -> list:
+    """
+    Condições SQL para (ano, mês) entre inicio e fim, inclusive
+    
+    Cada limite compara primeiro o ano isoladamente, para que o banco percorra apenas
+    a faixa de anos do índice (cliente_id, ano, mês).
+    """
+    condicoes = []
+    if inicio is not None:
+        ano, mes = inicio
+        condicoes += [coluna_ano >= ano, or_(coluna_ano > ano, coluna_mes >= mes)]
+    if fim is not None:
+        ano, mes = fim
+        condicoes += [coluna_ano <= ano, or_(coluna_ano < ano, coluna_mes <= mes)]
+    return condicoes
+
+# Chave do lock consultivo (PostgreSQL) que serializa a atualização do resumo mensal entre transações
+LOCK_RESUMO_MENSAL = 7_160_116
+
+def atualizar_resumo_mensal(session: Session, periodos=None):
+    """
+    Recalcula as linhas de resumo_mensal dos períodos informados
+    
+    Roda na sessão de quem gravou em dados_dashboard, antes do commit, para que os dados
+    e o resumo mudem na mesma transação. Só os meses afetados são somados de novo.
+    
+    As sincronizações das clínicas rodam em paralelo e gravam os mesmos meses: no PostgreSQL
+    um lock consultivo da transação serializa o recálculo (a soma de cada transação enxerga
+    as anteriores já confirmadas) e as linhas são gravadas com INSERT ... ON CONFLICT DO UPDATE.
+    No SQLite as escritas já são serializadas pelo lock do banco.
+    
+    Args:
+        session: Sessão com as alterações ainda não confirmadas
+        periodos: Iterável de (ano, mes) afetados; None recalcula todos os meses
+    """
+    filtro = [Cliente.is_admin == False, Cliente.ativo == True]
+    meses_do_resumo = []
+    if periodos is not None:
+        periodos = sorted(set(periodos))
+        if not periodos:
+            return
+        filtro += [
+            DadosDashboard.ano.in_({ano for ano, _ in periodos}),
+            DadosDashboard.mes.in_({mes for _, mes in periodos}),
+            tuple_(DadosDashboard.ano, DadosDashboard.mes).in_(periodos),
+        ]
+        meses_do_resumo = [tuple_(ResumoMensal.ano, ResumoMensal.mes).in_(periodos)]
+    
+    agregado = select(
+        DadosDashboard.ano,
+        DadosDashboard.mes,
+        func.max(DadosDashboard.mes_numero),
+        func.count(func.distinct(DadosDashboard.cliente_id)),
+        *[func.coalesce(func.sum(getattr(DadosDashboard, campo)), 0) for campo in CAMPOS_RESUMO_MENSAL],
+        literal(datetime.utcnow(), DateTime),
+    ).join(Cliente, Cliente.id == DadosDashboard.cliente_id).where(*filtro).group_by(
+        DadosDashboard.ano, DadosDashboard.mes
+    )
+    colunas = ['ano', 'mes', 'mes_numero', 'clinicas', *CAMPOS_RESUMO_MENSAL, 'data_atualizacao']
+    
+    session.flush()
+    dialeto = session.get_bind().dialect.name
+    if dialeto == 'postgresql':
+        session.execute(select(func.pg_advisory_xact_lock(LOCK_RESUMO_MENSAL)))
+    
+    if dialeto in INSERT_ON_CONFLICT:
+        # Meses que ficaram sem dados saem do resumo; os demais são inseridos ou atualizados
+        com_dados = select(DadosDashboard.id).join(Cliente, Cliente.id == DadosDashboard.cliente_id).where(
+            Cliente.is_admin == False,
+            Cliente.ativo == True,
+            DadosDashboard.ano == ResumoMensal.ano,
+            DadosDashboard.mes == ResumoMensal.mes
+        )
+        session.execute(delete(ResumoMensal).where(*meses_do_resumo, ~com_dados.exists()))
+        
+        stmt = INSERT_ON_CONFLICT[dialeto](ResumoMensal).from_select(colunas, agregado)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['ano', 'mes'],
+            set_={coluna: stmt.excluded[coluna] for coluna in colunas[2:]}
+        ))
+    else:
+        session.execute(delete(ResumoMensal).where(*meses_do_resumo))
+        session.execute(insert(ResumoMensal).from_select(colunas, agregado))
+
+def periodos_do_cliente(session: Session, cliente_id: int) -> List[Tuple[int, str]]:
+    """Retorna os (ano, mes) com dados gravados para o cliente"""
+    return [tuple(row) for row in session.query(DadosDashboard.ano, DadosDashboard.mes).filter(
+        DadosDashboard.cliente_id == cliente_id
+    ).all()]
+
 class DatabaseManager:
     """Gerenciador de conexão e operações com banco de dados"""
     
-    def __init__(self, database_url: str = None):
+    def __init__(self, database_url: str = None, perfil: PerfilEngine = None):
         """
         Inicializa o gerenciador de banco de dados
         
         Args:
             database_url: URL de conexão com o banco (SQLite por padrão)
+            perfil: Configuração do pool e dos timeouts (padrão: variáveis de ambiente DB_*)
         """
         # Usar variável de ambiente se disponível, senão usar padrão
         self.database_url = database_url or os.getenv('DATABASE_URL', 'sqlite:///prestige_clinic.db')
-        self.engine = create_engine(self.database_url, echo=False)
+        self.perfil = perfil or PerfilEngine.do_ambiente()
+        self.metricas = MetricasPool()
+        self._local = threading.local()  # Unidade de trabalho em andamento em cada thread
+        self.engine = create_engine(self.database_url, **opcoes_engine(self.database_url, self.perfil))
+        self._registrar_eventos()
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+    
+    def _registrar_eventos(self):
+        """Liga as métricas ao pool e aplica os pragmas do SQLite em cada conexão nova"""
+        if isinstance(self.engine.pool, QueuePoolMedido):
+            self.engine.pool.metricas = self.metricas
+        
+        event.listen(self.engine, 'checkout', lambda *args: self.metricas.registrar_checkout())
+        event.listen(self.engine, 'checkin', lambda *args: self.metricas.registrar_checkin())
+        
+        @event.listens_for(self.engine, 'before_cursor_execute')
+        def contar_statement(conn, cursor, statement, parameters, context, executemany):
+            unidade = getattr(self._local, 'unidade', None)
+            if unidade is not None:
+                unidade.statements += 1
+        
+        sqlite_em_arquivo = self.engine.dialect.name == 'sqlite' and self.engine.url.database not in (None, '', ':memory:')
+        
+        @event.listens_for(self.engine, 'connect')
+        def configurar_conexao(dbapi_connection, connection_record):
+            self.metricas.registrar_conexao()
+            if sqlite_em_arquivo and (self.perfil.sqlite_journal_mode or self.perfil.sqlite_synchronous):
+                # Só por opção (DB_SQLITE_*): WAL é persistente e altera o arquivo do banco;
+                # permite leituras durante a escrita da sincronização e NORMAL é seguro com ele
+                cursor = dbapi_connection.cursor()
+                if self.perfil.sqlite_journal_mode:
+                    cursor.execute(f"PRAGMA journal_mode={self.perfil.sqlite_journal_mode}")
+                if self.perfil.sqlite_synchronous:
+                    cursor.execute(f"PRAGMA synchronous={self.perfil.sqlite_synchronous}")
+                cursor.close()
+    
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """
+        Retorna o estado do pool de conexões
+        
+        Returns:
+            Dict: Contadores de MetricasPool mais o tamanho, o limite e o overflow atual do pool
+        """
+        metricas = self.metricas.snapshot()
+        pool = self.engine.pool
+        if isinstance(pool, QueuePool):
+            metricas.update(
+                tamanho_pool=pool.size(),
+                limite=pool.size() + max(self.perfil.max_overflow, 0),
+                overflow=max(pool.overflow(), 0)
+            )
+        return metricas
         
     def create_tables(self):
-        """Cria todas as tabelas no banco de dados"""
+        """
+        Cria todas as tabelas no banco de dados
+        
+        create_all não altera tabelas existentes: as migrações idempotentes (colunas de número
+        do mês e índices dos modelos) rodam em seguida, em qualquer banco. Um resumo mensal
+        vazio (tabela recém-criada em um banco com dados) é preenchido a partir de dados_dashboard.
+        """
+        from migrate_database import migrate_mes_numero, migrate_indexes
+        
         try:
             Base.metadata.create_all(bind=self.engine)
+            migrate_mes_numero(self.engine, verbose=False)
+            migrate_indexes(self.engine, verbose=False)
+            self._preencher_resumo_mensal()
             print("✅ Tabelas criadas com sucesso!")
         except SQLAlchemyError as e:
             print(f"❌ Erro ao criar tabelas: {e}")
             raise
     
-    def get_session(self) -> Session:
-        """Retorna uma sessão do banco de dados"""
+    def _preencher_resumo_mensal(self):
+        """Preenche o resumo mensal se ele estiver vazio e houver dados das clínicas"""
+        session = self.SessionLocal()
+        try:
+            if session.query(ResumoMensal.id).first() is None and session.query(DadosDashboard.id).first() is not None:
+                atualizar_resumo_mensal(session)
+                session.commit()
+                print("✅ Resumo mensal preenchido a partir dos dados das clínicas")
+        except SQLAlchemyError:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def get_session(self, session: Session = None) -> Session:
+        """
+        Retorna uma sessão do banco de dados
+        
+        Args:
+            session: Sessão de uma unidade de trabalho a reutilizar (opcional). Sem ela, usa a
+                unidade de trabalho em andamento na thread ou abre uma sessão nova.
+        """
+        if session is not None:
+            return session
+        unidade = getattr(self._local, 'unidade', None)
+        if unidade is not None:
+            return unidade.session
         return self.SessionLocal()
     
     def close_session(self, session: Session):
-        """Fecha uma sessão do banco de dados"""
-        session.close()
+        """Fecha uma sessão do banco de dados (a de uma unidade de trabalho só é fechada ao final dela)"""
+        if 'unidade_de_trabalho' in session.info:
+            # Desanexa os objetos retornados, como o fechamento faria, e mantém a conexão
+            session.expunge_all()
+        else:
+            session.close()
+    
+    @contextmanager
+    def unidade_de_trabalho(self) -> Iterator[UnidadeDeTrabalho]:
+        """
+        Compartilha uma sessão (e uma conexão do pool) entre as operações do CRUD no bloco
+        
+        Cada método continua confirmando as próprias escritas; a sessão é fechada ao sair do
+        bloco. Blocos aninhados na mesma thread reutilizam a unidade externa.
+        
+        Yields:
+            UnidadeDeTrabalho: Sessão compartilhada e contagem de statements executados
+        """
+        atual = getattr(self._local, 'unidade', None)
+        if atual is not None:
+            yield atual
+            return
+        
+        # Os objetos são desanexados ao final de cada método: mantêm os valores lidos após o commit
+        unidade = UnidadeDeTrabalho(self.SessionLocal(expire_on_commit=False))
+        unidade.session.info['unidade_de_trabalho'] = unidade
+        self._local.unidade = unidade
+        try:
+            yield unidade
+        finally:
+            self._local.unidade = None
+            unidade.session.close()
+
+@dataclass(frozen=True)
+class ContextoClinica:
+    """Dados da clínica usados no cabeçalho do dashboard, carregados uma vez por renderização"""
+    cliente_id: int
+    nome_da_clinica: str
+    ultima_atualizacao: Optional[datetime] = None
 
 class ClienteCRUD:
     """Operações CRUD para a tabela de clientes"""
@@ -68,9 +536,9 @@ class ClienteCRUD:
     
     def create_cliente(self, nome: str, email: str, senha: str, cnpj: str = None, 
                       nome_da_clinica: str = "", telefone: str = None, 
-                      endereco: str = None, link_empresa: str = None, is_admin: bool = False) -> Optional[Cliente]:
+                      endereco: str = None, link_empresa: str = None, is_admin: bool = False, *, session: Session = None) -> Optional[Cliente]:
         """Cria um novo cliente"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             # Verifica se email já existe
             existing = session.query(Cliente).filter(Cliente.email == email).first()
@@ -100,54 +568,88 @@ class ClienteCRUD:
         finally:
             self.db_manager.close_session(session)
     
-    def authenticate_cliente(self, email: str, senha: str) -> Optional[Cliente]:
+    def authenticate_cliente(self, email: str, senha: str, *, session: Session = None) -> Optional[ClienteLeitura]:
         """Autentica um cliente"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
-            cliente = session.query(Cliente).filter(
+            row = session.execute(select(Cliente.senha_hash, *ClienteLeitura.colunas).where(
                 Cliente.email == email,
                 Cliente.ativo == True
-            ).first()
+            )).first()
             
-            if cliente and self.verify_password(senha, cliente.senha_hash):
-                return cliente
+            if row and self.verify_password(senha, row[0]):
+                return ClienteLeitura(*row[1:])
             return None
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro na autenticação: {e}")
             return None
         finally:
             self.db_manager.close_session(session)
     
-    def get_cliente_by_id(self, cliente_id: int) -> Optional[Cliente]:
+    def get_cliente_by_id(self, cliente_id: int, *, session: Session = None) -> Optional[ClienteLeitura]:
         """Busca cliente por ID"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
-            return session.query(Cliente).filter(Cliente.id == cliente_id).first()
+            row = session.execute(select(*ClienteLeitura.colunas).where(Cliente.id == cliente_id)).first()
+            return ClienteLeitura(*row) if row else None
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao buscar cliente: {e}")
             return None
         finally:
             self.db_manager.close_session(session)
     
-    def get_all_clientes(self) -> List[Cliente]:
+    def get_contexto_clinica(self, cliente_id: int, *, session: Session = None) -> Optional[ContextoClinica]:
+        """
+        Busca em uma única consulta o nome da clínica e a data da última atualização dos seus dados
+        
+        A data vem do MAX() em dados_dashboard, sem carregar as linhas.
+        """
+        session = self.db_manager.get_session(session)
+        try:
+            ultima_atualizacao = select(
+                func.max(func.coalesce(DadosDashboard.data_atualizacao, DadosDashboard.data_criacao))
+            ).where(DadosDashboard.cliente_id == Cliente.id).scalar_subquery()
+            
+            row = session.execute(
+                select(Cliente.id, Cliente.nome_da_clinica, ultima_atualizacao).where(Cliente.id == cliente_id)
+            ).first()
+            return ContextoClinica(*row) if row else None
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao buscar contexto da clínica: {e}")
+            return None
+        finally:
+            self.db_manager.close_session(session)
+    
+    def get_all_clientes(self, *, session: Session = None) -> List[ClienteLeitura]:
         """Lista todos os clientes ativos"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
-            return session.query(Cliente).filter(Cliente.ativo == True).all()
+            rows = session.execute(select(*ClienteLeitura.colunas).where(Cliente.ativo == True)).all()
+            return [ClienteLeitura(*row) for row in rows]
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao listar clientes: {e}")
             return []
         finally:
             self.db_manager.close_session(session)
     
-    def update_cliente(self, cliente_id: int, **kwargs) -> bool:
+    def update_cliente(self, cliente_id: int, *, session: Session = None, **kwargs) -> bool:
         """Atualiza dados de um cliente"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             cliente = session.query(Cliente).filter(Cliente.id == cliente_id).first()
             if not cliente:
                 return False
             
+            # Ativar/desativar ou mudar o perfil de admin muda quem entra no resumo mensal
+            muda_resumo = any(
+                key in kwargs and kwargs[key] is not None and kwargs[key] != getattr(cliente, key)
+                for key in ('ativo', 'is_admin')
+            )
+            
             # Atualiza apenas os campos fornecidos
             for key, value in kwargs.items():
                 if hasattr(cliente, key) and value is not None:
@@ -158,7 +660,10 @@ class ClienteCRUD:
                         setattr(cliente, key, value)
             
             cliente.data_atualizacao = datetime.utcnow()
+            if muda_resumo:
+                atualizar_resumo_mensal(session, periodos_do_cliente(session, cliente_id))
             session.commit()
+            clinic_cache.invalidate(cliente_id)
             return True
         except SQLAlchemyError as e:
             session.rollback()
@@ -167,9 +672,9 @@ class ClienteCRUD:
         finally:
             self.db_manager.close_session(session)
     
-    def delete_cliente(self, cliente_id: int) -> bool:
+    def delete_cliente(self, cliente_id: int, *, session: Session = None) -> bool:
         """Remove um cliente (soft delete)"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             cliente = session.query(Cliente).filter(Cliente.id == cliente_id).first()
             if not cliente:
@@ -178,7 +683,9 @@ class ClienteCRUD:
             # Soft delete - marca como inativo
             cliente.ativo = False
             cliente.data_atualizacao = datetime.utcnow()
+            atualizar_resumo_mensal(session, periodos_do_cliente(session, cliente_id))
             session.commit()
+            clinic_cache.invalidate(cliente_id)
             return True
         except SQLAlchemyError as e:
             session.rollback()
@@ -187,20 +694,25 @@ class ClienteCRUD:
         finally:
             self.db_manager.close_session(session)
     
-    def hard_delete_cliente(self, cliente_id: int) -> bool:
+    def hard_delete_cliente(self, cliente_id: int, *, session: Session = None) -> bool:
         """Remove um cliente permanentemente (hard delete)"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             cliente = session.query(Cliente).filter(Cliente.id == cliente_id).first()
             if not cliente:
                 return False
             
+            periodos = periodos_do_cliente(session, cliente_id)
+            
             # Remove dados relacionados primeiro (cascade)
             session.query(DadosDashboard).filter(DadosDashboard.cliente_id == cliente_id).delete()
+            session.query(EstadoSincronizacao).filter(EstadoSincronizacao.cliente_id == cliente_id).delete()
             
             # Remove o cliente
             session.delete(cliente)
+            atualizar_resumo_mensal(session, periodos)
             session.commit()
+            clinic_cache.invalidate(cliente_id)
             return True
         except SQLAlchemyError as e:
             session.rollback()
@@ -215,9 +727,9 @@ class DadosDashboardCRUD:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
     
-    def create_dados_dashboard(self, cliente_id: int, mes: str, ano: int = 2024, **kwargs) -> Optional[DadosDashboard]:
+    def create_dados_dashboard(self, cliente_id: int, mes: str, ano: int = ANO_REFERENCIA, *, session: Session = None, **kwargs) -> Optional[DadosDashboard]:
         """Cria novos dados do dashboard para um cliente"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             dados = DadosDashboard(
                 cliente_id=cliente_id,
@@ -226,8 +738,10 @@ class DadosDashboardCRUD:
                 **kwargs
             )
             session.add(dados)
+            atualizar_resumo_mensal(session, [(ano, mes)])
             session.commit()
             session.refresh(dados)
+            clinic_cache.invalidate(cliente_id)
             return dados
         except SQLAlchemyError as e:
             session.rollback()
@@ -236,138 +750,297 @@ class DadosDashboardCRUD:
         finally:
             self.db_manager.close_session(session)
     
-    def get_dados_by_cliente(self, cliente_id: int) -> List[DadosDashboard]:
+    def get_dados_by_cliente(self, cliente_id: int, *, session: Session = None) -> List[DadosDashboardLeitura]:
         """Busca todos os dados de um cliente"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
-            return session.query(DadosDashboard).filter(
+            rows = session.execute(select(*DadosDashboardLeitura.colunas).where(
                 DadosDashboard.cliente_id == cliente_id
-            ).order_by(DadosDashboard.ano, DadosDashboard.mes).all()
+            ).order_by(DadosDashboard.ano, DadosDashboard.mes_numero)).all()
+            return [DadosDashboardLeitura(*row) for row in rows]
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao buscar dados do cliente: {e}")
             return []
         finally:
             self.db_manager.close_session(session)
     
-    def get_dados_by_cliente_and_period(self, cliente_id: int, meses: List[str]) -> List[DadosDashboard]:
-        """Busca dados de um cliente para meses específicos"""
-        session = self.db_manager.get_session()
+    def get_dados_by_cliente_and_period(self, cliente_id: int, meses: List[str], ano: int = None, *, session: Session = None) -> List[DadosDashboardLeitura]:
+        """Busca dados de um cliente para meses específicos (de todos os anos se ano for None)"""
+        session = self.db_manager.get_session(session)
         try:
-            return session.query(DadosDashboard).filter(
+            query = select(*DadosDashboardLeitura.colunas).where(
                 DadosDashboard.cliente_id == cliente_id,
                 DadosDashboard.mes.in_(meses)
-            ).order_by(DadosDashboard.ano, DadosDashboard.mes).all()
+            )
+            if ano is not None:
+                query = query.where(DadosDashboard.ano == ano)
+            rows = session.execute(query.order_by(DadosDashboard.ano, DadosDashboard.mes_numero)).all()
+            return [DadosDashboardLeitura(*row) for row in rows]
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao buscar dados do período: {e}")
             return []
         finally:
             self.db_manager.close_session(session)
     
-    def dados_to_dataframe(self, dados: List[DadosDashboard]) -> pd.DataFrame:
-        """Converte dados do banco para DataFrame do pandas"""
-        if not dados:
+    def get_periodos_ativos(self, cliente_id: int, *, session: Session = None) -> List[Tuple[int, int, str]]:
+        """
+        Lista os meses com atividade (leads, faturamento ou investimento) de um cliente
+        
+        Returns:
+            Lista de (ano, número do mês, nome do mês) em ordem cronológica
+        """
+        session = self.db_manager.get_session(session)
+        try:
+            rows = session.query(DadosDashboard.ano, DadosDashboard.mes_numero, DadosDashboard.mes).filter(
+                DadosDashboard.cliente_id == cliente_id,
+                or_(
+                    DadosDashboard.leads_totais > 0,
+                    DadosDashboard.faturamento > 0,
+                    DadosDashboard.valor_investido_total > 0
+                )
+            ).order_by(DadosDashboard.ano, DadosDashboard.mes_numero).all()
+            return [tuple(row) for row in rows]
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao buscar períodos do cliente: {e}")
+            return []
+        finally:
+            self.db_manager.close_session(session)
+
+    def get_dataframe_by_cliente(self, cliente_id: int, meses: List[str] = None,
+                                 inicio: Optional[Periodo] = None, fim: Optional[Periodo] = None, *, session: Session = None) -> pd.DataFrame:
+        """
+        Busca os dados de um cliente diretamente como DataFrame
+        
+        Seleciona apenas as colunas usadas pelo dashboard e monta o DataFrame a partir
+        das tuplas do resultado, sem instanciar objetos do ORM.
+        
+        Args:
+            cliente_id: ID do cliente
+            meses: Lista de meses para filtrar (opcional)
+            inicio: Primeiro período (ano, mês) a buscar (opcional)
+            fim: Último período (ano, mês) a buscar (opcional)
+        
+        Returns:
+            pd.DataFrame: Mesmas colunas de dados_to_dataframe
+        """
+        session = self.db_manager.get_session(session)
+        try:
+            colunas = [getattr(DadosDashboard, attr) for attr in COLUNAS_DADOS_DATAFRAME.values()]
+            query = session.query(*colunas).filter(
+                DadosDashboard.cliente_id == cliente_id,
+                *filtro_periodo(DadosDashboard.ano, DadosDashboard.mes_numero, inicio, fim)
+            )
+            if meses is not None:
+                query = query.filter(DadosDashboard.mes.in_(meses))
+            rows = query.order_by(DadosDashboard.ano, DadosDashboard.mes_numero).all()
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao buscar dados do cliente: {e}")
             return pd.DataFrame()
+        finally:
+            self.db_manager.close_session(session)
         
-        # Mapeia os dados para o formato esperado pelo dashboard
-        data = {
-            'Cliente_ID': [d.cliente_id for d in dados],
-            'Meses': [d.mes for d in dados],
-            'Leads_Totais': [d.leads_totais for d in dados],
-            'Leads_Google_Ads': [d.leads_google_ads for d in dados],
-            'Leads_Meta_Ads': [d.leads_meta_ads for d in dados],
-            'Leads_Instagram_Organico': [d.leads_instagram_organico for d in dados],
-            'Leads_Indicacao': [d.leads_indicacao for d in dados],
-            'Leads_Origem_Desconhecida': [d.leads_origem_desconhecida for d in dados],
-            
-            'Consultas_Marcadas_Totais': [d.consultas_marcadas_totais for d in dados],
-            'Consultas_Marcadas_Google_Ads': [d.consultas_marcadas_google_ads for d in dados],
-            'Consultas_Marcadas_Meta_Ads': [d.consultas_marcadas_meta_ads for d in dados],
-            'Consultas_Marcadas_IG_Organico': [d.consultas_marcadas_ig_organico for d in dados],
-            'Consultas_Marcadas_Indicacao': [d.consultas_marcadas_indicacao for d in dados],
-            'Consultas_Marcadas_Outros': [d.consultas_marcadas_outros for d in dados],
-            
-            'Consultas_Comparecidas': [d.consultas_comparecidas for d in dados],
-            'Fechamentos_Totais': [d.fechamentos_totais for d in dados],
-            'Fechamentos_Google_Ads': [d.fechamentos_google_ads for d in dados],
-            'Fechamentos_Meta_Ads': [d.fechamentos_meta_ads for d in dados],
-            'Fechamentos_IG_Organico': [d.fechamentos_ig_organico for d in dados],
-            'Fechamentos_Indicacao': [d.fechamentos_indicacao for d in dados],
-            'Fechamentos_Outros': [d.fechamentos_outros for d in dados],
-            
-            'Faturamento': [d.faturamento for d in dados],
-            'Valor_Investido_Total': [d.valor_investido_total for d in dados],
-            'Orcamento_Previsto_Total': [d.orcamento_previsto_total for d in dados],
-            'Orcamento_Realizado_Facebook': [d.orcamento_realizado_facebook for d in dados],
-            'Orcamento_Previsto_Facebook': [d.orcamento_previsto_facebook for d in dados],
-            'Orcamento_Realizado_Google': [d.orcamento_realizado_google for d in dados],
-            'Orcamento_Previsto_Google': [d.orcamento_previsto_google for d in dados],
-        }
+        return self._rows_to_dataframe(rows)
+    
+    def dados_to_dataframe(self, dados: List[DadosDashboardLeitura]) -> pd.DataFrame:
+        """Converte dados do banco (em ordem cronológica) para DataFrame do pandas"""
+        atributos = list(COLUNAS_DADOS_DATAFRAME.values())
+        rows = [tuple(getattr(d, attr) for attr in atributos) for d in dados]
+        return self._rows_to_dataframe(rows)
+    
+    def _rows_to_dataframe(self, rows: List[tuple]) -> pd.DataFrame:
+        """Monta o DataFrame do dashboard a partir de tuplas na ordem de COLUNAS_DADOS_DATAFRAME"""
+        if not rows:
+            return pd.DataFrame()
+        
+        df = pd.DataFrame.from_records(rows, columns=list(COLUNAS_DADOS_DATAFRAME.keys()))
+        
+        # Calcula KPIs se não estiverem armazenados
+        return self._calculate_kpis(df)
+    
+    def _calculate_kpis(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Calcula KPIs para o DataFrame conforme novo formato"""
+        return calcular_kpis(df)
+    
+    def sync_dados_cliente(self, cliente_id: int, registros: List[Dict[str, Any]], ano: int = ANO_REFERENCIA, *, session: Session = None) -> Optional[Dict[str, int]]:
+        """
+        Sincroniza os meses de um cliente com o estado vindo da planilha
         
-        df = pd.DataFrame(data)
+        Compara os registros recebidos com os meses já gravados e grava, em uma única
+        transação, apenas os meses novos, alterados ou que deixaram de existir.
+        Uma sincronização sem mudanças faz uma leitura e nenhuma escrita.
         
-        # Ordena os meses na ordem correta
-        if not df.empty:
-            # Mapeia os meses para números para ordenação
-            mes_order = {
-                'Janeiro': 1, 'Fevereiro': 2, 'Março': 3, 'Abril': 4,
-                'Maio': 5, 'Junho': 6, 'Julho': 7, 'Agosto': 8,
-                'Setembro': 9, 'Outubro': 10, 'Novembro': 11, 'Dezembro': 12
+        Args:
+            cliente_id: ID do cliente
+            registros: Lista de dicionários com 'mes' e os campos de CAMPOS_SINCRONIZADOS
+            ano: Ano dos registros
+        
+        Returns:
+            Dict com a quantidade de meses inseridos, atualizados, removidos e inalterados,
+            ou None em caso de erro
+        """
+        resultado = {'inseridos': 0, 'atualizados': 0, 'removidos': 0, 'inalterados': 0}
+        tipos = {campo: DadosDashboard.__table__.columns[campo].type.python_type for campo in CAMPOS_SINCRONIZADOS}
+        
+        # Estado desejado por mês, com os valores convertidos para o tipo da coluna
+        desejados = {}
+        for registro in registros:
+            desejados[registro['mes']] = {
+                campo: tipos[campo](registro.get(campo) or 0) for campo in CAMPOS_SINCRONIZADOS
             }
+        
+        session = self.db_manager.get_session(session)
+        try:
+            colunas = [getattr(DadosDashboard, campo) for campo in CAMPOS_SINCRONIZADOS]
+            existentes = session.query(DadosDashboard.id, DadosDashboard.mes, *colunas).filter(
+                DadosDashboard.cliente_id == cliente_id,
+                DadosDashboard.ano == ano
+            ).order_by(DadosDashboard.id).all()
+            
+            inserts, updates, ids_removidos = [], [], []
+            meses_vistos, meses_alterados = set(), set()
+            agora = datetime.utcnow()
+            
+            for row in existentes:
+                mes = row.mes
+                if mes not in desejados or mes in meses_vistos:
+                    # Mês removido da planilha ou linha duplicada
+                    ids_removidos.append(row.id)
+                    meses_alterados.add(mes)
+                    continue
+                meses_vistos.add(mes)
+                
+                valores = desejados[mes]
+                if all(getattr(row, campo) == valor for campo, valor in valores.items()):
+                    resultado['inalterados'] += 1
+                else:
+                    updates.append({'id': row.id, 'data_atualizacao': agora, **valores})
+                    meses_alterados.add(mes)
             
-            # Adiciona coluna de ordenação
-            df['mes_order'] = df['Meses'].map(mes_order)
+            for mes, valores in desejados.items():
+                if mes not in meses_vistos:
+                    inserts.append({'cliente_id': cliente_id, 'mes': mes, 'ano': ano, **valores})
+                    meses_alterados.add(mes)
             
-            # Ordena por mês
-            df = df.sort_values('mes_order').drop('mes_order', axis=1)
+            if not (inserts or updates or ids_removidos):
+                return resultado
+            
+            if ids_removidos:
+                session.execute(delete(DadosDashboard).where(DadosDashboard.id.in_(ids_removidos)))
+            if updates:
+                session.execute(update(DadosDashboard), updates)
+            if inserts:
+                session.execute(insert(DadosDashboard), inserts)
+            atualizar_resumo_mensal(session, [(ano, mes) for mes in meses_alterados])
+            session.commit()
+            clinic_cache.invalidate(cliente_id)
             
-            # Calcula KPIs se não estiverem armazenados
-            df = self._calculate_kpis(df)
+            resultado['inseridos'] = len(inserts)
+            resultado['atualizados'] = len(updates)
+            resultado['removidos'] = len(ids_removidos)
+            return resultado
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao sincronizar dados do cliente: {e}")
+            return None
+        finally:
+            self.db_manager.close_session(session)
+    
+    def upsert_dados_meses(self, cliente_id: int, registros: List[Dict[str, Any]], ano: int = ANO_REFERENCIA, *, session: Session = None) -> Optional[int]:
+        """
+        Grava os meses de um cliente com INSERT ... ON CONFLICT DO UPDATE
+        
+        Cada mês é inserido ou, se já existir (cliente_id, ano, mes), tem os campos
+        informados atualizados. Gravar os mesmos registros de novo não cria duplicatas.
+        Em bancos sem ON CONFLICT, os meses existentes são buscados antes e gravados
+        com UPDATE/INSERT em lote na mesma transação.
+        
+        Args:
+            cliente_id: ID do cliente
+            registros: Lista de dicionários com 'mes' e os campos a gravar
+            ano: Ano dos registros
+        
+        Returns:
+            Número de meses gravados ou None em caso de erro
+        """
+        if not registros:
+            return 0
+        
+        dialeto = self.db_manager.engine.dialect.name
+        
+        # Agrupa por conjunto de campos: cada grupo é um único comando executado em lote
+        agora = datetime.utcnow()
+        grupos = {}
+        for registro in registros:
+            valores = {**registro, 'cliente_id': cliente_id, 'ano': ano, 'data_atualizacao': agora}
+            grupos.setdefault(tuple(sorted(valores)), []).append(valores)
         
-        return df
+        session = self.db_manager.get_session(session)
+        try:
+            if dialeto in INSERT_ON_CONFLICT:
+                for campos, valores in grupos.items():
+                    stmt = INSERT_ON_CONFLICT[dialeto](DadosDashboard)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=CHAVE_DADOS_DASHBOARD,
+                        set_={campo: stmt.excluded[campo] for campo in campos if campo not in CHAVE_DADOS_DASHBOARD}
+                    )
+                    session.execute(stmt, valores)
+            else:
+                # Bancos sem ON CONFLICT: busca os meses existentes e atualiza ou insere em lote
+                ids = dict(session.query(DadosDashboard.mes, DadosDashboard.id).filter(
+                    DadosDashboard.cliente_id == cliente_id,
+                    DadosDashboard.ano == ano
+                ).all())
+                for valores in grupos.values():
+                    updates = [{**v, 'id': ids[v['mes']]} for v in valores if v['mes'] in ids]
+                    inserts = [v for v in valores if v['mes'] not in ids]
+                    if updates:
+                        session.execute(update(DadosDashboard), updates)
+                    if inserts:
+                        session.execute(insert(DadosDashboard), inserts)
+                        session.flush()
+                        ids.update(dict(session.query(DadosDashboard.mes, DadosDashboard.id).filter(
+                            DadosDashboard.cliente_id == cliente_id,
+                            DadosDashboard.ano == ano,
+                            DadosDashboard.mes.in_([v['mes'] for v in inserts])
+                        ).all()))
+            atualizar_resumo_mensal(session, [(ano, registro['mes']) for registro in registros])
+            session.commit()
+            clinic_cache.invalidate(cliente_id)
+            return len(registros)
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao gravar dados do dashboard: {e}")
+            return None
+        finally:
+            self.db_manager.close_session(session)
     
-    def _calculate_kpis(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calcula KPIs para o DataFrame conforme novo formato"""
-        def safe_divide(numerator, denominator):
-            return np.where(denominator != 0, numerator / denominator, 0)
-
-        # KPIs de conversão (em percentual)
-        df['Conversao_Csm_Leads'] = safe_divide(df['Consultas_Marcadas_Totais'], df['Leads_Totais']) * 100
-        df['Conversao_Csc_Csm'] = safe_divide(df['Consultas_Comparecidas'], df['Consultas_Marcadas_Totais']) * 100
-        df['Conversao_Fechamento_Csc'] = safe_divide(df['Fechamentos_Totais'], df['Consultas_Comparecidas']) * 100
-        df['Conversao_Fechamento_Leads'] = safe_divide(df['Fechamentos_Totais'], df['Leads_Totais']) * 100
-        
-        # KPIs financeiros
-        df['Custo_por_Compra_Cirurgias'] = safe_divide(df['Valor_Investido_Total'], df['Fechamentos_Totais'])
-        df['ROAS'] = safe_divide(df['Faturamento'], df['Valor_Investido_Total'])
-        df['Custo_por_Lead_Total'] = safe_divide(df['Valor_Investido_Total'], df['Leads_Totais'])
-        df['Custo_por_Consulta_Marcada'] = safe_divide(df['Valor_Investido_Total'], df['Consultas_Marcadas_Totais'])
-        df['Custo_por_Consulta_Comparecida'] = safe_divide(df['Valor_Investido_Total'], df['Consultas_Comparecidas'])
-        df['Ticket_Medio'] = safe_divide(df['Faturamento'], df['Fechamentos_Totais'])
-        
-        # Taxas ideais (thresholds)
-        df['Taxa_Ideal_Csm'] = 10.0  # Csm. = Consultas Marcadas >10%
-        df['Taxa_Ideal_Csc'] = 50.0  # Csc. = Consultas Comparecidas >50%
-        df['Taxa_Ideal_Fechamentos'] = 40.0  # Fechamentos >40%
-        
-        # Substitui valores infinitos e NaN por 0
-        df = df.replace([np.inf, -np.inf, np.nan], 0)
-        
-        return df
-    
-    def update_dados_dashboard(self, dados_id: int, **kwargs) -> bool:
+    def upsert_dados_dashboard(self, cliente_id: int, mes: str, ano: int = ANO_REFERENCIA, *,
+                               session: Session = None, **kwargs) -> bool:
+        """Cria ou atualiza os dados de um mês do cliente em um único comando"""
+        return self.upsert_dados_meses(cliente_id, [{'mes': mes, **kwargs}], ano=ano, session=session) is not None
+    
+    def update_dados_dashboard(self, dados_id: int, *, session: Session = None, **kwargs) -> bool:
         """Atualiza dados do dashboard"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             dados = session.query(DadosDashboard).filter(DadosDashboard.id == dados_id).first()
             if not dados:
                 return False
             
+            periodo_anterior = (dados.ano, dados.mes)
             for key, value in kwargs.items():
                 if hasattr(dados, key):
                     setattr(dados, key, value)
             
             dados.data_atualizacao = datetime.utcnow()
+            cliente_id = dados.cliente_id
+            atualizar_resumo_mensal(session, [periodo_anterior, (dados.ano, dados.mes)])
             session.commit()
+            clinic_cache.invalidate(cliente_id)
             return True
         except SQLAlchemyError as e:
             session.rollback()
@@ -376,14 +1049,18 @@ class DadosDashboardCRUD:
         finally:
             self.db_manager.close_session(session)
     
-    def delete_dados_dashboard(self, dados_id: int) -> bool:
+    def delete_dados_dashboard(self, dados_id: int, *, session: Session = None) -> bool:
         """Remove dados do dashboard"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             dados = session.query(DadosDashboard).filter(DadosDashboard.id == dados_id).first()
             if dados:
+                cliente_id = dados.cliente_id
+                periodo = (dados.ano, dados.mes)
                 session.delete(dados)
+                atualizar_resumo_mensal(session, [periodo])
                 session.commit()
+                clinic_cache.invalidate(cliente_id)
                 return True
             return False
         except SQLAlchemyError as e:
@@ -399,77 +1076,63 @@ class AdminDashboardCRUD:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
     
-    def get_consolidated_metrics(self) -> Dict[str, Any]:
-        """Retorna métricas consolidadas de todas as clínicas"""
-        session = self.db_manager.get_session()
+    def get_consolidated_metrics(self, meses: List[str] = None, *, session: Session = None) -> Optional[MetricasConsolidadas]:
+        """
+        Retorna as métricas consolidadas de todas as clínicas em uma única consulta
+        
+        As somas vêm das linhas de resumo_mensal, como os demais números da página do admin.
+        As clínicas ativas são contadas em dados_dashboard (clínicas distintas com dados em
+        algum mês do período), em uma subconsulta do mesmo comando.
+        
+        Args:
+            meses: Lista de meses para filtrar (opcional)
+        
+        Returns:
+            MetricasConsolidadas ou None em caso de erro
+        """
+        session = self.db_manager.get_session(session)
         try:
-            # Busca todos os dados de todas as clínicas (exceto admin)
-            dados = session.query(DadosDashboard).join(Cliente).filter(
-                Cliente.is_admin == False,
-                Cliente.ativo == True
-            ).all()
+            clinicas_ativas = select(func.count(func.distinct(DadosDashboard.cliente_id))).join(
+                Cliente, Cliente.id == DadosDashboard.cliente_id
+            ).where(Cliente.is_admin == False, Cliente.ativo == True)
+            if meses is not None:
+                clinicas_ativas = clinicas_ativas.where(DadosDashboard.mes.in_(meses))
             
-            if not dados:
-                return {
-                    'total_leads': 0,
-                    'total_consultas_marcadas': 0,
-                    'total_consultas_comparecidas': 0,
-                    'total_fechamentos': 0,
-                    'total_faturamento': 0,
-                    'total_investimento': 0,
-                    'roas_medio': 0,
-                    'custo_por_lead_medio': 0,
-                    'ticket_medio': 0,
-                    'clinicas_ativas': 0,
-                    'meses_ativos': 0
-                }
-            
-            # Agregação dos dados
-            total_leads = sum(d.leads_totais for d in dados)
-            total_consultas_marcadas = sum(d.consultas_marcadas_totais for d in dados)
-            total_consultas_comparecidas = sum(d.consultas_comparecidas for d in dados)
-            total_fechamentos = sum(d.fechamentos_totais for d in dados)
-            total_faturamento = sum(d.faturamento for d in dados)
-            total_investimento = sum(d.valor_investido_total for d in dados)
-            
-            # Cálculos de médias
-            roas_medio = (total_faturamento / total_investimento) if total_investimento > 0 else 0
-            custo_por_lead_medio = (total_investimento / total_leads) if total_leads > 0 else 0
-            ticket_medio = (total_faturamento / total_fechamentos) if total_fechamentos > 0 else 0
-            
-            # Contagem de clínicas ativas
-            clinicas_ativas = len(set(d.cliente_id for d in dados))
-            
-            # Contagem de meses ativos
-            meses_ativos = len(set((d.mes, d.ano) for d in dados))
+            query = session.query(
+                func.coalesce(func.sum(ResumoMensal.leads_totais), 0).label('leads_totais'),
+                func.coalesce(func.sum(ResumoMensal.consultas_marcadas_totais), 0).label('consultas_marcadas_totais'),
+                func.coalesce(func.sum(ResumoMensal.consultas_comparecidas), 0).label('consultas_comparecidas'),
+                func.coalesce(func.sum(ResumoMensal.fechamentos_totais), 0).label('fechamentos_totais'),
+                func.coalesce(func.sum(ResumoMensal.faturamento), 0.0).label('faturamento'),
+                func.coalesce(func.sum(ResumoMensal.valor_investido_total), 0.0).label('valor_investido_total'),
+                func.count(func.distinct(cast(ResumoMensal.ano, String) + '/' + ResumoMensal.mes)).label('meses_ativos'),
+                clinicas_ativas.scalar_subquery().label('clinicas_ativas')
+            )
+            if meses is not None:
+                query = query.filter(ResumoMensal.mes.in_(meses))
             
-            return {
-                'total_leads': total_leads,
-                'total_consultas_marcadas': total_consultas_marcadas,
-                'total_consultas_comparecidas': total_consultas_comparecidas,
-                'total_fechamentos': total_fechamentos,
-                'total_faturamento': total_faturamento,
-                'total_investimento': total_investimento,
-                'roas_medio': roas_medio,
-                'custo_por_lead_medio': custo_por_lead_medio,
-                'ticket_medio': ticket_medio,
-                'clinicas_ativas': clinicas_ativas,
-                'meses_ativos': meses_ativos
-            }
+            result = query.one()
+            return MetricasConsolidadas(**result._asdict())
             
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao buscar métricas consolidadas: {e}")
-            return {}
+            return None
         finally:
             self.db_manager.close_session(session)
     
-    def get_clinics_comparison(self) -> List[Dict[str, Any]]:
-        """Retorna dados comparativos entre clínicas"""
-        session = self.db_manager.get_session()
+    def get_clinics_comparison(self, meses: List[str] = None, *, session: Session = None) -> List[Dict[str, Any]]:
+        """
+        Retorna dados comparativos entre clínicas em uma única consulta agregada
+        
+        Os KPIs são razões entre as somas do período (ex: faturamento total / investimento
+        total), e não médias dos valores mensais.
+        
+        Args:
+            meses: Lista de meses para filtrar (opcional)
+        """
+        session = self.db_manager.get_session(session)
         try:
-            # Busca dados agrupados por clínica
-            from sqlalchemy import func
-            
             query = session.query(
                 Cliente.nome_da_clinica,
                 Cliente.nome,
@@ -479,15 +1142,17 @@ class AdminDashboardCRUD:
                 func.sum(DadosDashboard.fechamentos_totais).label('total_fechamentos'),
                 func.sum(DadosDashboard.faturamento).label('total_faturamento'),
                 func.sum(DadosDashboard.valor_investido_total).label('total_investimento'),
-                func.avg(DadosDashboard.roas).label('roas_medio'),
-                func.avg(DadosDashboard.custo_por_lead_total).label('custo_por_lead_medio'),
-                func.avg(DadosDashboard.ticket_medio).label('ticket_medio')
+                razao_das_somas('ROAS').label('roas_medio'),
+                razao_das_somas('Custo_por_Lead_Total').label('custo_por_lead_medio'),
+                razao_das_somas('Ticket_Medio').label('ticket_medio')
             ).join(DadosDashboard).filter(
                 Cliente.is_admin == False,
                 Cliente.ativo == True
-            ).group_by(Cliente.id, Cliente.nome_da_clinica, Cliente.nome)
+            )
+            if meses is not None:
+                query = query.filter(DadosDashboard.mes.in_(meses))
             
-            results = query.all()
+            results = query.group_by(Cliente.id, Cliente.nome_da_clinica, Cliente.nome).all()
             
             clinicas = []
             for result in results:
@@ -508,74 +1173,68 @@ class AdminDashboardCRUD:
             return clinicas
             
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao buscar comparação de clínicas: {e}")
             return []
         finally:
             self.db_manager.close_session(session)
     
-    def get_monthly_evolution(self) -> List[Dict[str, Any]]:
-        """Retorna evolução mensal consolidada"""
-        session = self.db_manager.get_session()
+    def get_monthly_evolution(self, meses: List[str] = None, *, session: Session = None) -> List[Dict[str, Any]]:
+        """
+        Retorna evolução mensal consolidada, lida de resumo_mensal
+        
+        Args:
+            meses: Lista de meses para filtrar (opcional)
+        """
+        session = self.db_manager.get_session(session)
         try:
-            from sqlalchemy import func
-            
-            query = session.query(
-                DadosDashboard.mes,
-                DadosDashboard.ano,
-                func.sum(DadosDashboard.leads_totais).label('total_leads'),
-                func.sum(DadosDashboard.consultas_marcadas_totais).label('total_consultas_marcadas'),
-                func.sum(DadosDashboard.consultas_comparecidas).label('total_consultas_comparecidas'),
-                func.sum(DadosDashboard.fechamentos_totais).label('total_fechamentos'),
-                func.sum(DadosDashboard.faturamento).label('total_faturamento'),
-                func.sum(DadosDashboard.valor_investido_total).label('total_investimento')
-            ).join(Cliente).filter(
-                Cliente.is_admin == False,
-                Cliente.ativo == True
-            ).group_by(DadosDashboard.mes, DadosDashboard.ano).order_by(
-                DadosDashboard.ano, DadosDashboard.mes
-            )
-            
-            results = query.all()
+            query = session.query(ResumoMensal)
+            if meses is not None:
+                query = query.filter(ResumoMensal.mes.in_(meses))
+            results = query.order_by(ResumoMensal.ano, ResumoMensal.mes_numero).all()
             
             meses = []
             for result in results:
                 meses.append({
                     'mes': result.mes,
                     'ano': result.ano,
-                    'total_leads': result.total_leads or 0,
-                    'total_consultas_marcadas': result.total_consultas_marcadas or 0,
-                    'total_consultas_comparecidas': result.total_consultas_comparecidas or 0,
-                    'total_fechamentos': result.total_fechamentos or 0,
-                    'total_faturamento': result.total_faturamento or 0,
-                    'total_investimento': result.total_investimento or 0
+                    'total_leads': result.leads_totais or 0,
+                    'total_consultas_marcadas': result.consultas_marcadas_totais or 0,
+                    'total_consultas_comparecidas': result.consultas_comparecidas or 0,
+                    'total_fechamentos': result.fechamentos_totais or 0,
+                    'total_faturamento': result.faturamento or 0,
+                    'total_investimento': result.valor_investido_total or 0
                 })
             
             return meses
             
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao buscar evolução mensal: {e}")
             return []
         finally:
             self.db_manager.close_session(session)
     
-    def get_channel_analysis(self) -> Dict[str, Any]:
-        """Retorna análise por canal de marketing"""
-        session = self.db_manager.get_session()
+    def get_channel_analysis(self, meses: List[str] = None, *, session: Session = None) -> Dict[str, Any]:
+        """
+        Retorna análise por canal de marketing, somando as linhas de resumo_mensal
+        
+        Args:
+            meses: Lista de meses para filtrar (opcional)
+        """
+        session = self.db_manager.get_session(session)
         try:
-            from sqlalchemy import func
-            
             query = session.query(
-                func.sum(DadosDashboard.leads_google_ads).label('leads_google'),
-                func.sum(DadosDashboard.leads_meta_ads).label('leads_meta'),
-                func.sum(DadosDashboard.leads_instagram_organico).label('leads_instagram'),
-                func.sum(DadosDashboard.leads_indicacao).label('leads_indicacao'),
-                func.sum(DadosDashboard.leads_origem_desconhecida).label('leads_desconhecida'),
-                func.sum(DadosDashboard.orcamento_realizado_google).label('investimento_google'),
-                func.sum(DadosDashboard.orcamento_realizado_facebook).label('investimento_facebook')
-            ).join(Cliente).filter(
-                Cliente.is_admin == False,
-                Cliente.ativo == True
+                func.sum(ResumoMensal.leads_google_ads).label('leads_google'),
+                func.sum(ResumoMensal.leads_meta_ads).label('leads_meta'),
+                func.sum(ResumoMensal.leads_instagram_organico).label('leads_instagram'),
+                func.sum(ResumoMensal.leads_indicacao).label('leads_indicacao'),
+                func.sum(ResumoMensal.leads_origem_desconhecida).label('leads_desconhecida'),
+                func.sum(ResumoMensal.orcamento_realizado_google).label('investimento_google'),
+                func.sum(ResumoMensal.orcamento_realizado_facebook).label('investimento_facebook')
             )
+            if meses is not None:
+                query = query.filter(ResumoMensal.mes.in_(meses))
             
             result = query.first()
             
@@ -590,10 +1249,33 @@ class AdminDashboardCRUD:
             }
             
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao buscar análise de canais: {e}")
             return {}
         finally:
             self.db_manager.close_session(session)
+    
+    def rebuild_resumo_mensal(self, *, session: Session = None) -> Optional[int]:
+        """
+        Recalcula todo o resumo mensal a partir de dados_dashboard
+        
+        Usado pela migração que cria a tabela e para corrigir o resumo após escritas
+        feitas fora do CRUD.
+        
+        Returns:
+            Número de meses no resumo ou None em caso de erro
+        """
+        session = self.db_manager.get_session(session)
+        try:
+            atualizar_resumo_mensal(session)
+            session.commit()
+            return session.query(func.count(ResumoMensal.id)).scalar()
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao recalcular resumo mensal: {e}")
+            return None
+        finally:
+            self.db_manager.close_session(session)
 
 class ProcedimentoCRUD:
     """Operações CRUD para a tabela de procedimentos"""
@@ -602,9 +1284,9 @@ class ProcedimentoCRUD:
         self.db_manager = db_manager
     
     def create_procedimento(self, cliente_id: int, procedimento: str, mes_referencia: str, 
-                           ano_referencia: int = 2024, **kwargs) -> Optional[Procedimento]:
+                           ano_referencia: int = ANO_REFERENCIA, *, session: Session = None, **kwargs) -> Optional[Procedimento]:
         """Cria um novo procedimento"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             procedimento_obj = Procedimento(
                 cliente_id=cliente_id,
@@ -616,6 +1298,7 @@ class ProcedimentoCRUD:
             session.add(procedimento_obj)
             session.commit()
             session.refresh(procedimento_obj)
+            clinic_cache.invalidate(cliente_id)
             return procedimento_obj
         except SQLAlchemyError as e:
             session.rollback()
@@ -624,36 +1307,190 @@ class ProcedimentoCRUD:
         finally:
             self.db_manager.close_session(session)
     
-    def get_procedimentos_by_cliente(self, cliente_id: int) -> List[Procedimento]:
+    def bulk_create(self, cliente_id: int, registros: List[Dict[str, Any]],
+                    substituir_meses: bool = False, batch_size: int = 500, *, session: Session = None) -> Optional[int]:
+        """
+        Insere vários procedimentos de um cliente em uma única transação
+        
+        Os registros são inseridos em lotes de batch_size linhas. Com substituir_meses,
+        os procedimentos já gravados nos meses de referência dos registros são removidos
+        na mesma transação, então leitores nunca veem a clínica parcialmente importada.
+        
+        Args:
+            cliente_id: ID do cliente
+            registros: Lista de dicionários com os campos de Procedimento
+            substituir_meses: Substitui os procedimentos dos meses (mes_referencia, ano_referencia) importados
+            batch_size: Número de linhas por comando INSERT
+        
+        Returns:
+            Número de procedimentos inseridos ou None em caso de erro
+        """
+        if not registros:
+            return 0
+        
+        session = self.db_manager.get_session(session)
+        try:
+            valores = [{'ano_referencia': ANO_REFERENCIA, **registro, 'cliente_id': cliente_id} for registro in registros]
+            
+            if substituir_meses:
+                periodos = {(valor['mes_referencia'], valor['ano_referencia']) for valor in valores}
+                session.execute(delete(Procedimento).where(
+                    Procedimento.cliente_id == cliente_id,
+                    or_(*[
+                        and_(Procedimento.mes_referencia == mes, Procedimento.ano_referencia == ano)
+                        for mes, ano in periodos
+                    ])
+                ))
+            
+            for inicio in range(0, len(valores), batch_size):
+                session.execute(insert(Procedimento), valores[inicio:inicio + batch_size])
+            
+            session.commit()
+            clinic_cache.invalidate(cliente_id)
+            return len(valores)
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao inserir procedimentos: {e}")
+            return None
+        finally:
+            self.db_manager.close_session(session)
+    
+    def get_procedimentos_by_cliente(self, cliente_id: int, *, session: Session = None) -> List[ProcedimentoLeitura]:
         """Busca todos os procedimentos de um cliente"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
-            return session.query(Procedimento).filter(
+            rows = session.execute(select(*ProcedimentoLeitura.colunas).where(
                 Procedimento.cliente_id == cliente_id
-            ).order_by(Procedimento.ano_referencia, Procedimento.mes_referencia, Procedimento.data_criacao).all()
+            ).order_by(
+                Procedimento.ano_referencia, Procedimento.mes_referencia_numero, Procedimento.data_criacao
+            )).all()
+            return [ProcedimentoLeitura(*row) for row in rows]
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao buscar procedimentos do cliente: {e}")
             return []
         finally:
             self.db_manager.close_session(session)
     
-    def get_procedimentos_by_period(self, cliente_id: int, meses: List[str], ano: int = 2024) -> List[Procedimento]:
+    def get_procedimentos_by_period(self, cliente_id: int, meses: List[str], ano: int = ANO_REFERENCIA, *, session: Session = None) -> List[ProcedimentoLeitura]:
         """Busca procedimentos de um cliente para meses específicos"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
-            return session.query(Procedimento).filter(
+            rows = session.execute(select(*ProcedimentoLeitura.colunas).where(
                 Procedimento.cliente_id == cliente_id,
                 Procedimento.mes_referencia.in_(meses),
                 Procedimento.ano_referencia == ano
-            ).order_by(Procedimento.mes_referencia, Procedimento.data_criacao).all()
+            ).order_by(Procedimento.mes_referencia_numero, Procedimento.data_criacao)).all()
+            return [ProcedimentoLeitura(*row) for row in rows]
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao buscar procedimentos do período: {e}")
+            return []
+        finally:
+            self.db_manager.close_session(session)
+
+    def get_procedimentos_by_range(self, cliente_id: int, inicio: Optional[Periodo] = None,
+                                   fim: Optional[Periodo] = None, meses: List[str] = None, *,
+                                   session: Session = None) -> List[ProcedimentoLeitura]:
+        """Busca procedimentos de um cliente entre dois períodos (ano, mês), inclusive, opcionalmente só dos meses informados"""
+        session = self.db_manager.get_session(session)
+        try:
+            query = select(*ProcedimentoLeitura.colunas).where(
+                Procedimento.cliente_id == cliente_id,
+                *filtro_periodo(Procedimento.ano_referencia, Procedimento.mes_referencia_numero, inicio, fim)
+            )
+            if meses is not None:
+                query = query.where(Procedimento.mes_referencia.in_(meses))
+            rows = session.execute(query.order_by(
+                Procedimento.ano_referencia, Procedimento.mes_referencia_numero, Procedimento.data_criacao
+            )).all()
+            return [ProcedimentoLeitura(*row) for row in rows]
         except SQLAlchemyError as e:
+            session.rollback()
             print(f"❌ Erro ao buscar procedimentos do período: {e}")
             return []
         finally:
             self.db_manager.close_session(session)
-    
-    def procedimentos_to_dataframe(self, procedimentos: List[Procedimento]) -> pd.DataFrame:
-        """Converte procedimentos do banco para DataFrame do pandas"""
+
+    def get_procedimentos_consolidados(self, meses: List[str] = None, *, session: Session = None) -> pd.DataFrame:
+        """
+        Busca em uma única consulta os procedimentos de todas as clínicas ativas (exceto admin)
+
+        Args:
+            meses: Lista de meses de referência para filtrar (opcional)
+
+        Returns:
+            pd.DataFrame: Procedimentos de todas as clínicas, identificados por Cliente_ID e Nome_Clinica
+        """
+        session = self.db_manager.get_session(session)
+        try:
+            colunas = [getattr(Procedimento, attr) for attr in COLUNAS_PROCEDIMENTOS_DATAFRAME.values()]
+            query = session.query(*colunas, Cliente.nome_da_clinica).select_from(
+                Procedimento
+            ).join(Cliente, Procedimento.cliente_id == Cliente.id).filter(
+                Cliente.is_admin == False,
+                Cliente.ativo == True
+            )
+            if meses is not None:
+                query = query.filter(Procedimento.mes_referencia.in_(meses))
+            rows = query.order_by(
+                Procedimento.cliente_id, Procedimento.ano_referencia,
+                Procedimento.mes_referencia_numero, Procedimento.data_criacao
+            ).all()
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao buscar procedimentos consolidados: {e}")
+            return pd.DataFrame()
+        finally:
+            self.db_manager.close_session(session)
+
+        if not rows:
+            return pd.DataFrame()
+
+        return pd.DataFrame.from_records(rows, columns=[*COLUNAS_PROCEDIMENTOS_DATAFRAME.keys(), 'Nome_Clinica'])
+
+    def get_evolucao_procedimentos(self, meses: List[str] = None, *, session: Session = None) -> List[Dict[str, Any]]:
+        """
+        Retorna quantidade e faturamento mensais dos procedimentos de todas as clínicas ativas
+        (exceto admin), agregados e em ordem cronológica no banco
+        
+        Args:
+            meses: Lista de meses de referência para filtrar (opcional)
+        """
+        session = self.db_manager.get_session(session)
+        try:
+            query = session.query(
+                Procedimento.ano_referencia,
+                Procedimento.mes_referencia_numero,
+                Procedimento.mes_referencia,
+                func.count(Procedimento.id).label('quantidade'),
+                func.coalesce(func.sum(Procedimento.valor_da_venda), 0.0).label('faturamento')
+            ).join(Cliente, Procedimento.cliente_id == Cliente.id).filter(
+                Cliente.is_admin == False,
+                Cliente.ativo == True
+            )
+            if meses is not None:
+                query = query.filter(Procedimento.mes_referencia.in_(meses))
+            results = query.group_by(
+                Procedimento.ano_referencia, Procedimento.mes_referencia_numero, Procedimento.mes_referencia
+            ).order_by(Procedimento.ano_referencia, Procedimento.mes_referencia_numero).all()
+            
+            return [{
+                'mes': result.mes_referencia,
+                'ano': result.ano_referencia,
+                'quantidade': result.quantidade,
+                'faturamento': result.faturamento
+            } for result in results]
+            
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao buscar evolução dos procedimentos: {e}")
+            return []
+        finally:
+            self.db_manager.close_session(session)
+
+    def procedimentos_to_dataframe(self, procedimentos: List[ProcedimentoLeitura]) -> pd.DataFrame:
+        """Converte procedimentos do banco (em ordem cronológica) para DataFrame do pandas"""
         if not procedimentos:
             return pd.DataFrame()
         
@@ -674,24 +1511,11 @@ class ProcedimentoCRUD:
             'Data_Criacao': [p.data_criacao for p in procedimentos]
         }
         
-        df = pd.DataFrame(data)
-        
-        # Ordena os meses na ordem correta
-        if not df.empty:
-            mes_order = {
-                'Janeiro': 1, 'Fevereiro': 2, 'Março': 3, 'Abril': 4,
-                'Maio': 5, 'Junho': 6, 'Julho': 7, 'Agosto': 8,
-                'Setembro': 9, 'Outubro': 10, 'Novembro': 11, 'Dezembro': 12
-            }
-            
-            df['mes_order'] = df['Mes_Referencia'].map(mes_order)
-            df = df.sort_values(['Ano_Referencia', 'mes_order', 'Data_Criacao']).drop('mes_order', axis=1)
-        
-        return df
+        return pd.DataFrame(data)
     
-    def update_procedimento(self, procedimento_id: int, **kwargs) -> bool:
+    def update_procedimento(self, procedimento_id: int, *, session: Session = None, **kwargs) -> bool:
         """Atualiza dados de um procedimento"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             procedimento = session.query(Procedimento).filter(Procedimento.id == procedimento_id).first()
             if not procedimento:
@@ -702,7 +1526,9 @@ class ProcedimentoCRUD:
                     setattr(procedimento, key, value)
             
             procedimento.data_atualizacao = datetime.utcnow()
+            cliente_id = procedimento.cliente_id
             session.commit()
+            clinic_cache.invalidate(cliente_id)
             return True
         except SQLAlchemyError as e:
             session.rollback()
@@ -711,14 +1537,16 @@ class ProcedimentoCRUD:
         finally:
             self.db_manager.close_session(session)
     
-    def delete_procedimento(self, procedimento_id: int) -> bool:
+    def delete_procedimento(self, procedimento_id: int, *, session: Session = None) -> bool:
         """Remove um procedimento"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             procedimento = session.query(Procedimento).filter(Procedimento.id == procedimento_id).first()
             if procedimento:
+                cliente_id = procedimento.cliente_id
                 session.delete(procedimento)
                 session.commit()
+                clinic_cache.invalidate(cliente_id)
                 return True
             return False
         except SQLAlchemyError as e:
@@ -728,12 +1556,13 @@ class ProcedimentoCRUD:
         finally:
             self.db_manager.close_session(session)
     
-    def delete_procedimentos_by_cliente(self, cliente_id: int) -> bool:
+    def delete_procedimentos_by_cliente(self, cliente_id: int, *, session: Session = None) -> bool:
         """Remove todos os procedimentos de um cliente"""
-        session = self.db_manager.get_session()
+        session = self.db_manager.get_session(session)
         try:
             session.query(Procedimento).filter(Procedimento.cliente_id == cliente_id).delete()
             session.commit()
+            clinic_cache.invalidate(cliente_id)
             return True
         except SQLAlchemyError as e:
             session.rollback()
@@ -742,10 +1571,83 @@ class ProcedimentoCRUD:
         finally:
             self.db_manager.close_session(session)
 
+class SincronizacaoCRUD:
+    """Operações CRUD para o estado da sincronização com o Google Sheets"""
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+    
+    def get_hash(self, cliente_id: int, aba: str, *, session: Session = None) -> Optional[str]:
+        """Retorna o hash do conteúdo da aba na última sincronização"""
+        session = self.db_manager.get_session(session)
+        try:
+            return session.query(EstadoSincronizacao.hash_conteudo).filter(
+                EstadoSincronizacao.cliente_id == cliente_id,
+                EstadoSincronizacao.aba == aba
+            ).scalar()
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao buscar estado da sincronização: {e}")
+            return None
+        finally:
+            self.db_manager.close_session(session)
+    
+    def save_hash(self, cliente_id: int, aba: str, hash_conteudo: str, *, session: Session = None) -> bool:
+        """Registra o hash do conteúdo da aba e o horário da sincronização"""
+        session = self.db_manager.get_session(session)
+        try:
+            estado = session.query(EstadoSincronizacao).filter(
+                EstadoSincronizacao.cliente_id == cliente_id,
+                EstadoSincronizacao.aba == aba
+            ).first()
+            if not estado:
+                estado = EstadoSincronizacao(cliente_id=cliente_id, aba=aba)
+                session.add(estado)
+            
+            estado.hash_conteudo = hash_conteudo
+            estado.ultima_sincronizacao = datetime.utcnow()
+            session.commit()
+            return True
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao salvar estado da sincronização: {e}")
+            return False
+        finally:
+            self.db_manager.close_session(session)
+    
+    def get_ultimas_sincronizacoes(self, *, session: Session = None) -> Dict[int, datetime]:
+        """Retorna, por cliente, o horário (UTC) da sincronização mais recente registrada em qualquer aba"""
+        session = self.db_manager.get_session(session)
+        try:
+            return dict(session.query(
+                EstadoSincronizacao.cliente_id, func.max(EstadoSincronizacao.ultima_sincronizacao)
+            ).group_by(EstadoSincronizacao.cliente_id).all())
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao buscar últimas sincronizações: {e}")
+            return {}
+        finally:
+            self.db_manager.close_session(session)
+    
+    def get_estados_by_cliente(self, cliente_id: int, *, session: Session = None) -> List[EstadoSincronizacao]:
+        """Lista o estado da sincronização de todas as abas de um cliente"""
+        session = self.db_manager.get_session(session)
+        try:
+            return session.query(EstadoSincronizacao).filter(
+                EstadoSincronizacao.cliente_id == cliente_id
+            ).order_by(EstadoSincronizacao.aba).all()
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"❌ Erro ao listar estado da sincronização: {e}")
+            return []
+        finally:
+            self.db_manager.close_session(session)
+
 # Instância global do gerenciador de banco
 db_manager = DatabaseManager()
 cliente_crud = ClienteCRUD(db_manager)
 dados_crud = DadosDashboardCRUD(db_manager)
 admin_dashboard_crud = AdminDashboardCRUD(db_manager)
 procedimento_crud = ProcedimentoCRUD(db_manager)
+sincronizacao_crud = SincronizacaoCRUD(db_manager)
 
@@ -5,7 +5,8 @@ Este script requer configuração de credenciais do Google Sheets API.
 
 import gspread
 import pandas as pd
-from database import db_manager, cliente_crud, dados_crud
+from database import db_manager, cliente_crud, ANO_REFERENCIA
+from import_multiple_sheets import gravar_meses_clinica
 from oauth2client.service_account import ServiceAccountCredentials
 import os
 import json
@@ -178,48 +179,17 @@ def load_taynah_data_from_sheets(cliente_id):
         print("⚠️ Não foi possível acessar o Google Sheets. Usando dados de exemplo...")
         df = create_sample_data_for_taynah()
     
-    # Remove dados existentes da Dra Taynah
-    print("🗑️ Removendo dados existentes...")
-    dados_existentes = dados_crud.get_dados_by_cliente(cliente_id)
-    for dados in dados_existentes:
-        dados_crud.delete_dados_dashboard(dados.id)
+    # Colunas de investimento da planilha antiga -> campos atuais do dashboard
+    df = df.rename(columns={
+        'investimento_total': 'valor_investido_total',
+        'investimento_facebook': 'orcamento_realizado_facebook',
+        'investimento_google': 'orcamento_realizado_google'
+    })
     
-    # Carrega novos dados
-    for _, row in df.iterrows():
-        if row['leads_totais'] > 0:  # Só carrega meses com atividade
-            dados = dados_crud.create_dados_dashboard(
-                cliente_id=cliente_id,
-                mes=row['mes'],
-                ano=2024,
-                leads_totais=int(row['leads_totais']),
-                leads_google_ads=int(row['leads_google_ads']),
-                leads_meta_ads=int(row['leads_meta_ads']),
-                leads_instagram_organico=int(row['leads_instagram_organico']),
-                leads_indicacao=int(row['leads_indicacao']),
-                leads_origem_desconhecida=int(row['leads_origem_desconhecida']),
-                consultas_marcadas_totais=int(row['consultas_marcadas_totais']),
-                consultas_marcadas_google_ads=int(row['consultas_marcadas_google_ads']),
-                consultas_marcadas_meta_ads=int(row['consultas_marcadas_meta_ads']),
-                consultas_marcadas_ig_organico=int(row['consultas_marcadas_ig_organico']),
-                consultas_marcadas_indicacao=int(row['consultas_marcadas_indicacao']),
-                consultas_marcadas_outros=int(row['consultas_marcadas_outros']),
-                consultas_comparecidas=int(row['consultas_comparecidas']),
-                fechamentos_totais=int(row['fechamentos_totais']),
-                fechamentos_google_ads=int(row['fechamentos_google_ads']),
-                fechamentos_meta_ads=int(row['fechamentos_meta_ads']),
-                fechamentos_ig_organico=int(row['fechamentos_ig_organico']),
-                fechamentos_indicacao=int(row['fechamentos_indicacao']),
-                fechamentos_outros=int(row['fechamentos_outros']),
-                faturamento=float(row['faturamento']),
-                investimento_total=float(row['investimento_total']),
-                investimento_facebook=float(row['investimento_facebook']),
-                investimento_google=float(row['investimento_google'])
-            )
-            
-            if dados:
-                print(f"   ✅ Dados de {row['mes']} carregados")
-            else:
-                print(f"   ❌ Erro ao carregar dados de {row['mes']}")
+    # Só carrega meses com atividade
+    if gravar_meses_clinica(cliente_id, df[df['leads_totais'] > 0], ano=ANO_REFERENCIA) is None:
+        print("❌ Erro ao carregar dados da Dra Taynah")
+        return
     
     print("✅ Dados da Dra Taynah carregados com sucesso!")
 
@@ -4,8 +4,9 @@ Configurado para importar dados de ambas as clínicas.
 """
 
 import gspread
+import logging
 import pandas as pd
-from database import db_manager, cliente_crud, dados_crud
+from database import db_manager, cliente_crud, dados_crud, ANO_REFERENCIA
 from oauth2client.service_account import ServiceAccountCredentials
 import os
 import json
@@ -17,6 +18,158 @@ load_dotenv()
 # Configurações
 GOOGLE_SHEETS_CREDENTIALS = os.getenv('GOOGLE_SHEETS_CREDENTIALS', '{}')
 
+logger = logging.getLogger(__name__)
+
+# Meses da aba "Controle de Leads", em ordem
+MESES_PLANILHA = [
+    'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
+]
+
+# Campos gravados pelos importadores, por tipo
+CAMPOS_INTEIROS_DASHBOARD = [
+    'leads_totais',
+    'leads_google_ads',
+    'leads_meta_ads',
+    'leads_instagram_organico',
+    'leads_indicacao',
+    'leads_origem_desconhecida',
+    'consultas_marcadas_totais',
+    'consultas_marcadas_google_ads',
+    'consultas_marcadas_meta_ads',
+    'consultas_marcadas_ig_organico',
+    'consultas_marcadas_indicacao',
+    'consultas_marcadas_outros',
+    'consultas_comparecidas',
+    'fechamentos_totais',
+    'fechamentos_google_ads',
+    'fechamentos_meta_ads',
+    'fechamentos_ig_organico',
+    'fechamentos_indicacao',
+    'fechamentos_outros'
+]
+CAMPOS_DECIMAIS_DASHBOARD = ['faturamento', 'valor_investido_total', 'orcamento_realizado_facebook', 'orcamento_realizado_google']
+
+# Colunas que podem conter o nome da linha, em ordem de prioridade
+COLUNAS_NOME_LINHA = ['Meses', 'm', 'Categoria', 'Tipo']
+
+# Mapeia as linhas da aba "Controle de Leads" para os campos do dashboard
+CONTROLE_LEADS_ROW_MAPPING = {
+    # Leads
+    'Leads Totais': 'leads_totais',
+    'Leads Google Ads': 'leads_google_ads',
+    'Leads Meta Ads': 'leads_meta_ads',
+    'Leads Instagram Orgânico': 'leads_instagram_organico',
+    'Leads Indicação': 'leads_indicacao',
+    'Leads Origem Desconhecida': 'leads_origem_desconhecida',
+    
+    # Consultas Marcadas
+    'Consultas Marcadas Totais': 'consultas_marcadas_totais',
+    'Consultas Marcadas Google Ads': 'consultas_marcadas_google_ads',
+    'Consultas Marcadas Meta Ads': 'consultas_marcadas_meta_ads',
+    'Consultas Marcadas IG Orgânico': 'consultas_marcadas_ig_organico',
+    'Consultas Marcadas Indicação': 'consultas_marcadas_indicacao',
+    'Consultas Marcadas Outros': 'consultas_marcadas_outros',
+    
+    # Consultas Comparecidas
+    'Consultas Comparecidas': 'consultas_comparecidas',
+    
+    # Fechamentos
+    'Fechamentos Protocolos/Cirurgias': 'fechamentos_totais',
+    'Fechamentos Google Ads': 'fechamentos_google_ads',
+    'Fechamentos Meta Ads': 'fechamentos_meta_ads',
+    'Fechamentos IG Orgânico': 'fechamentos_ig_organico',
+    'Fechamentos Indicação': 'fechamentos_indicacao',
+    'Fechamentos Outros': 'fechamentos_outros',
+    
+    # Dados Financeiros
+    'Faturamento': 'faturamento',
+    'Valor Investido Total (Realizado)': 'valor_investido_total',
+    'Orçamento Previsto Total': 'orcamento_previsto_total',
+    'Orçamento Realizado Facebook Ads': 'orcamento_realizado_facebook',
+    'Orçamento Previsto Facebook Ads': 'orcamento_previsto_facebook',
+    'Orçamento Realizado Google Ads': 'orcamento_realizado_google',
+    'Orçamento Previsto Google Ads': 'orcamento_previsto_google',
+    
+    # KPIs de Conversão
+    '% de conversão Csm./leads': 'conversao_csm_leads',
+    '% de conversão Csc./Csm.': 'conversao_csc_csm',
+    '% de conversão fechamento/Csc.': 'conversao_fechamento_csc',
+    '% de conversão fechamento/leads': 'conversao_fechamento_leads',
+    
+    # KPIs Financeiros
+    'Custo por Compra (Cirurgias)': 'custo_por_compra_cirurgias',
+    'Retorno Sobre Investimento (ROAS)': 'roas',
+    'Custo por Lead Total': 'custo_por_lead_total',
+    'Custo por Consulta Marcada': 'custo_por_consulta_marcada',
+    'Custo por Consulta Comparecida': 'custo_por_consulta_comparecida',
+    'Ticket Médio': 'ticket_medio'
+}
+
+# Campos em moeda (R$); os demais campos mapeados são lidos como inteiros
+CAMPOS_MOEDA = [
+    'faturamento', 'valor_investido_total', 'orcamento_realizado_facebook', 'orcamento_realizado_google',
+    'orcamento_previsto_total', 'orcamento_previsto_facebook', 'orcamento_previsto_google'
+]
+
+# Valores de um mês sem dados na planilha
+DADOS_MES_PADRAO = {
+    # Leads
+    'leads_totais': 0,
+    'leads_google_ads': 0,
+    'leads_meta_ads': 0,
+    'leads_instagram_organico': 0,
+    'leads_indicacao': 0,
+    'leads_origem_desconhecida': 0,
+    
+    # Consultas Marcadas
+    'consultas_marcadas_totais': 0,
+    'consultas_marcadas_google_ads': 0,
+    'consultas_marcadas_meta_ads': 0,
+    'consultas_marcadas_ig_organico': 0,
+    'consultas_marcadas_indicacao': 0,
+    'consultas_marcadas_outros': 0,
+    
+    # Consultas Comparecidas
+    'consultas_comparecidas': 0,
+    
+    # Fechamentos
+    'fechamentos_totais': 0,
+    'fechamentos_google_ads': 0,
+    'fechamentos_meta_ads': 0,
+    'fechamentos_ig_organico': 0,
+    'fechamentos_indicacao': 0,
+    'fechamentos_outros': 0,
+    
+    # Dados Financeiros
+    'faturamento': 0.0,
+    'valor_investido_total': 0.0,
+    'orcamento_previsto_total': 0.0,
+    'orcamento_realizado_facebook': 0.0,
+    'orcamento_previsto_facebook': 0.0,
+    'orcamento_realizado_google': 0.0,
+    'orcamento_previsto_google': 0.0,
+    
+    # KPIs de Conversão
+    'conversao_csm_leads': 0.0,
+    'conversao_csc_csm': 0.0,
+    'conversao_fechamento_csc': 0.0,
+    'conversao_fechamento_leads': 0.0,
+    
+    # KPIs Financeiros
+    'custo_por_compra_cirurgias': 0.0,
+    'roas': 0.0,
+    'custo_por_lead_total': 0.0,
+    'custo_por_consulta_marcada': 0.0,
+    'custo_por_consulta_comparecida': 0.0,
+    'ticket_medio': 0.0,
+    
+    # Taxas Ideais
+    'taxa_ideal_csm': 10.0,
+    'taxa_ideal_csc': 50.0,
+    'taxa_ideal_fechamentos': 40.0
+}
+
 # Configuração das planilhas
 SHEETS_CONFIG = {
     "joao": {
@@ -60,6 +213,30 @@ def setup_google_sheets_auth():
         print(f"❌ Erro na autenticação: {e}")
         return None
 
+def values_to_records(values):
+    """
+    Converte o resultado de worksheet.get_all_values() em registros
+    
+    Produz o mesmo resultado de worksheet.get_all_records(), permitindo ler a aba
+    uma única vez e reaproveitar os valores brutos (ex: para calcular o hash).
+    """
+    if not values or len(values) < 2:
+        return []
+    
+    keys = list(values[0])
+    rows = values[1:]
+    
+    # Iguala a largura dos cabeçalhos e das linhas
+    width = max(len(keys), max(len(row) for row in rows))
+    keys.extend([''] * (width - len(keys)))
+    rows = gspread.utils.fill_gaps(rows, cols=width, padding_value='')
+    
+    if len(keys) != len(set(keys)):
+        raise gspread.exceptions.GSpreadException("the header row in the worksheet is not unique")
+    
+    rows = [gspread.utils.numericise_all(row) for row in rows]
+    return [dict(zip(keys, row)) for row in rows]
+
 def is_dashboard_data_structure(data):
     """Verifica se uma aba tem a estrutura de dados do dashboard"""
     if not data or len(data) == 0:
@@ -82,184 +259,83 @@ def is_dashboard_data_structure(data):
     
     return False
 
+def _parse_currency(valor):
+    """Converte um valor em moeda brasileira ('R$ 1.234,56') para float; negativos viram 0"""
+    if isinstance(valor, str):
+        # Remove formatação de moeda e mantém apenas dígitos, ponto, vírgula e sinal
+        valor = valor.replace('R$', '').replace('.', '').replace(',', '.').strip()
+        valor = ''.join(filter(_is_currency_char, valor))
+        if valor.startswith('-'):
+            valor = '0'
+    try:
+        return float(valor) if valor else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+def _is_currency_char(c):
+    return c.isdigit() or c in '.,-'
+
+def _parse_integer(valor):
+    """Converte um valor para int (0 quando não é um número inteiro)"""
+    try:
+        return int(valor) if valor else 0
+    except (ValueError, TypeError, OverflowError):
+        return 0
+
+# Linha da planilha -> (campo, função de conversão), montado uma única vez
+_CONTROLE_LEADS_CONVERSORES = {
+    linha: (campo, _parse_currency if campo in CAMPOS_MOEDA else _parse_integer)
+    for linha, campo in CONTROLE_LEADS_ROW_MAPPING.items()
+}
+
 def process_controle_leads_data(data):
-    """Processa dados da aba 'Controle de Leads' para formato do dashboard"""
-    
-    processed_data = []
-    
-    # Mapeia os dados da planilha para o formato do dashboard
-    meses_map = {
-        'Janeiro': 'Janeiro',
-        'Fevereiro': 'Fevereiro', 
-        'Março': 'Março',
-        'Abril': 'Abril',
-        'Maio': 'Maio',
-        'Junho': 'Junho',
-        'Julho': 'Julho',
-        'Agosto': 'Agosto',
-        'Setembro': 'Setembro',
-        'Outubro': 'Outubro',
-        'Novembro': 'Novembro',
-        'Dezembro': 'Dezembro'
-    }
+    """
+    Processa dados da aba 'Controle de Leads' para formato do dashboard
     
-    # Mapeia as linhas da planilha para os campos do dashboard (novo formato)
-    row_mapping = {
-        # Leads
-        'Leads Totais': 'leads_totais',
-        'Leads Google Ads': 'leads_google_ads',
-        'Leads Meta Ads': 'leads_meta_ads',
-        'Leads Instagram Orgânico': 'leads_instagram_organico',
-        'Leads Indicação': 'leads_indicacao',
-        'Leads Origem Desconhecida': 'leads_origem_desconhecida',
-        
-        # Consultas Marcadas
-        'Consultas Marcadas Totais': 'consultas_marcadas_totais',
-        'Consultas Marcadas Google Ads': 'consultas_marcadas_google_ads',
-        'Consultas Marcadas Meta Ads': 'consultas_marcadas_meta_ads',
-        'Consultas Marcadas IG Orgânico': 'consultas_marcadas_ig_organico',
-        'Consultas Marcadas Indicação': 'consultas_marcadas_indicacao',
-        'Consultas Marcadas Outros': 'consultas_marcadas_outros',
-        
-        # Consultas Comparecidas
-        'Consultas Comparecidas': 'consultas_comparecidas',
-        
-        # Fechamentos
-        'Fechamentos Protocolos/Cirurgias': 'fechamentos_totais',
-        'Fechamentos Google Ads': 'fechamentos_google_ads',
-        'Fechamentos Meta Ads': 'fechamentos_meta_ads',
-        'Fechamentos IG Orgânico': 'fechamentos_ig_organico',
-        'Fechamentos Indicação': 'fechamentos_indicacao',
-        'Fechamentos Outros': 'fechamentos_outros',
-        
-        # Dados Financeiros
-        'Faturamento': 'faturamento',
-        'Valor Investido Total (Realizado)': 'valor_investido_total',
-        'Orçamento Previsto Total': 'orcamento_previsto_total',
-        'Orçamento Realizado Facebook Ads': 'orcamento_realizado_facebook',
-        'Orçamento Previsto Facebook Ads': 'orcamento_previsto_facebook',
-        'Orçamento Realizado Google Ads': 'orcamento_realizado_google',
-        'Orçamento Previsto Google Ads': 'orcamento_previsto_google',
-        
-        # KPIs de Conversão
-        '% de conversão Csm./leads': 'conversao_csm_leads',
-        '% de conversão Csc./Csm.': 'conversao_csc_csm',
-        '% de conversão fechamento/Csc.': 'conversao_fechamento_csc',
-        '% de conversão fechamento/leads': 'conversao_fechamento_leads',
-        
-        # KPIs Financeiros
-        'Custo por Compra (Cirurgias)': 'custo_por_compra_cirurgias',
-        'Retorno Sobre Investimento (ROAS)': 'roas',
-        'Custo por Lead Total': 'custo_por_lead_total',
-        'Custo por Consulta Marcada': 'custo_por_consulta_marcada',
-        'Custo por Consulta Comparecida': 'custo_por_consulta_comparecida',
-        'Ticket Médio': 'ticket_medio'
-    }
+    Os detalhes de cada linha e célula são registrados no logger do módulo em nível DEBUG.
+    
+    Args:
+        data: Registros da aba (lista de dicts, como retornado por values_to_records)
     
+    Returns:
+        Lista com um dict por mês, na ordem em que os meses aparecem na planilha
+    """
     # Cria um dicionário para armazenar dados por mês
     meses_data = {}
     
     # Processa cada linha da planilha
     for row in data:
         # Tenta diferentes nomes de coluna para a primeira coluna
-        row_name = None
-        for col_name in ['Meses', 'm', 'Categoria', 'Tipo']:
-            if row.get(col_name) and row.get(col_name) != col_name:
-                row_name = row[col_name]
-                break
+        row_name = next(
+            (row[col_name] for col_name in COLUNAS_NOME_LINHA if row.get(col_name) and row.get(col_name) != col_name),
+            None
+        )
+        if not row_name:
+            continue
+        
+        logger.debug("   🔍 Processando linha: %s", row_name)
         
-        if row_name:
-            print(f"   🔍 Processando linha: {row_name}")
+        # Verifica se é uma linha que mapeamos
+        conversao = _CONTROLE_LEADS_CONVERSORES.get(row_name)
+        if conversao is None:
+            continue
+        field_name, converter = conversao
+        
+        # Processa cada mês
+        for mes in MESES_PLANILHA:
+            valor = row.get(mes)
+            if not valor:
+                continue
             
-            # Verifica se é uma linha que mapeamos
-            if row_name in row_mapping:
-                field_name = row_mapping[row_name]
-                
-                # Processa cada mês
-                for mes_planilha, mes_dashboard in meses_map.items():
-                    if mes_planilha in row and row[mes_planilha]:
-                        # Inicializa o mês se não existir
-                        if mes_dashboard not in meses_data:
-                            meses_data[mes_dashboard] = {
-                                'mes': mes_dashboard,
-                                # Leads
-                                'leads_totais': 0,
-                                'leads_google_ads': 0,
-                                'leads_meta_ads': 0,
-                                'leads_instagram_organico': 0,
-                                'leads_indicacao': 0,
-                                'leads_origem_desconhecida': 0,
-                                
-                                # Consultas Marcadas
-                                'consultas_marcadas_totais': 0,
-                                'consultas_marcadas_google_ads': 0,
-                                'consultas_marcadas_meta_ads': 0,
-                                'consultas_marcadas_ig_organico': 0,
-                                'consultas_marcadas_indicacao': 0,
-                                'consultas_marcadas_outros': 0,
-                                
-                                # Consultas Comparecidas
-                                'consultas_comparecidas': 0,
-                                
-                                # Fechamentos
-                                'fechamentos_totais': 0,
-                                'fechamentos_google_ads': 0,
-                                'fechamentos_meta_ads': 0,
-                                'fechamentos_ig_organico': 0,
-                                'fechamentos_indicacao': 0,
-                                'fechamentos_outros': 0,
-                                
-                                # Dados Financeiros
-                                'faturamento': 0.0,
-                                'valor_investido_total': 0.0,
-                                'orcamento_previsto_total': 0.0,
-                                'orcamento_realizado_facebook': 0.0,
-                                'orcamento_previsto_facebook': 0.0,
-                                'orcamento_realizado_google': 0.0,
-                                'orcamento_previsto_google': 0.0,
-                                
-                                # KPIs de Conversão
-                                'conversao_csm_leads': 0.0,
-                                'conversao_csc_csm': 0.0,
-                                'conversao_fechamento_csc': 0.0,
-                                'conversao_fechamento_leads': 0.0,
-                                
-                                # KPIs Financeiros
-                                'custo_por_compra_cirurgias': 0.0,
-                                'roas': 0.0,
-                                'custo_por_lead_total': 0.0,
-                                'custo_por_consulta_marcada': 0.0,
-                                'custo_por_consulta_comparecida': 0.0,
-                                'ticket_medio': 0.0,
-                                
-                                # Taxas Ideais
-                                'taxa_ideal_csm': 10.0,
-                                'taxa_ideal_csc': 50.0,
-                                'taxa_ideal_fechamentos': 40.0
-                            }
-                        
-                        # Converte o valor para o tipo correto
-                        valor = row[mes_planilha]
-                        if valor and valor != 0 and valor != '-':
-                            print(f"     📅 {mes_planilha}: {valor} ({field_name})")
-                            if field_name in ['faturamento', 'valor_investido_total', 'orcamento_realizado_facebook', 'orcamento_realizado_google', 'orcamento_previsto_total', 'orcamento_previsto_facebook', 'orcamento_previsto_google']:
-                                # Remove formatação de moeda e converte para float
-                                if isinstance(valor, str):
-                                    valor = valor.replace('R$', '').replace('.', '').replace(',', '.').strip()
-                                    # Remove caracteres não numéricos exceto ponto e vírgula
-                                    valor = ''.join(c for c in valor if c.isdigit() or c in '.,-')
-                                    # Trata valores negativos
-                                    if valor.startswith('-'):
-                                        valor = '0'
-                                try:
-                                    meses_data[mes_dashboard][field_name] = float(valor) if valor else 0.0
-                                except (ValueError, TypeError):
-                                    meses_data[mes_dashboard][field_name] = 0.0
-                            else:
-                                try:
-                                    meses_data[mes_dashboard][field_name] = int(valor) if valor else 0
-                                except (ValueError, TypeError):
-                                    meses_data[mes_dashboard][field_name] = 0
+            # Inicializa o mês se não existir
+            mes_data = meses_data.get(mes)
+            if mes_data is None:
+                mes_data = meses_data[mes] = {'mes': mes, **DADOS_MES_PADRAO}
+            
+            # Converte o valor para o tipo correto ('-' e 0 mantêm o padrão)
+            if valor != 0 and valor != '-':
+                logger.debug("     📅 %s: %s (%s)", mes, valor, field_name)
+                mes_data[field_name] = converter(valor)
     
     # Converte para lista
     processed_data = list(meses_data.values())
@@ -488,6 +564,37 @@ def create_sample_data(clinic_name):
     
     return pd.DataFrame(sample_data)
 
+def gravar_meses_clinica(cliente_id, df, *, ano):
+    """
+    Grava os meses do DataFrame e remove os meses do ano que saíram da planilha, em uma única transação
+    
+    Args:
+        cliente_id: ID da clínica
+        df: Meses a gravar (coluna 'mes' e os campos do dashboard)
+        ano: Ano dos meses (as abas da planilha não informam o ano)
+    
+    Returns:
+        Número de meses gravados ou None em caso de erro
+    """
+    registros = [
+        {
+            'mes': row['mes'],
+            **{campo: int(row[campo]) for campo in CAMPOS_INTEIROS_DASHBOARD},
+            **{campo: float(row[campo]) for campo in CAMPOS_DECIMAIS_DASHBOARD}
+        }
+        for _, row in df.iterrows()
+    ]
+    
+    resultado = dados_crud.sync_dados_cliente(cliente_id, registros, ano=ano)
+    if resultado is None:
+        return None
+    
+    if resultado['removidos']:
+        print(f"🗑️ {resultado['removidos']} meses de {ano} que não estão mais na planilha removidos")
+    for registro in registros:
+        print(f"   ✅ Dados de {registro['mes']} carregados")
+    return len(registros)
+
 def load_clinic_data_from_sheets(clinic_key, cliente_id):
     """Carrega dados de uma clínica específica"""
     
@@ -502,51 +609,14 @@ def load_clinic_data_from_sheets(clinic_key, cliente_id):
         print(f"⚠️ Não foi possível acessar o Google Sheets de {config['name']}. Usando dados de exemplo...")
         df = create_sample_data(clinic_key)
     
-    # Remove dados existentes da clínica
-    print(f"🗑️ Removendo dados existentes de {config['name']}...")
-    dados_existentes = dados_crud.get_dados_by_cliente(cliente_id)
-    for dados in dados_existentes:
-        dados_crud.delete_dados_dashboard(dados.id)
-    
-    # Carrega novos dados
-    for _, row in df.iterrows():
-        # Carrega TODOS os meses, mesmo os que têm apenas faturamento
-        if row['leads_totais'] > 0 or row['faturamento'] > 0 or row['valor_investido_total'] > 0:
-            dados = dados_crud.create_dados_dashboard(
-                cliente_id=cliente_id,
-                mes=row['mes'],
-                ano=2024,
-                leads_totais=int(row['leads_totais']),
-                leads_google_ads=int(row['leads_google_ads']),
-                leads_meta_ads=int(row['leads_meta_ads']),
-                leads_instagram_organico=int(row['leads_instagram_organico']),
-                leads_indicacao=int(row['leads_indicacao']),
-                leads_origem_desconhecida=int(row['leads_origem_desconhecida']),
-                consultas_marcadas_totais=int(row['consultas_marcadas_totais']),
-                consultas_marcadas_google_ads=int(row['consultas_marcadas_google_ads']),
-                consultas_marcadas_meta_ads=int(row['consultas_marcadas_meta_ads']),
-                consultas_marcadas_ig_organico=int(row['consultas_marcadas_ig_organico']),
-                consultas_marcadas_indicacao=int(row['consultas_marcadas_indicacao']),
-                consultas_marcadas_outros=int(row['consultas_marcadas_outros']),
-                consultas_comparecidas=int(row['consultas_comparecidas']),
-                fechamentos_totais=int(row['fechamentos_totais']),
-                fechamentos_google_ads=int(row['fechamentos_google_ads']),
-                fechamentos_meta_ads=int(row['fechamentos_meta_ads']),
-                fechamentos_ig_organico=int(row['fechamentos_ig_organico']),
-                fechamentos_indicacao=int(row['fechamentos_indicacao']),
-                fechamentos_outros=int(row['fechamentos_outros']),
-                faturamento=float(row['faturamento']),
-                valor_investido_total=float(row['valor_investido_total']),
-                orcamento_realizado_facebook=float(row['orcamento_realizado_facebook']),
-                orcamento_realizado_google=float(row['orcamento_realizado_google'])
-            )
-            
-            if dados:
-                print(f"   ✅ Dados de {row['mes']} carregados para {config['name']}")
-            else:
-                print(f"   ❌ Erro ao carregar dados de {row['mes']} para {config['name']}")
+    # Carrega TODOS os meses, mesmo os que têm apenas faturamento
+    ativos = df[(df['leads_totais'] > 0) | (df['faturamento'] > 0) | (df['valor_investido_total'] > 0)]
+    gravados = gravar_meses_clinica(cliente_id, ativos, ano=ANO_REFERENCIA)
+    if gravados is None:
+        print(f"❌ Erro ao carregar dados de {config['name']}")
+        return
     
-    print(f"✅ Dados de {config['name']} carregados com sucesso!")
+    print(f"✅ Dados de {config['name']} carregados com sucesso! ({gravados} meses)")
 
 def extract_sheet_id_from_url(url):
     """Extrai o ID da planilha de uma URL do Google Sheets"""
@@ -593,52 +663,10 @@ def load_clinic_data_from_url(cliente):
         print(f"❌ Não foi possível acessar o Google Sheets de {cliente.nome_da_clinica}")
         return False
     
-    # Remove dados existentes da clínica
-    print(f"🗑️ Removendo dados existentes de {cliente.nome_da_clinica}...")
-    dados_existentes = dados_crud.get_dados_by_cliente(cliente.id)
-    for dados in dados_existentes:
-        dados_crud.delete_dados_dashboard(dados.id)
-    
-    # Carrega novos dados
-    success_count = 0
-    for _, row in df.iterrows():
-        if row['leads_totais'] > 0:  # Só carrega meses com atividade
-            dados = dados_crud.create_dados_dashboard(
-                cliente_id=cliente.id,
-                mes=row['mes'],
-                ano=2024,
-                leads_totais=int(row['leads_totais']),
-                leads_google_ads=int(row['leads_google_ads']),
-                leads_meta_ads=int(row['leads_meta_ads']),
-                leads_instagram_organico=int(row['leads_instagram_organico']),
-                leads_indicacao=int(row['leads_indicacao']),
-                leads_origem_desconhecida=int(row['leads_origem_desconhecida']),
-                consultas_marcadas_totais=int(row['consultas_marcadas_totais']),
-                consultas_marcadas_google_ads=int(row['consultas_marcadas_google_ads']),
-                consultas_marcadas_meta_ads=int(row['consultas_marcadas_meta_ads']),
-                consultas_marcadas_ig_organico=int(row['consultas_marcadas_ig_organico']),
-                consultas_marcadas_indicacao=int(row['consultas_marcadas_indicacao']),
-                consultas_marcadas_outros=int(row['consultas_marcadas_outros']),
-                consultas_comparecidas=int(row['consultas_comparecidas']),
-                fechamentos_totais=int(row['fechamentos_totais']),
-                fechamentos_google_ads=int(row['fechamentos_google_ads']),
-                fechamentos_meta_ads=int(row['fechamentos_meta_ads']),
-                fechamentos_ig_organico=int(row['fechamentos_ig_organico']),
-                fechamentos_indicacao=int(row['fechamentos_indicacao']),
-                fechamentos_outros=int(row['fechamentos_outros']),
-                faturamento=float(row['faturamento']),
-                valor_investido_total=float(row['valor_investido_total']),
-                orcamento_realizado_facebook=float(row['orcamento_realizado_facebook']),
-                orcamento_realizado_google=float(row['orcamento_realizado_google'])
-            )
-            
-            if dados:
-                print(f"   ✅ Dados de {row['mes']} carregados para {cliente.nome_da_clinica}")
-                success_count += 1
-            else:
-                print(f"   ❌ Erro ao carregar dados de {row['mes']} para {cliente.nome_da_clinica}")
+    # Só carrega meses com atividade
+    success_count = gravar_meses_clinica(cliente.id, df[df['leads_totais'] > 0], ano=ANO_REFERENCIA)
     
-    if success_count > 0:
+    if success_count:
         print(f"✅ Dados de {cliente.nome_da_clinica} carregados com sucesso! ({success_count} meses)")
         return True
     else:
@@ -689,4 +717,6 @@ def main():
     print("   🏥 Dra Taynah: taynah@cirurgiaplastica.com / taynah2024")
 
 if __name__ == "__main__":
+    # Detalhes de cada célula processada: LOG_LEVEL=DEBUG
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
     main()
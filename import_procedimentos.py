@@ -5,12 +5,12 @@ Processa dados estruturados com informações detalhadas de cada procedimento.
 
 import gspread
 import pandas as pd
-from database import db_manager, cliente_crud, procedimento_crud
+from database import db_manager, cliente_crud, procedimento_crud, sincronizacao_crud, ANO_REFERENCIA
+from sync_sheets import call_with_backoff, run_clinics_in_pool, print_sync_summary, abrir_abas, get_sheet_data_hash
 from oauth2client.service_account import ServiceAccountCredentials
 import os
 import json
 from dotenv import load_dotenv
-from datetime import datetime
 import re
 
 # Carregar variáveis de ambiente
@@ -19,6 +19,9 @@ load_dotenv()
 # Configurações
 GOOGLE_SHEETS_CREDENTIALS = os.getenv('GOOGLE_SHEETS_CREDENTIALS', '{}')
 
+# Formatos de data aceitos na planilha, testados em ordem
+DATE_FORMATS = ['%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d-%m-%Y']
+
 def setup_google_sheets_auth():
     """Configura autenticação com Google Sheets"""
     try:
@@ -43,175 +46,201 @@ def setup_google_sheets_auth():
         print(f"❌ Erro na autenticação: {e}")
         return None
 
-def parse_date(date_str):
-    """Converte string de data para datetime"""
-    if not date_str or pd.isna(date_str) or str(date_str).strip() == '':
-        return None
+def parse_date_column(values):
+    """
+    Converte uma coluna de datas em texto para datetime (None quando vazia ou inválida)
     
-    try:
-        # Tenta diferentes formatos de data
-        date_formats = [
-            '%d/%m/%Y',
-            '%d/%m/%y',
-            '%Y-%m-%d',
-            '%d-%m-%Y'
-        ]
-        
-        date_str = str(date_str).strip()
-        for fmt in date_formats:
+    Cada formato de DATE_FORMATS é aplicado à coluna inteira; só as células que nenhum
+    formato reconhece passam pela inferência de data do pandas, uma vez por valor distinto.
+    """
+    texto = values.fillna('').astype(str).str.strip()
+    datas = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    pendentes = texto != ''
+    
+    for fmt in DATE_FORMATS:
+        if not pendentes.any():
+            break
+        convertidas = pd.to_datetime(texto[pendentes], format=fmt, errors='coerce')
+        convertidas = convertidas[convertidas.notna()]
+        datas[convertidas.index] = convertidas
+        pendentes[convertidas.index] = False
+    
+    # Demais células: inferência do pandas, uma vez por valor distinto
+    restantes = texto[pendentes]
+    if not restantes.empty:
+        inferidas = {}
+        for valor in restantes.unique():
             try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        
-        # Se nenhum formato funcionou, tenta parsing automático do pandas
-        return pd.to_datetime(date_str, dayfirst=True)
-    except:
-        return None
+                inferida = pd.to_datetime(valor, dayfirst=True)
+                inferidas[valor] = inferida.tz_localize(None) if inferida.tzinfo else inferida
+            except (ValueError, TypeError, OverflowError):
+                inferidas[valor] = pd.NaT
+        datas[restantes.index] = pd.to_datetime(restantes.map(inferidas))
+    
+    # datetime do Python e None, prontos para o banco
+    return pd.Series(
+        [None if pd.isna(data) else data.to_pydatetime() for data in datas],
+        index=values.index, dtype=object
+    )
 
-def parse_currency(value_str):
-    """Converte string de moeda para float"""
-    if not value_str or pd.isna(value_str) or str(value_str).strip() == '':
-        return 0.0
+def parse_currency_column(values):
+    """Converte uma coluna de valores em moeda para float (0.0 quando vazia ou inválida)"""
+    texto = values.fillna('').astype(str).str.strip().str.replace(r'[^\d,.-]', '', regex=True)
     
-    try:
-        # Remove caracteres não numéricos exceto vírgula e ponto
-        value_str = str(value_str).strip()
-        value_str = re.sub(r'[^\d,.-]', '', value_str)
-        
-        # Substitui vírgula por ponto se for separador decimal
-        if ',' in value_str and '.' in value_str:
-            # Formato brasileiro: 1.000,00
-            value_str = value_str.replace('.', '').replace(',', '.')
-        elif ',' in value_str and value_str.count(',') == 1:
-            # Pode ser separador decimal
-            parts = value_str.split(',')
-            if len(parts) == 2 and len(parts[1]) <= 2:
-                value_str = value_str.replace(',', '.')
-            else:
-                value_str = value_str.replace(',', '')
-        
-        return float(value_str)
-    except:
-        return 0.0
+    virgula = texto.str.contains(',', regex=False)
+    ponto = texto.str.contains('.', regex=False)
+    
+    # Formato brasileiro: 1.000,00
+    brasileiro = virgula & ponto
+    texto[brasileiro] = texto[brasileiro].str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    
+    # Uma única vírgula: separador decimal se seguida de até 2 dígitos, senão de milhar
+    uma_virgula = virgula & ~ponto & (texto.str.count(',') == 1)
+    decimal = uma_virgula & (texto.str.split(',').str[-1].str.len() <= 2)
+    texto[decimal] = texto[decimal].str.replace(',', '.', regex=False)
+    texto[uma_virgula & ~decimal] = texto[uma_virgula & ~decimal].str.replace(',', '', regex=False)
+    
+    valores = pd.Series(0.0, index=values.index)
+    validos = texto[texto.str.fullmatch(r'-?(?:\d+\.?\d*|\.\d+)')]
+    valores[validos.index] = validos.astype(float)
+    return valores
 
-def import_procedimentos_from_sheets(sheet_id, sheet_name="Procedimentos"):
+def process_procedimentos_values(all_values):
+    """
+    Converte os valores da aba "Procedimentos" em um DataFrame de procedimentos
+    
+    A estrutura da planilha é:
+    Linha 1: Mês de referência (ex: "Outubro")
+    Linha 2: Cabeçalhos reais
+    Linhas 3+: Dados dos procedimentos
+    
+    Args:
+        all_values: Valores da aba, como retornados por get_all_values
+    
+    Returns:
+        DataFrame com um procedimento por linha ou None se não houver procedimentos válidos
+    """
+    if len(all_values) < 3:
+        print(f"❌ Planilha tem menos de 3 linhas. Estrutura esperada: linha 1 (mês), linha 2 (cabeçalhos), linha 3+ (dados)")
+        return None
+    
+    # Extrai o mês de referência da primeira linha
+    mes_referencia = all_values[0][0].strip() if all_values[0] and all_values[0][0].strip() else "Outubro"
+    print(f"📅 Mês de referência: {mes_referencia}")
+    
+    # Segunda linha são os cabeçalhos reais
+    headers = all_values[1]
+    data_rows = all_values[2:]
+    
+    print(f"📊 Encontrados {len(data_rows)} registros de procedimentos")
+    print(f"📋 Cabeçalhos: {headers}")
+    
+    # Converte para DataFrame (cabeçalhos repetidos: vale a primeira coluna)
+    df = pd.DataFrame(data_rows, columns=headers)
+    df = df.loc[:, ~df.columns.duplicated()]
+    
+    if df.empty:
+        print("❌ Nenhum dado válido encontrado")
+        return None
+    
+    def coluna(nome):
+        return df[nome] if nome in df.columns else pd.Series('', index=df.index, dtype=object)
+    
+    def texto(nome):
+        return coluna(nome).astype(str).str.strip()
+    
+    quantidade = coluna('Quantidade na Mesma Venda').astype(str)
+    quantidade_valida = quantidade.str.isdecimal()
+    
+    procedimentos = pd.DataFrame({
+        'mes_referencia': mes_referencia,
+        'ano_referencia': ANO_REFERENCIA,
+        'data_primeiro_contato': parse_date_column(coluna('Data 1° Contato')),
+        'data_compareceu_consulta': parse_date_column(coluna('Data Compareu na Consulta')),
+        'data_fechou_cirurgia': parse_date_column(coluna('Data Fechou Cirurgia')),
+        'procedimento': texto('Procedimento'),
+        'tipo': texto('Tipo'),
+        'quantidade_na_mesma_venda': quantidade.where(quantidade_valida, '1').map(int),
+        'forma_pagamento': texto('Forma de Pagamento'),
+        'valor_da_venda': parse_currency_column(coluna('Valor da Venda')),
+        'valor_parcelado': parse_currency_column(coluna('Valor do Parcelado'))
+    }, index=df.index)
+    
+    # Só mantém linhas com pelo menos o procedimento
+    validos = (procedimentos['procedimento'] != '') & (procedimentos['procedimento'] != 'nan')
+    ignorados = int((~validos).sum())
+    if ignorados:
+        print(f"⚠️ {ignorados} linhas ignoradas - sem procedimento válido")
+    
+    procedimentos = procedimentos[validos].reset_index(drop=True)
+    if procedimentos.empty:
+        print("❌ Nenhum procedimento válido processado")
+        return None
+    
+    print(f"✅ Processados {len(procedimentos)} procedimentos válidos")
+    return procedimentos
+
+def import_procedimentos_from_sheets(sheet_id, sheet_name="Procedimentos", gc=None):
     """Importa dados de procedimentos do Google Sheets"""
-    gc = setup_google_sheets_auth()
+    gc = gc or setup_google_sheets_auth()
     if not gc:
         return None
     
     try:
         # Abre a planilha
-        spreadsheet = gc.open_by_key(sheet_id)
+        spreadsheet = call_with_backoff(gc.open_by_key, sheet_id)
         
         # Tenta encontrar a aba "Procedimentos"
         try:
-            worksheet = spreadsheet.worksheet(sheet_name)
+            worksheet = call_with_backoff(spreadsheet.worksheet, sheet_name)
         except gspread.WorksheetNotFound:
             print(f"❌ Aba '{sheet_name}' não encontrada na planilha")
             return None
         
         # Obtém todos os dados da aba
-        all_values = worksheet.get_all_values()
+        all_values = call_with_backoff(worksheet.get_all_values)
         
         if not all_values or len(all_values) < 2:
             print(f"❌ Nenhum dado encontrado na aba '{sheet_name}'")
             return None
         
-        # A estrutura da planilha é:
-        # Linha 1: Mês de referência (ex: "Outubro")
-        # Linha 2: Cabeçalhos reais
-        # Linhas 3+: Dados dos procedimentos
-        
-        if len(all_values) < 3:
-            print(f"❌ Planilha tem menos de 3 linhas. Estrutura esperada: linha 1 (mês), linha 2 (cabeçalhos), linha 3+ (dados)")
-            return None
-        
-        # Extrai o mês de referência da primeira linha
-        mes_referencia = all_values[0][0].strip() if all_values[0] and all_values[0][0].strip() else "Outubro"
-        print(f"📅 Mês de referência: {mes_referencia}")
-        
-        # Segunda linha são os cabeçalhos reais
-        headers = all_values[1]
-        data_rows = all_values[2:]
-        
-        print(f"📊 Encontrados {len(data_rows)} registros de procedimentos")
-        print(f"📋 Cabeçalhos: {headers}")
-        
-        # Converte para DataFrame
-        df = pd.DataFrame(data_rows, columns=headers)
-        
-        # Remove linhas vazias
-        df = df.dropna(how='all')
-        
-        if df.empty:
-            print("❌ Nenhum dado válido encontrado")
-            return None
-        
-        # Processa os dados
-        processed_data = []
-        
-        print(f"📊 Processando {len(df)} linhas de dados...")
-        
-        for index, row in df.iterrows():
-            try:
-                print(f"📅 Processando linha {index + 1}/{len(df)}...")
-                
-                # Processa cada linha de dados usando o mês já extraído
-                procedimento_data = {
-                    'mes_referencia': mes_referencia,
-                    'ano_referencia': 2024,  # Padrão
-                    'data_primeiro_contato': parse_date(row.get('Data 1° Contato', '')),
-                    'data_compareceu_consulta': parse_date(row.get('Data Compareu na Consulta', '')),
-                    'data_fechou_cirurgia': parse_date(row.get('Data Fechou Cirurgia', '')),
-                    'procedimento': str(row.get('Procedimento', '')).strip(),
-                    'tipo': str(row.get('Tipo', '')).strip(),
-                    'quantidade_na_mesma_venda': int(row.get('Quantidade na Mesma Venda', 1)) if str(row.get('Quantidade na Mesma Venda', 1)).isdigit() else 1,
-                    'forma_pagamento': str(row.get('Forma de Pagamento', '')).strip(),
-                    'valor_da_venda': parse_currency(row.get('Valor da Venda', '')),
-                    'valor_parcelado': parse_currency(row.get('Valor do Parcelado', ''))
-                }
-                
-                # Só adiciona se tiver pelo menos o procedimento
-                if procedimento_data['procedimento'] and procedimento_data['procedimento'] != 'nan' and procedimento_data['procedimento'] != '':
-                    processed_data.append(procedimento_data)
-                    print(f"✅ Linha {index + 1}: Procedimento '{procedimento_data['procedimento']}' adicionado")
-                else:
-                    print(f"⚠️ Linha {index + 1}: Ignorada - sem procedimento válido")
-                    
-            except Exception as e:
-                print(f"⚠️ Erro ao processar linha {index + 1}: {e}")
-                print(f"   Dados da linha: {dict(row)}")
-                continue
-        
-        if not processed_data:
-            print("❌ Nenhum procedimento válido processado")
-            return None
-        
-        print(f"✅ Processados {len(processed_data)} procedimentos válidos")
-        return pd.DataFrame(processed_data)
+        return process_procedimentos_values(all_values)
         
     except Exception as e:
         print(f"❌ Erro ao importar procedimentos: {e}")
         return None
 
-def check_procedimentos_sheet_exists(sheet_id):
+def check_procedimentos_sheet_exists(sheet_id, gc=None):
     """Verifica se a planilha tem aba 'Procedimentos'"""
-    gc = setup_google_sheets_auth()
+    gc = gc or setup_google_sheets_auth()
     if not gc:
         return False
     
     try:
-        spreadsheet = gc.open_by_key(sheet_id)
-        worksheet_names = [ws.title for ws in spreadsheet.worksheets()]
+        spreadsheet = call_with_backoff(gc.open_by_key, sheet_id)
+        worksheet_names = [ws.title for ws in call_with_backoff(spreadsheet.worksheets)]
         return "Procedimentos" in worksheet_names
     except Exception as e:
         print(f"❌ Erro ao verificar abas da planilha: {e}")
         return False
 
-def load_procedimentos_for_cliente(cliente):
-    """Carrega procedimentos para uma clínica específica"""
+def load_procedimentos_for_cliente(cliente, gc=None, force=False, planilhas=None):
+    """
+    Carrega procedimentos para uma clínica específica
+    
+    A planilha é aberta uma única vez (ou reaproveitada de planilhas) e a aba
+    "Procedimentos" é lida uma vez. Se o conteúdo da aba não mudou desde a última
+    importação, as escritas no banco são puladas, como na sincronização dos leads.
+    
+    Args:
+        cliente: Clínica a importar
+        gc: Cliente gspread já autenticado (opcional)
+        force: Reimporta mesmo se a aba não mudou
+        planilhas: Planilhas já abertas nesta sincronização (ver sync_sheets.abrir_abas)
+    
+    Returns:
+        Dict com o número de procedimentos importados ou False se nada foi importado
+    """
     print(f"🔄 Processando clínica: {cliente.nome_da_clinica} (ID: {cliente.id})")
     
     if not hasattr(cliente, 'link_empresa') or not cliente.link_empresa:
@@ -236,55 +265,64 @@ def load_procedimentos_for_cliente(cliente):
         print(f"❌ Não foi possível extrair ID da planilha: {cliente.link_empresa}")
         return False
     
+    gc = gc or setup_google_sheets_auth()
+    if not gc:
+        return False
+    
     # Verifica se a planilha tem aba "Procedimentos"
     print(f"🔍 Verificando se {cliente.nome_da_clinica} tem aba 'Procedimentos'...")
-    if not check_procedimentos_sheet_exists(sheet_id):
+    try:
+        abas = abrir_abas(sheet_id, gc, planilhas)
+    except Exception as e:
+        print(f"❌ Erro ao verificar abas da planilha: {e}")
+        return False
+    
+    worksheet = next((aba for aba in abas if aba.title == "Procedimentos"), None)
+    if worksheet is None:
         print(f"⚠️ Clínica {cliente.nome_da_clinica} não tem aba 'Procedimentos' - pulando importação")
         return False
     
     print(f"✅ Aba 'Procedimentos' encontrada! Importando dados para {cliente.nome_da_clinica}...")
     
-    # Importa dados de procedimentos
-    df = import_procedimentos_from_sheets(sheet_id)
+    try:
+        all_values = call_with_backoff(worksheet.get_all_values)
+    except Exception as e:
+        print(f"❌ Erro ao importar procedimentos: {e}")
+        return False
+    
+    if not all_values or len(all_values) < 2:
+        print(f"❌ Nenhum procedimento encontrado para {cliente.nome_da_clinica}")
+        return False
+    
+    # Verifica se há mudanças na aba desde a última importação
+    current_hash = get_sheet_data_hash(all_values)
+    if not force and current_hash == sincronizacao_crud.get_hash(cliente.id, worksheet.title):
+        print(f"✅ {cliente.nome_da_clinica}: aba 'Procedimentos' sem alterações, 0 procedimentos importados")
+        return {'procedimentos_importados': 0, 'sem_alteracoes': True}
+    
+    df = process_procedimentos_values(all_values)
     if df is None or df.empty:
         print(f"❌ Nenhum procedimento encontrado para {cliente.nome_da_clinica}")
         return False
     
-    # Remove procedimentos existentes da clínica
-    print(f"🗑️ Removendo procedimentos existentes de {cliente.nome_da_clinica} (ID: {cliente.id})...")
-    procedimento_crud.delete_procedimentos_by_cliente(cliente.id)
+    # Substitui os procedimentos do mês importado em uma única transação
+    print(f"🔁 Substituindo procedimentos de {cliente.nome_da_clinica} (ID: {cliente.id})...")
+    success_count = procedimento_crud.bulk_create(cliente.id, df.to_dict('records'), substituir_meses=True) or 0
+    if success_count <= 0:
+        return False
     
-    # Insere novos procedimentos
-    success_count = 0
-    for _, row in df.iterrows():
-        try:
-            procedimento = procedimento_crud.create_procedimento(
-                cliente_id=cliente.id,
-                procedimento=row['procedimento'],
-                mes_referencia=row['mes_referencia'],
-                ano_referencia=row['ano_referencia'],
-                data_primeiro_contato=row['data_primeiro_contato'],
-                data_compareceu_consulta=row['data_compareceu_consulta'],
-                data_fechou_cirurgia=row['data_fechou_cirurgia'],
-                tipo=row['tipo'],
-                quantidade_na_mesma_venda=row['quantidade_na_mesma_venda'],
-                forma_pagamento=row['forma_pagamento'],
-                valor_da_venda=row['valor_da_venda'],
-                valor_parcelado=row['valor_parcelado']
-            )
-            
-            if procedimento:
-                success_count += 1
-                
-        except Exception as e:
-            print(f"⚠️ Erro ao inserir procedimento: {e}")
-            continue
+    # Registra o conteúdo importado para pular a próxima importação se nada mudar
+    sincronizacao_crud.save_hash(cliente.id, worksheet.title, current_hash)
     
     print(f"✅ Importados {success_count} procedimentos para {cliente.nome_da_clinica} (ID: {cliente.id})")
-    return success_count > 0
+    return {'procedimentos_importados': success_count, 'sem_alteracoes': False}
 
-def main():
-    """Função principal para importar procedimentos de todas as clínicas"""
+def main(max_workers=None):
+    """
+    Função principal para importar procedimentos de todas as clínicas
+    
+    As clínicas são processadas em paralelo, compartilhando um único cliente gspread.
+    """
     print("🚀 Iniciando importação de procedimentos...")
     
     # Busca todas as clínicas ativas (exceto admin)
@@ -297,15 +335,18 @@ def main():
     
     print(f"📊 Encontradas {len(clinicas_ativas)} clínicas ativas")
     
-    success_count = 0
-    for cliente in clinicas_ativas:
-        try:
-            if load_procedimentos_for_cliente(cliente):
-                success_count += 1
-        except Exception as e:
-            print(f"❌ Erro ao processar {cliente.nome_da_clinica}: {e}")
-            continue
+    # Autentica uma única vez para todas as clínicas
+    gc = setup_google_sheets_auth()
+    if not gc:
+        print("❌ Não foi possível autenticar com o Google Sheets")
+        return
+    
+    resultados = run_clinics_in_pool(
+        clinicas_ativas, lambda cliente: load_procedimentos_for_cliente(cliente, gc=gc), max_workers
+    )
+    print_sync_summary(resultados)
     
+    success_count = sum(1 for resultado in resultados if resultado['sucesso'])
     print(f"🎉 Importação concluída! {success_count}/{len(clinicas_ativas)} clínicas processadas com sucesso")
 
 if __name__ == "__main__":
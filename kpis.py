@@ -0,0 +1,152 @@
+"""
+Cálculo vetorizado dos KPIs do dashboard.
+Fonte única das fórmulas usadas pelo CRUD, pelo dashboard da clínica e pelo dashboard do admin.
+"""
+
+import functools
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# KPI -> (coluna do numerador, coluna do denominador, fator)
+RAZOES = {
+    'Conversao_Csm_Leads': ('Consultas_Marcadas_Totais', 'Leads_Totais', 100),
+    'Conversao_Csc_Csm': ('Consultas_Comparecidas', 'Consultas_Marcadas_Totais', 100),
+    'Conversao_Fechamento_Csc': ('Fechamentos_Totais', 'Consultas_Comparecidas', 100),
+    'Conversao_Fechamento_Leads': ('Fechamentos_Totais', 'Leads_Totais', 100),
+    'Custo_por_Compra_Cirurgias': ('Valor_Investido_Total', 'Fechamentos_Totais', 1),
+    'ROAS': ('Faturamento', 'Valor_Investido_Total', 1),
+    'Custo_por_Lead_Total': ('Valor_Investido_Total', 'Leads_Totais', 1),
+    'Custo_por_Consulta_Marcada': ('Valor_Investido_Total', 'Consultas_Marcadas_Totais', 1),
+    'Custo_por_Consulta_Comparecida': ('Valor_Investido_Total', 'Consultas_Comparecidas', 1),
+    'Ticket_Medio': ('Faturamento', 'Fechamentos_Totais', 1),
+}
+
+# Taxas ideais (thresholds), em percentual
+TAXAS_IDEAIS = {
+    'Taxa_Ideal_Csm': 10.0,  # Csm. = Consultas Marcadas >10%
+    'Taxa_Ideal_Csc': 50.0,  # Csc. = Consultas Comparecidas >50%
+    'Taxa_Ideal_Fechamentos': 40.0,  # Fechamentos >40%
+}
+
+# Colunas somadas no período que alimentam as razões
+COLUNAS_SOMAVEIS = [
+    'Leads_Totais', 'Consultas_Marcadas_Totais', 'Consultas_Comparecidas',
+    'Fechamentos_Totais', 'Faturamento', 'Valor_Investido_Total',
+]
+
+def razao(numerador, denominador, fator=1):
+    """
+    Divide elemento a elemento, retornando 0 onde o denominador é zero
+
+    Aceita escalares, arrays ou Series; com escalares retorna float. Denominadores
+    negativos são divididos normalmente (ex: ROAS com investimento de -50).
+    """
+    numerador = np.asarray(numerador, dtype=float)
+    denominador = np.asarray(denominador, dtype=float)
+    valido = denominador != 0
+    resultado = np.where(valido, numerador * fator / np.where(valido, denominador, 1), 0.0)
+    return float(resultado) if resultado.ndim == 0 else resultado
+
+def _positivo(valor):
+    """O valor onde ele é positivo e 0 no restante (negativos e NaN)"""
+    valor = np.asarray(valor, dtype=float)
+    return np.where(valor > 0, valor, 0.0)
+
+def variacao(atual, anterior):
+    """Variação percentual de anterior para atual (0 se anterior não for positivo)"""
+    return razao(np.subtract(atual, anterior, dtype=float), _positivo(anterior), 100)
+
+def calcular_kpis(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adiciona ao DataFrame as colunas de KPI de cada linha (mês ou clínica)
+
+    Todas as razões de RAZOES são calculadas em uma única operação sobre as matrizes
+    de numeradores e denominadores.
+    """
+    numeradores = df[[numerador for numerador, _, _ in RAZOES.values()]].to_numpy(dtype=float)
+    denominadores = df[[denominador for _, denominador, _ in RAZOES.values()]].to_numpy(dtype=float)
+    fatores = np.array([fator for _, _, fator in RAZOES.values()], dtype=float)
+
+    df[list(RAZOES)] = razao(numeradores, denominadores, fatores)
+    for coluna, taxa in TAXAS_IDEAIS.items():
+        df[coluna] = taxa
+
+    # Substitui valores infinitos e NaN por 0; o replace percorre todas as colunas, então só roda se houver algum
+    colunas_float = [coluna for coluna, tipo in df.dtypes.items() if tipo.kind == 'f']
+    if df.isna().to_numpy().any() or any(np.isinf(df[coluna].to_numpy()).any() for coluna in colunas_float):
+        df = df.replace([np.inf, -np.inf, np.nan], 0)
+    return df
+
+@dataclass(frozen=True)
+class Totais:
+    """Somas do período; os KPIs são razões entre as somas, e não médias das razões mensais"""
+    leads_totais: float = 0
+    consultas_marcadas_totais: float = 0
+    consultas_comparecidas: float = 0
+    fechamentos_totais: float = 0
+    faturamento: float = 0.0
+    valor_investido_total: float = 0.0
+
+    def kpi(self, nome: str) -> float:
+        """Calcula o KPI de RAZOES a partir das somas (0 se a soma do denominador não for positiva)"""
+        numerador, denominador, fator = RAZOES[nome]
+        return razao(getattr(self, numerador.lower()), _positivo(getattr(self, denominador.lower())), fator)
+
+# Um atributo por KPI (ex: Totais.roas, Totais.conversao_csm_leads), derivado de RAZOES
+for _nome in RAZOES:
+    setattr(Totais, _nome.lower(), property(lambda self, nome=_nome: self.kpi(nome)))
+del _nome
+
+# Valores derivados de cada DataFrame, descartados quando o DataFrame deixa de existir
+_memo_lock = threading.RLock()
+_memo: Dict[int, Tuple[weakref.ref, Dict[str, Any]]] = {}
+
+def _descartar(ref: weakref.ref, chave: int, _lock=_memo_lock, _memo=_memo):
+    # Globais ligadas como default: o callback pode rodar no encerramento do interpretador
+    with _lock:
+        entrada = _memo.get(chave)
+        if entrada is not None and entrada[0] is ref:
+            del _memo[chave]
+
+def _memorizado(df: pd.DataFrame, nome: str, calcular: Callable[[pd.DataFrame], Any]) -> Any:
+    """
+    Calcula um valor derivado do DataFrame uma única vez por objeto
+
+    Pressupõe que o DataFrame não é alterado depois de criado, como os DataFrames
+    compartilhados pelo cache do dashboard.
+    """
+    chave = id(df)
+    with _memo_lock:
+        entrada = _memo.get(chave)
+        if entrada is not None and entrada[0]() is df and nome in entrada[1]:
+            return entrada[1][nome]
+
+    valor = calcular(df)
+
+    with _memo_lock:
+        entrada = _memo.get(chave)
+        if entrada is None or entrada[0]() is not df:
+            entrada = (weakref.ref(df, functools.partial(_descartar, chave=chave)), {})
+            _memo[chave] = entrada
+        entrada[1][nome] = valor
+    return valor
+
+def meses_ativos(df: pd.DataFrame) -> pd.DataFrame:
+    """Linhas com leads, faturamento ou investimento, calculadas uma vez por DataFrame"""
+    return _memorizado(df, 'meses_ativos', lambda df: df[
+        (df['Leads_Totais'] > 0) | (df['Faturamento'] > 0) | (df['Valor_Investido_Total'] > 0)
+    ])
+
+def totais(df: pd.DataFrame) -> Totais:
+    """Somas das colunas de COLUNAS_SOMAVEIS, calculadas uma vez por DataFrame"""
+    def somar(df):
+        somas = {coluna.lower(): df[coluna].sum() for coluna in COLUNAS_SOMAVEIS}
+        return Totais(**{
+            campo: valor.item() if isinstance(valor, np.generic) else valor for campo, valor in somas.items()
+        })
+    return _memorizado(df, 'totais', somar)
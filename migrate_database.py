@@ -4,27 +4,46 @@ Atualiza a estrutura do banco para suportar os novos campos da planilha.
 """
 
 import os
-import sqlite3
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, inspect, select, delete, func
+from sqlalchemy.orm import Session
+from sqlalchemy.engine import Engine
 from dotenv import load_dotenv
 
+from models import Cliente, DadosDashboard, Procedimento, ResumoMensal, MES_ORDER
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
+INDICES_OBSOLETOS = ['ix_procedimentos_cliente_ano_mes']
+
+def _engine(destino=None) -> Engine:
+    """Engine da migração: o informado, o da URL informada ou o de DATABASE_URL"""
+    if isinstance(destino, Engine):
+        return destino
+    return create_engine(destino or os.getenv('DATABASE_URL', 'sqlite:///prestige_clinic.db'))
+
+def _colunas(conn, tabela):
+    """Nomes das colunas da tabela (lista vazia se ela não existir), em qualquer banco"""
+    inspector = inspect(conn)
+    if not inspector.has_table(tabela):
+        return []
+    return [column['name'] for column in inspector.get_columns(tabela)]
+
 def migrate_database():
     """Migra o banco de dados para o novo formato"""
     
     # Conectar ao banco
-    database_url = os.getenv('DATABASE_URL', 'sqlite:///prestige_clinic.db')
-    engine = create_engine(database_url)
+    engine = _engine()
     
     print("🔄 Iniciando migração do banco de dados...")
     
     with engine.connect() as conn:
         try:
             # Verificar se as novas colunas já existem
-            result = conn.execute(text("PRAGMA table_info(dados_dashboard)"))
-            columns = [row[1] for row in result.fetchall()]
+            columns = _colunas(conn, 'dados_dashboard')
+            if not columns:
+                print("   ✅ Tabela dados_dashboard ainda não existe: será criada no formato novo")
+                return
             
             # Novos campos a serem adicionados
             new_columns = [
@@ -56,29 +75,20 @@ def migrate_database():
                 else:
                     print(f"   ✅ Coluna já existe: {column_name}")
             
-            # Migrar dados existentes
+            # Migrar dados existentes (colunas antigas de investimento, se ainda existirem)
             print("   🔄 Migrando dados existentes...")
-            
-            # Copiar investimento_total para valor_investido_total se necessário
-            conn.execute(text("""
-                UPDATE dados_dashboard 
-                SET valor_investido_total = investimento_total 
-                WHERE valor_investido_total = 0 AND investimento_total > 0
-            """))
-            
-            # Copiar investimento_facebook para orcamento_realizado_facebook se necessário
-            conn.execute(text("""
-                UPDATE dados_dashboard 
-                SET orcamento_realizado_facebook = investimento_facebook 
-                WHERE orcamento_realizado_facebook = 0 AND investimento_facebook > 0
-            """))
-            
-            # Copiar investimento_google para orcamento_realizado_google se necessário
-            conn.execute(text("""
-                UPDATE dados_dashboard 
-                SET orcamento_realizado_google = investimento_google 
-                WHERE orcamento_realizado_google = 0 AND investimento_google > 0
-            """))
+            colunas_antigas = {
+                'investimento_total': 'valor_investido_total',
+                'investimento_facebook': 'orcamento_realizado_facebook',
+                'investimento_google': 'orcamento_realizado_google',
+            }
+            for antiga, nova in colunas_antigas.items():
+                if antiga in columns:
+                    conn.execute(text(f"""
+                        UPDATE dados_dashboard 
+                        SET {nova} = {antiga} 
+                        WHERE {nova} = 0 AND {antiga} > 0
+                    """))
             
             conn.commit()
             print("✅ Migração concluída com sucesso!")
@@ -88,19 +98,196 @@ def migrate_database():
             conn.rollback()
             raise
 
+def migrate_mes_numero(destino=None, verbose=True):
+    """
+    Adiciona e preenche as colunas com o número do mês usadas na ordenação cronológica
+    
+    Idempotente e independente do banco; roda também na inicialização (DatabaseManager.create_tables).
+    Não apaga dados: com meses duplicados o índice único fica para depois de remover_meses_duplicados.
+    
+    Args:
+        destino: Engine ou URL do banco (padrão: DATABASE_URL)
+        verbose: Se False, só informa o que foi alterado
+    """
+    engine = _engine(destino)
+    log = print if verbose else (lambda *args: None)
+    
+    log("🔄 Preenchendo número dos meses...")
+    
+    # (tabela, coluna com o nome do mês, coluna com o número do mês)
+    colunas_mes = [
+        ('dados_dashboard', 'mes', 'mes_numero'),
+        ('procedimentos', 'mes_referencia', 'mes_referencia_numero'),
+    ]
+    casos = " ".join(f"WHEN '{nome}' THEN {numero}" for nome, numero in MES_ORDER.items())
+    
+    with engine.connect() as conn:
+        try:
+            inspector = inspect(conn)
+            for tabela, coluna_nome, coluna_numero in colunas_mes:
+                if not inspector.has_table(tabela):
+                    continue
+                
+                columns = [column['name'] for column in inspector.get_columns(tabela)]
+                if coluna_numero not in columns:
+                    print(f"   ➕ Adicionando coluna: {tabela}.{coluna_numero}")
+                    conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna_numero} INTEGER"))
+                
+                result = conn.execute(text(f"""
+                    UPDATE {tabela}
+                    SET {coluna_numero} = CASE {coluna_nome} {casos} END
+                    WHERE {coluna_numero} IS NULL
+                """))
+                (print if result.rowcount else log)(f"   ✅ {tabela}: {result.rowcount} registros preenchidos")
+            
+            conn.commit()
+            log("✅ Número dos meses preenchido com sucesso!")
+            
+        except Exception as e:
+            print(f"❌ Erro ao preencher número dos meses: {e}")
+            conn.rollback()
+            raise
+
+def migrate_indexes(destino=None, verbose=True):
+    """
+    Cria os índices definidos nos modelos que ainda não existem no banco
+    
+    Idempotente e independente do banco; roda também na inicialização (DatabaseManager.create_tables).
+    Não apaga dados: com meses duplicados o índice único fica para depois de remover_meses_duplicados.
+    
+    Args:
+        destino: Engine ou URL do banco (padrão: DATABASE_URL)
+        verbose: Se False, só informa o que foi alterado
+    """
+    engine = _engine(destino)
+    log = print if verbose else (lambda *args: None)
+    
+    log("🔄 Criando índices...")
+    
+    with engine.connect() as conn:
+        try:
+            inspector = inspect(conn)
+            tabelas = [
+                tabela for tabela in (Cliente.__table__, DadosDashboard.__table__, Procedimento.__table__)
+                if inspector.has_table(tabela.name)
+            ]
+            existentes = {indice['name'] for tabela in tabelas for indice in inspector.get_indexes(tabela.name)}
+            
+            if 'uq_dados_dashboard_cliente_ano_mes' not in existentes and DadosDashboard.__table__ in tabelas:
+                # O índice único não é criado sobre meses duplicados: removê-los apaga dados e
+                # é feito só pelo script de migração (remover_meses_duplicados)
+                duplicados = conn.execute(select(func.count()).select_from(
+                    select(DadosDashboard.cliente_id).group_by(
+                        DadosDashboard.cliente_id, DadosDashboard.ano, DadosDashboard.mes
+                    ).having(func.count() > 1).subquery()
+                )).scalar()
+                if duplicados:
+                    print(f"   ⚠️ {duplicados} meses duplicados em dados_dashboard: índice único não criado. "
+                          f"Execute 'python migrate_database.py' para removê-los.")
+                    existentes.add('uq_dados_dashboard_cliente_ano_mes')
+            
+            # Índices substituídos por versões que usam o número do mês
+            for obsoleto in INDICES_OBSOLETOS:
+                if obsoleto in existentes:
+                    print(f"   🗑️ Removendo índice obsoleto: {obsoleto}")
+                    conn.execute(text(f"DROP INDEX {obsoleto}"))
+            
+            for tabela in tabelas:
+                for indice in sorted(tabela.indexes, key=lambda i: i.name):
+                    if indice.name in existentes:
+                        log(f"   ✅ Índice já existe: {indice.name}")
+                    else:
+                        print(f"   ➕ Criando índice: {indice.name}")
+                        indice.create(conn)
+            
+            conn.commit()
+            log("✅ Índices criados com sucesso!")
+            
+        except Exception as e:
+            print(f"❌ Erro ao criar índices: {e}")
+            conn.rollback()
+            raise
+
+def remover_meses_duplicados(destino=None):
+    """
+    Remove os meses duplicados de dados_dashboard (mesmo cliente, ano e mês), mantendo o registro mais recente
+    
+    Migração única, executada só por este script porque apaga dados: cada registro removido
+    é listado e os meses afetados do resumo mensal são recalculados na mesma transação.
+    
+    Args:
+        destino: Engine ou URL do banco (padrão: DATABASE_URL)
+    
+    Returns:
+        Número de registros removidos
+    """
+    from database import atualizar_resumo_mensal
+    
+    engine = _engine(destino)
+    
+    print("🔄 Removendo meses duplicados...")
+    
+    with Session(engine) as session:
+        try:
+            if not _colunas(session.connection(), 'dados_dashboard'):
+                print("   ✅ Tabela dados_dashboard ainda não existe")
+                return 0
+            
+            mais_recentes = select(func.max(DadosDashboard.id)).group_by(
+                DadosDashboard.cliente_id, DadosDashboard.ano, DadosDashboard.mes
+            )
+            duplicados = session.execute(select(
+                DadosDashboard.id, DadosDashboard.cliente_id, DadosDashboard.ano, DadosDashboard.mes
+            ).where(DadosDashboard.id.not_in(mais_recentes)).order_by(DadosDashboard.id)).all()
+            
+            if not duplicados:
+                print("   ✅ Nenhum mês duplicado")
+                return 0
+            
+            for row in duplicados:
+                print(f"   🗑️ Removendo registro {row.id}: cliente {row.cliente_id}, {row.mes}/{row.ano}")
+            session.execute(delete(DadosDashboard).where(DadosDashboard.id.in_([row.id for row in duplicados])))
+            
+            if inspect(session.connection()).has_table(ResumoMensal.__tablename__):
+                atualizar_resumo_mensal(session, {(row.ano, row.mes) for row in duplicados})
+            
+            session.commit()
+            print(f"✅ {len(duplicados)} meses duplicados removidos")
+            return len(duplicados)
+            
+        except Exception as e:
+            print(f"❌ Erro ao remover meses duplicados: {e}")
+            session.rollback()
+            raise
+
+def migrate_resumo_mensal(database_url=None):
+    """Cria a tabela resumo_mensal e a preenche a partir de dados_dashboard"""
+    from database import DatabaseManager, AdminDashboardCRUD
+    
+    manager = DatabaseManager(database_url or os.getenv('DATABASE_URL', 'sqlite:///prestige_clinic.db'))
+    
+    print("🔄 Criando resumo mensal...")
+    
+    if not inspect(manager.engine).has_table(ResumoMensal.__tablename__):
+        print(f"   ➕ Criando tabela: {ResumoMensal.__tablename__}")
+    ResumoMensal.__table__.create(manager.engine, checkfirst=True)
+    
+    meses = AdminDashboardCRUD(manager).rebuild_resumo_mensal()
+    if meses is None:
+        raise RuntimeError("Falha ao preencher o resumo mensal")
+    print(f"✅ Resumo mensal preenchido: {meses} meses")
+
 def verify_migration():
     """Verifica se a migração foi bem-sucedida"""
     
-    database_url = os.getenv('DATABASE_URL', 'sqlite:///prestige_clinic.db')
-    engine = create_engine(database_url)
+    engine = _engine()
     
     print("🔍 Verificando migração...")
     
     with engine.connect() as conn:
         try:
             # Verificar se as novas colunas existem
-            result = conn.execute(text("PRAGMA table_info(dados_dashboard)"))
-            columns = [row[1] for row in result.fetchall()]
+            columns = _colunas(conn, 'dados_dashboard')
             
             required_columns = [
                 'valor_investido_total',
@@ -120,7 +307,8 @@ def verify_migration():
                 'ticket_medio',
                 'taxa_ideal_csm',
                 'taxa_ideal_csc',
-                'taxa_ideal_fechamentos'
+                'taxa_ideal_fechamentos',
+                'mes_numero'
             ]
             
             missing_columns = [col for col in required_columns if col not in columns]
@@ -140,12 +328,17 @@ if __name__ == "__main__":
     print("🚀 MIGRAÇÃO DO BANCO DE DADOS - NOVO FORMATO")
     print("=" * 50)
     
-    try:
-        migrate_database()
-        if verify_migration():
-            print("\n🎉 Migração concluída com sucesso!")
-            print("📊 O banco de dados agora suporta o novo formato da planilha.")
-        else:
-            print("\n❌ Migração falhou. Verifique os erros acima.")
-    except Exception as e:
-        print(f"\n❌ Erro durante a migração: {e}")
+    # Cada etapa roda mesmo que uma anterior falhe (ex: etapa legada em um banco que nunca teve as colunas antigas)
+    falhas = []
+    for etapa in (migrate_database, migrate_mes_numero, remover_meses_duplicados, migrate_indexes, migrate_resumo_mensal):
+        try:
+            etapa()
+        except Exception as e:
+            print(f"\n❌ Erro em {etapa.__name__}: {e}")
+            falhas.append(etapa.__name__)
+    
+    if not falhas and verify_migration():
+        print("\n🎉 Migração concluída com sucesso!")
+        print("📊 O banco de dados agora suporta o novo formato da planilha.")
+    else:
+        print(f"\n❌ Migração falhou ({', '.join(falhas) or 'verificação'}). Verifique os erros acima.")
@@ -3,16 +3,35 @@ Modelos de banco de dados para o sistema de dashboard de clínicas estéticas.
 Define as tabelas e estruturas de dados necessárias.
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, UniqueConstraint, Index, inspect
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+from dataclasses import make_dataclass
 from datetime import datetime
+from typing import Optional
 
 Base = declarative_base()
 
+# Ordem cronológica dos meses
+MES_ORDER = {
+    'Janeiro': 1, 'Fevereiro': 2, 'Março': 3, 'Abril': 4,
+    'Maio': 5, 'Junho': 6, 'Julho': 7, 'Agosto': 8,
+    'Setembro': 9, 'Outubro': 10, 'Novembro': 11, 'Dezembro': 12
+}
+
+def numero_do_mes(coluna):
+    """Default de coluna que preenche o número do mês a partir do nome gravado em `coluna`"""
+    def default(context):
+        return MES_ORDER.get(context.get_current_parameters().get(coluna))
+    return default
+
 class Cliente(Base):
     """Modelo para a tabela de clientes (clínicas)"""
     __tablename__ = 'clientes'
+    __table_args__ = (
+        # Filtro das consultas consolidadas do admin (clínicas ativas, exceto admin)
+        Index('ix_clientes_admin_ativo', 'is_admin', 'ativo'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
@@ -36,10 +55,16 @@ class Cliente(Base):
 class DadosDashboard(Base):
     """Modelo para a tabela de dados do dashboard"""
     __tablename__ = 'dados_dashboard'
+    __table_args__ = (
+        Index('uq_dados_dashboard_cliente_ano_mes', 'cliente_id', 'ano', 'mes', unique=True),
+        # Ordenação e filtros de período em ordem cronológica
+        Index('ix_dados_dashboard_cliente_periodo', 'cliente_id', 'ano', 'mes_numero'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
     mes = Column(String(20), nullable=False)  # Janeiro, Fevereiro, etc.
+    mes_numero = Column(Integer, nullable=True, default=numero_do_mes('mes'))  # 1 a 12, derivado de mes
     ano = Column(Integer, nullable=False, default=2024)
     
     # Dados de Leads
@@ -100,10 +125,19 @@ class DadosDashboard(Base):
     
     # Relacionamento com cliente
     cliente = relationship("Cliente", back_populates="dados_dashboard")
+    
+    @validates('mes')
+    def _atualiza_mes_numero(self, key, mes):
+        self.mes_numero = MES_ORDER.get(mes)
+        return mes
 
 class Procedimento(Base):
     """Modelo para a tabela de procedimentos"""
     __tablename__ = 'procedimentos'
+    __table_args__ = (
+        # Ordenação e filtros de período em ordem cronológica
+        Index('ix_procedimentos_cliente_periodo', 'cliente_id', 'ano_referencia', 'mes_referencia_numero'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
@@ -125,6 +159,7 @@ class Procedimento(Base):
     
     # Metadados
     mes_referencia = Column(String(20), nullable=False)  # Outubro, Novembro, etc.
+    mes_referencia_numero = Column(Integer, nullable=True, default=numero_do_mes('mes_referencia'))  # 1 a 12
     ano_referencia = Column(Integer, nullable=False, default=2024)
     
     data_criacao = Column(DateTime, default=datetime.utcnow)
@@ -132,4 +167,92 @@ class Procedimento(Base):
     
     # Relacionamento com cliente
     cliente = relationship("Cliente", back_populates="procedimentos")
+    
+    @validates('mes_referencia')
+    def _atualiza_mes_referencia_numero(self, key, mes_referencia):
+        self.mes_referencia_numero = MES_ORDER.get(mes_referencia)
+        return mes_referencia
+
+class EstadoSincronizacao(Base):
+    """Modelo para o estado da sincronização de cada aba das planilhas"""
+    __tablename__ = 'estado_sincronizacao'
+    __table_args__ = (
+        UniqueConstraint('cliente_id', 'aba', name='uq_estado_sincronizacao_cliente_aba'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
+    aba = Column(String(100), nullable=False)  # Controle de Leads, Procedimentos, etc.
+    hash_conteudo = Column(String(32), nullable=False)  # MD5 dos valores da aba
+    ultima_sincronizacao = Column(DateTime, default=datetime.utcnow)
+
+
+class ResumoMensal(Base):
+    """
+    Modelo para a tabela de resumo mensal consolidado do admin
+    
+    Uma linha por (ano, mês) com a soma dos dados de todas as clínicas ativas (exceto admin).
+    Mantida pelas operações de escrita do CRUD a cada gravação em dados_dashboard.
+    """
+    __tablename__ = 'resumo_mensal'
+    __table_args__ = (
+        Index('uq_resumo_mensal_ano_mes', 'ano', 'mes', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    ano = Column(Integer, nullable=False)
+    mes = Column(String(20), nullable=False)
+    mes_numero = Column(Integer, nullable=True)  # 1 a 12, para ordenação cronológica
+    clinicas = Column(Integer, default=0)  # Clínicas com dados no mês
+    
+    # Somas de Leads
+    leads_totais = Column(Integer, default=0)
+    leads_google_ads = Column(Integer, default=0)
+    leads_meta_ads = Column(Integer, default=0)
+    leads_instagram_organico = Column(Integer, default=0)
+    leads_indicacao = Column(Integer, default=0)
+    leads_origem_desconhecida = Column(Integer, default=0)
+    
+    # Somas do funil
+    consultas_marcadas_totais = Column(Integer, default=0)
+    consultas_comparecidas = Column(Integer, default=0)
+    fechamentos_totais = Column(Integer, default=0)
+    
+    # Somas financeiras
+    faturamento = Column(Float, default=0.0)
+    valor_investido_total = Column(Float, default=0.0)
+    orcamento_realizado_facebook = Column(Float, default=0.0)
+    orcamento_realizado_google = Column(Float, default=0.0)
+    
+    data_atualizacao = Column(DateTime, default=datetime.utcnow)
+
+
+def modelo_de_leitura(modelo, excluir=()):
+    """
+    Cria a versão somente leitura de um modelo: dataclass imutável com __slots__ e uma
+    posição por coluna, sem relacionamentos nem estado do SQLAlchemy
+    
+    As instâncias são montadas a partir de consultas só de colunas (select(*Leitura.colunas))
+    e podem ser guardadas em cache e compartilhadas entre sessões do Streamlit.
+    
+    Args:
+        modelo: Classe mapeada (ex: Cliente)
+        excluir: Colunas que não devem ser expostas (ex: senha_hash)
+    """
+    atributos = [atributo for atributo in inspect(modelo).column_attrs if atributo.key not in excluir]
+    leitura = make_dataclass(
+        f"{modelo.__name__}Leitura",
+        [(atributo.key, Optional[atributo.columns[0].type.python_type]) for atributo in atributos],
+        namespace={'__doc__': f"Linha de {modelo.__tablename__} somente leitura"},
+        frozen=True,
+        slots=True
+    )
+    leitura.__module__ = __name__
+    # Colunas selecionadas, na ordem dos campos
+    leitura.colunas = tuple(getattr(modelo, atributo.key) for atributo in atributos)
+    return leitura
 
+# Modelos somente leitura retornados pelas consultas do CRUD
+ClienteLeitura = modelo_de_leitura(Cliente, excluir=('senha_hash',))
+DadosDashboardLeitura = modelo_de_leitura(DadosDashboard)
+ProcedimentoLeitura = modelo_de_leitura(Procedimento)
@@ -0,0 +1,277 @@
+"""
+Serviço de sincronização com o Google Sheets executado dentro do processo do app.
+Roda as etapas de leads e procedimentos em uma thread em segundo plano e expõe
+o progresso e os resultados por clínica para a interface. Também agenda a
+atualização periódica de todas as clínicas.
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+
+from database import cliente_crud, sincronizacao_crud
+from sync_sheets import setup_google_sheets_auth, sync_clinic_data, run_clinics_in_pool
+from import_procedimentos import load_procedimentos_for_cliente
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Configurações do agendador
+SYNC_INTERVAL_MINUTES = float(os.getenv('SYNC_INTERVAL_MINUTES', '60'))  # 0 desativa o agendador
+SYNC_MIN_INTERVAL_MINUTES = float(os.getenv('SYNC_MIN_INTERVAL_MINUTES', '30'))  # Por clínica
+SYNC_JITTER_SECONDS = float(os.getenv('SYNC_JITTER_SECONDS', '300'))
+
+# Momento (time.monotonic) da última sincronização bem-sucedida de cada clínica
+_ultima_sincronizacao = {}
+_ultima_sincronizacao_lock = threading.Lock()
+
+def _marcar_sincronizada(cliente_id):
+    with _ultima_sincronizacao_lock:
+        _ultima_sincronizacao[cliente_id] = time.monotonic()
+
+def carregar_ultimas_sincronizacoes():
+    """
+    Preenche a última sincronização de cada clínica a partir do estado persistido no banco
+
+    Depois de um reinício do processo, o agendador continua respeitando o intervalo
+    mínimo das clínicas sincronizadas pouco antes. Horários já conhecidos neste
+    processo não são sobrescritos.
+    """
+    agora_utc, agora = datetime.utcnow(), time.monotonic()
+    ultimas = sincronizacao_crud.get_ultimas_sincronizacoes()
+    with _ultima_sincronizacao_lock:
+        for cliente_id, ultima in ultimas.items():
+            if ultima is not None and cliente_id not in _ultima_sincronizacao:
+                _ultima_sincronizacao[cliente_id] = agora - (agora_utc - ultima).total_seconds()
+
+def segundos_desde_ultima_sincronizacao(cliente_id):
+    """Segundos desde a última sincronização bem-sucedida da clínica (None se nunca)"""
+    with _ultima_sincronizacao_lock:
+        ultima = _ultima_sincronizacao.get(cliente_id)
+    return None if ultima is None else time.monotonic() - ultima
+
+class SyncJob:
+    """Execução da sincronização completa (leads + procedimentos) em segundo plano"""
+
+    def __init__(self, cliente_ids=None, gc=None, max_workers=None, force=False):
+        """
+        Args:
+            cliente_ids: IDs das clínicas a sincronizar (None = todas)
+            gc: Cliente gspread já autenticado (opcional)
+            max_workers: Número máximo de clínicas em paralelo
+            force: Reimporta os dados mesmo se as abas de leads e de procedimentos não mudaram
+        """
+        self._lock = threading.Lock()
+        self.cliente_ids = None if cliente_ids is None else set(cliente_ids)
+        self._gc = gc
+        self._max_workers = max_workers
+        self._force = force
+        self._thread = threading.Thread(target=self._run, name="sync-sheets", daemon=True)
+
+        self.status = 'pendente'  # pendente, executando, concluido, erro
+        self.etapa = None
+        self.total = 0
+        self.concluidas = 0
+        self.resultados = {'leads': [], 'procedimentos': []}
+        self.erro = None
+        self.inicio = None
+        self.fim = None
+
+    def start(self):
+        """Inicia a sincronização em uma thread em segundo plano"""
+        with self._lock:
+            self.status = 'executando'
+            self.inicio = datetime.now()
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        """Aguarda o término da sincronização"""
+        self._thread.join(timeout)
+
+    @property
+    def em_execucao(self):
+        return self.status in ('pendente', 'executando')
+
+    def cobre(self, cliente_id):
+        """Verifica se a sincronização inclui a clínica"""
+        return self.cliente_ids is None or cliente_id in self.cliente_ids
+
+    def snapshot(self):
+        """Retorna uma cópia do estado atual para exibição na interface"""
+        with self._lock:
+            return {
+                'status': self.status,
+                'etapa': self.etapa,
+                'total': self.total,
+                'concluidas': self.concluidas,
+                'progresso': self.concluidas / self.total if self.total else 0.0,
+                'resultados': {etapa: list(resumos) for etapa, resumos in self.resultados.items()},
+                'erro': self.erro,
+                'inicio': self.inicio,
+                'fim': self.fim
+            }
+
+    def _registrar(self, etapa, resumo):
+        if etapa == 'leads' and resumo['sucesso']:
+            _marcar_sincronizada(resumo['cliente_id'])
+        with self._lock:
+            self.resultados[etapa].append(resumo)
+            self.concluidas += 1
+
+    def _run(self):
+        try:
+            gc = self._gc or setup_google_sheets_auth()
+            if not gc:
+                raise RuntimeError("Não foi possível autenticar com o Google Sheets")
+
+            if self.cliente_ids is None:
+                clientes = cliente_crud.get_all_clientes()
+            else:
+                clientes = [cliente_crud.get_cliente_by_id(cliente_id) for cliente_id in sorted(self.cliente_ids)]
+            clientes = [c for c in clientes if c is not None and c.ativo and not c.is_admin]
+            clinicas_com_link = [c for c in clientes if c.link_empresa]
+
+            with self._lock:
+                self.total = len(clinicas_com_link) + len(clientes)
+                self.etapa = 'leads'
+
+            # Cada planilha é aberta uma vez e reaproveitada pelas duas etapas
+            planilhas = {}
+
+            # 1. Dados da aba "Controle de Leads"
+            run_clinics_in_pool(
+                clinicas_com_link,
+                lambda cliente: sync_clinic_data(cliente, gc=gc, force=self._force, planilhas=planilhas),
+                self._max_workers,
+                on_result=lambda resumo: self._registrar('leads', resumo)
+            )
+
+            with self._lock:
+                self.etapa = 'procedimentos'
+
+            # 2. Dados da aba "Procedimentos"
+            run_clinics_in_pool(
+                clientes,
+                lambda cliente: load_procedimentos_for_cliente(cliente, gc=gc, force=self._force, planilhas=planilhas),
+                self._max_workers,
+                on_result=lambda resumo: self._registrar('procedimentos', resumo)
+            )
+
+            with self._lock:
+                self.status = 'concluido'
+        except Exception as e:
+            with self._lock:
+                self.status = 'erro'
+                self.erro = str(e)
+        finally:
+            with self._lock:
+                self.etapa = None
+                self.fim = datetime.now()
+
+_job_lock = threading.Lock()
+_jobs = {}  # Sincronização mais recente por clínica; a chave None é a sincronização geral
+
+def _start_job(chave, cliente_ids, **kwargs):
+    """Inicia uma sincronização ou retorna a que já está em execução e cobre as clínicas"""
+    with _job_lock:
+        for job in (_jobs.get(chave), _jobs.get(None)):
+            if job is None or not job.em_execucao:
+                continue
+            if job.cliente_ids is None or (cliente_ids is not None and all(job.cobre(c) for c in cliente_ids)):
+                return job
+        job = SyncJob(cliente_ids=cliente_ids, **kwargs).start()
+        _jobs[chave] = job
+        return job
+
+def start_sync(cliente_ids=None, gc=None, max_workers=None, force=False):
+    """
+    Inicia a sincronização geral em segundo plano
+
+    Cliques e agendamentos simultâneos são agrupados: se já houver uma sincronização
+    em execução que cubra as clínicas pedidas, ela é retornada em vez de iniciar outra.
+
+    Args:
+        cliente_ids: IDs das clínicas a sincronizar (None = todas)
+
+    Returns:
+        SyncJob em execução
+    """
+    return _start_job(None, cliente_ids, gc=gc, max_workers=max_workers, force=force)
+
+def sync_clinic(cliente_id, gc=None, force=False):
+    """
+    Inicia em segundo plano a sincronização de uma única clínica
+
+    Returns:
+        SyncJob em execução (pode ser a sincronização geral, se ela já cobre a clínica)
+    """
+    return _start_job(cliente_id, [cliente_id], gc=gc, force=force)
+
+class SyncScheduler:
+    """Atualização periódica de todas as clínicas em segundo plano"""
+
+    def __init__(self, interval_minutes=None, min_interval_minutes=None, jitter_seconds=None, gc=None):
+        """
+        Args:
+            interval_minutes: Intervalo entre as rodadas de sincronização
+            min_interval_minutes: Intervalo mínimo entre duas sincronizações da mesma clínica
+            jitter_seconds: Variação aleatória somada a cada espera
+            gc: Cliente gspread já autenticado (opcional)
+        """
+        self.interval = (SYNC_INTERVAL_MINUTES if interval_minutes is None else interval_minutes) * 60
+        self.min_interval = (SYNC_MIN_INTERVAL_MINUTES if min_interval_minutes is None else min_interval_minutes) * 60
+        self.jitter = SYNC_JITTER_SECONDS if jitter_seconds is None else jitter_seconds
+        self._gc = gc
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="sync-scheduler", daemon=True)
+        carregar_ultimas_sincronizacoes()
+
+    def start(self):
+        """Inicia o agendador em uma thread em segundo plano"""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Interrompe o agendador após a rodada atual"""
+        self._stop.set()
+
+    def clinicas_pendentes(self):
+        """IDs das clínicas com planilha que não foram sincronizadas dentro do intervalo mínimo"""
+        pendentes = []
+        for cliente in cliente_crud.get_all_clientes():
+            if cliente.is_admin or not cliente.link_empresa:
+                continue
+            decorrido = segundos_desde_ultima_sincronizacao(cliente.id)
+            if decorrido is None or decorrido >= self.min_interval:
+                pendentes.append(cliente.id)
+        return pendentes
+
+    def run_once(self):
+        """Sincroniza as clínicas pendentes e aguarda o término (None se não havia pendentes)"""
+        pendentes = self.clinicas_pendentes()
+        if not pendentes:
+            return None
+        job = start_sync(cliente_ids=pendentes, gc=self._gc)
+        job.join()
+        return job
+
+    def _loop(self):
+        while not self._stop.wait(self.interval + random.uniform(0, self.jitter)):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Erro na sincronização agendada: {e}")
+
+_scheduler = None
+
+def start_scheduler():
+    """Inicia o agendador global (uma vez por processo); retorna None se estiver desativado"""
+    global _scheduler
+    with _job_lock:
+        if _scheduler is None and SYNC_INTERVAL_MINUTES > 0:
+            _scheduler = SyncScheduler().start()
+        return _scheduler
@@ -5,19 +5,26 @@ Atualiza apenas dados que realmente mudaram, preservando histórico.
 
 import gspread
 import pandas as pd
-from database import db_manager, cliente_crud, dados_crud
+from database import db_manager, cliente_crud, dados_crud, sincronizacao_crud, ANO_REFERENCIA
 from oauth2client.service_account import ServiceAccountCredentials
 import os
 import json
 from dotenv import load_dotenv
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
+import logging
+import random
+import time
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
 # Configurações
 GOOGLE_SHEETS_CREDENTIALS = os.getenv('GOOGLE_SHEETS_CREDENTIALS', '{}')
+SYNC_MAX_WORKERS = int(os.getenv('SYNC_MAX_WORKERS', '4'))  # Clínicas sincronizadas em paralelo
+RATE_LIMIT_MAX_RETRIES = 5  # Novas tentativas após erro de limite de requisições
+RATE_LIMIT_BASE_DELAY = 1.0  # Espera inicial em segundos (dobra a cada tentativa)
 
 def setup_google_sheets_auth():
     """Configura autenticação com Google Sheets"""
@@ -46,120 +53,211 @@ def setup_google_sheets_auth():
         print(f"❌ Erro na autenticação: {e}")
         return None
 
-def get_sheet_data_hash(sheet_id, sheet_name):
+def is_rate_limit_error(error):
+    """Verifica se o erro da API é temporário (limite de requisições ou falha 5xx)"""
+    if not isinstance(error, gspread.exceptions.APIError):
+        return False
+    status_code = getattr(getattr(error, 'response', None), 'status_code', None) or 0
+    return status_code == 429 or status_code >= 500
+
+def call_with_backoff(func, *args, **kwargs):
+    """
+    Executa uma chamada ao Google Sheets repetindo-a com espera exponencial
+    quando a API responde com limite de requisições
+    """
+    for tentativa in range(RATE_LIMIT_MAX_RETRIES + 1):
+        try:
+            return func(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            if not is_rate_limit_error(e) or tentativa == RATE_LIMIT_MAX_RETRIES:
+                raise
+            delay = RATE_LIMIT_BASE_DELAY * (2 ** tentativa) + random.uniform(0, RATE_LIMIT_BASE_DELAY)
+            print(f"⏳ Limite de requisições do Google Sheets atingido, nova tentativa em {delay:.1f}s...")
+            time.sleep(delay)
+
+def run_clinics_in_pool(clientes, worker, max_workers=None, on_result=None):
+    """
+    Executa worker(cliente) para cada clínica em um pool limitado de threads
+    
+    Args:
+        clientes: Clínicas a processar
+        worker: Função que processa uma clínica e retorna um valor verdadeiro em caso
+            de sucesso; se for um dict, ele é incluído no resumo da clínica. Cada chamada
+            roda em uma unidade de trabalho (uma sessão do banco por clínica)
+        max_workers: Número máximo de clínicas em paralelo (padrão: SYNC_MAX_WORKERS)
+        on_result: Função chamada com o resumo de cada clínica assim que ela termina
+    
+    Returns:
+        Lista com o resumo de cada clínica, na mesma ordem de entrada
+    """
+    max_workers = max(1, min(max_workers or SYNC_MAX_WORKERS, len(clientes) or 1))
+    
+    def executar(cliente):
+        inicio = time.perf_counter()
+        with db_manager.unidade_de_trabalho() as unidade:
+            try:
+                retorno, erro = worker(cliente), None
+            except Exception as e:
+                retorno, erro = False, str(e)
+        resumo = retorno if isinstance(retorno, dict) else {}
+        resumo.update({
+            'cliente_id': cliente.id,
+            'clinica': cliente.nome_da_clinica,
+            'sucesso': bool(retorno),
+            'erro': erro,
+            'duracao': time.perf_counter() - inicio,
+            'statements': unidade.statements
+        })
+        if on_result:
+            on_result(resumo)
+        return resumo
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(executar, clientes))
+
+def print_sync_summary(resultados):
+    """Imprime o resumo da sincronização por clínica"""
+    print("\n📋 Resumo por clínica:")
+    for resultado in resultados:
+        status = "✅" if resultado['sucesso'] else "❌"
+        detalhe = f" - {resultado['erro']}" if resultado['erro'] else ""
+        print(f"   {status} {resultado['clinica']} ({resultado['duracao']:.1f}s, "
+              f"{resultado['statements']} consultas ao banco){detalhe}")
+
+def get_sheet_data_hash(data):
     """Gera hash dos dados da planilha para detectar mudanças"""
-    gc = setup_google_sheets_auth()
-    if not gc:
-        return None
+    data_str = str(data)
+    return hashlib.md5(data_str.encode()).hexdigest()
+
+def abrir_abas(sheet_id, gc, planilhas=None):
+    """
+    Abre a planilha e lista suas abas (uma chamada a open_by_key e uma a worksheets)
     
-    try:
-        sheet = gc.open_by_key(sheet_id)
-        worksheet = sheet.worksheet('Controle de Leads')
-        data = worksheet.get_all_values()
-        
-        # Cria hash dos dados
-        data_str = str(data)
-        return hashlib.md5(data_str.encode()).hexdigest()
-    except Exception as e:
-        print(f"❌ Erro ao gerar hash: {e}")
-        return None
+    Args:
+        sheet_id: ID da planilha
+        gc: Cliente gspread autenticado
+        planilhas: Dict ID da planilha -> abas, compartilhado pelas etapas de uma
+            sincronização para que cada planilha seja aberta uma única vez (opcional)
+    
+    Returns:
+        Lista de abas (gspread.Worksheet)
+    """
+    if planilhas is not None and sheet_id in planilhas:
+        return planilhas[sheet_id]
+    
+    spreadsheet = call_with_backoff(gc.open_by_key, sheet_id)
+    abas = call_with_backoff(spreadsheet.worksheets)
+    if planilhas is not None:
+        planilhas[sheet_id] = abas
+    return abas
 
-def sync_clinic_data(cliente):
-    """Sincroniza dados de uma clínica específica"""
+def sync_clinic_data(cliente, gc=None, force=False, planilhas=None):
+    """
+    Sincroniza dados de uma clínica específica
+    
+    Cada aba é lida uma única vez. Se o conteúdo da aba usada como fonte não mudou
+    desde a última sincronização, a importação e as escritas no banco são puladas.
+    
+    Args:
+        cliente: Clínica a sincronizar
+        gc: Cliente gspread já autenticado (opcional)
+        force: Reimporta mesmo se a planilha não mudou
+        planilhas: Planilhas já abertas nesta sincronização (ver abrir_abas)
+    
+    Returns:
+        Dict com o resumo da sincronização (aba, meses atualizados e contagens por
+        operação) ou False em caso de erro
+    """
     if not hasattr(cliente, 'link_empresa') or not cliente.link_empresa:
         print(f"⚠️ Clínica {cliente.nome_da_clinica} não tem link_empresa")
         return False
     
-    # Extrai ID da planilha
-    import re
-    sheet_id = None
-    patterns = [
-        r'/spreadsheets/d/([a-zA-Z0-9-_]+)',
-        r'id=([a-zA-Z0-9-_]+)',
-        r'/([a-zA-Z0-9-_]{44})'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, cliente.link_empresa)
-        if match:
-            sheet_id = match.group(1)
-            break
+    from import_multiple_sheets import extract_sheet_id_from_url, values_to_records, process_controle_leads_data, is_dashboard_data_structure
     
+    # Extrai ID da planilha
+    sheet_id = extract_sheet_id_from_url(cliente.link_empresa)
     if not sheet_id:
         print(f"❌ Não foi possível extrair ID da planilha: {cliente.link_empresa}")
         return False
     
     print(f"🔄 Sincronizando {cliente.nome_da_clinica}...")
     
-    # Verifica se há mudanças na planilha
-    current_hash = get_sheet_data_hash(sheet_id, cliente.nome_da_clinica)
-    if not current_hash:
+    gc = gc or setup_google_sheets_auth()
+    if not gc:
         print(f"❌ Não foi possível acessar planilha de {cliente.nome_da_clinica}")
         return False
     
-    # Verifica hash armazenado (implementação futura)
-    # Por enquanto, sempre atualiza
-    print(f"📊 Importando dados atualizados...")
+    try:
+        worksheets = abrir_abas(sheet_id, gc, planilhas)
+    except Exception as e:
+        print(f"❌ Não foi possível acessar planilha de {cliente.nome_da_clinica}: {e}")
+        return False
+    
+    # A aba "Controle de Leads" tem prioridade; as demais só são lidas se ela não tiver dados
+    worksheets = sorted(worksheets, key=lambda ws: "Controle de Leads" not in ws.title)
     
-    # Importa dados (reutiliza lógica do import_multiple_sheets.py)
-    from import_multiple_sheets import import_from_google_sheets, process_controle_leads_data, is_dashboard_data_structure
+    processed_data = None
+    for worksheet in worksheets:
+        try:
+            data = call_with_backoff(worksheet.get_all_values)
+            records = values_to_records(data)
+        except Exception as e:
+            print(f"   ❌ Erro ao ler aba {worksheet.title}: {e}")
+            continue
+        
+        if not records:
+            continue
+        if "Controle de Leads" not in worksheet.title and not is_dashboard_data_structure(records):
+            continue
+        
+        # Verifica se há mudanças na aba desde a última sincronização
+        current_hash = get_sheet_data_hash(data)
+        if not force and current_hash == sincronizacao_crud.get_hash(cliente.id, worksheet.title):
+            print(f"✅ {cliente.nome_da_clinica} sincronizada! (aba '{worksheet.title}' sem alterações, 0 meses atualizados)")
+            return {'aba': worksheet.title, 'sem_alteracoes': True, 'meses_atualizados': 0}
+        
+        print(f"📊 Importando dados atualizados da aba {worksheet.title}...")
+        processed_data = process_controle_leads_data(records)
+        if processed_data:
+            break
     
-    df = import_from_google_sheets(sheet_id, cliente.nome_da_clinica)
-    if df is None or df.empty:
+    if not processed_data:
         print(f"❌ Nenhum dado encontrado para {cliente.nome_da_clinica}")
         return False
     
-    # Remove dados existentes e insere novos
-    print(f"🗑️ Atualizando dados de {cliente.nome_da_clinica}...")
-    dados_existentes = dados_crud.get_dados_by_cliente(cliente.id)
-    for dados in dados_existentes:
-        dados_crud.delete_dados_dashboard(dados.id)
-    
-    # Insere novos dados
-    success_count = 0
-    for _, row in df.iterrows():
-        # Carrega TODOS os meses, mesmo os que têm apenas faturamento
-        if row['leads_totais'] > 0 or row['faturamento'] > 0 or row['valor_investido_total'] > 0:
-            dados = dados_crud.create_dados_dashboard(
-                cliente_id=cliente.id,
-                mes=row['mes'],
-                ano=2024,
-                leads_totais=int(row['leads_totais']),
-                leads_google_ads=int(row['leads_google_ads']),
-                leads_meta_ads=int(row['leads_meta_ads']),
-                leads_instagram_organico=int(row['leads_instagram_organico']),
-                leads_indicacao=int(row['leads_indicacao']),
-                leads_origem_desconhecida=int(row['leads_origem_desconhecida']),
-                consultas_marcadas_totais=int(row['consultas_marcadas_totais']),
-                consultas_marcadas_google_ads=int(row['consultas_marcadas_google_ads']),
-                consultas_marcadas_meta_ads=int(row['consultas_marcadas_meta_ads']),
-                consultas_marcadas_ig_organico=int(row['consultas_marcadas_ig_organico']),
-                consultas_marcadas_indicacao=int(row['consultas_marcadas_indicacao']),
-                consultas_marcadas_outros=int(row['consultas_marcadas_outros']),
-                consultas_comparecidas=int(row['consultas_comparecidas']),
-                fechamentos_totais=int(row['fechamentos_totais']),
-                fechamentos_google_ads=int(row['fechamentos_google_ads']),
-                fechamentos_meta_ads=int(row['fechamentos_meta_ads']),
-                fechamentos_ig_organico=int(row['fechamentos_ig_organico']),
-                fechamentos_indicacao=int(row['fechamentos_indicacao']),
-                fechamentos_outros=int(row['fechamentos_outros']),
-                faturamento=float(row['faturamento']),
-                valor_investido_total=float(row['valor_investido_total']),
-                orcamento_previsto_total=float(row['orcamento_previsto_total']),
-                orcamento_realizado_facebook=float(row['orcamento_realizado_facebook']),
-                orcamento_previsto_facebook=float(row['orcamento_previsto_facebook']),
-                orcamento_realizado_google=float(row['orcamento_realizado_google']),
-                orcamento_previsto_google=float(row['orcamento_previsto_google'])
-            )
-            
-            if dados:
-                success_count += 1
+    df = pd.DataFrame(processed_data)
+    
+    # Carrega TODOS os meses, mesmo os que têm apenas faturamento
+    df_ativos = df[(df['leads_totais'] > 0) | (df['faturamento'] > 0) | (df['valor_investido_total'] > 0)]
+    
+    # Grava apenas os meses que mudaram, em uma única transação
+    print(f"🔁 Comparando dados de {cliente.nome_da_clinica} com o banco...")
+    resultado = dados_crud.sync_dados_cliente(cliente.id, df_ativos.to_dict('records'), ano=ANO_REFERENCIA)
+    if resultado is None:
+        print(f"❌ Erro ao gravar dados de {cliente.nome_da_clinica}")
+        return False
+    
+    success_count = resultado['inseridos'] + resultado['atualizados']
+    print(f"   ➕ {resultado['inseridos']} novos, ✏️ {resultado['atualizados']} alterados, "
+          f"🗑️ {resultado['removidos']} removidos, ✔️ {resultado['inalterados']} inalterados")
+    
+    # Registra o conteúdo importado para pular a próxima sincronização se nada mudar
+    sincronizacao_crud.save_hash(cliente.id, worksheet.title, current_hash)
     
     print(f"✅ {cliente.nome_da_clinica} sincronizada! ({success_count} meses atualizados)")
-    return True
+    return {'aba': worksheet.title, 'sem_alteracoes': False, 'meses_atualizados': success_count, **resultado}
 
-def sync_all_clinics():
-    """Sincroniza todas as clínicas com link_empresa"""
+def sync_all_clinics(max_workers=None, gc=None):
+    """
+    Sincroniza todas as clínicas com link_empresa
+    
+    As clínicas são processadas em paralelo por um pool limitado de threads,
+    compartilhando um único cliente gspread autenticado.
+    
+    Args:
+        max_workers: Número máximo de clínicas em paralelo (1 = sequencial)
+        gc: Cliente gspread já autenticado (opcional)
+    """
     print("🔄 Iniciando sincronização com Google Sheets...")
     
     # Busca todas as clínicas
@@ -171,17 +269,30 @@ def sync_all_clinics():
             clientes_com_link.append(cliente)
     
     print(f"📊 Clínicas com link_empresa: {len(clientes_com_link)}")
+    if not clientes_com_link:
+        return False
+    
+    # Autentica uma única vez para todas as clínicas
+    gc = gc or setup_google_sheets_auth()
+    if not gc:
+        print("❌ Não foi possível autenticar com o Google Sheets")
+        return False
     
-    success_count = 0
-    for cliente in clientes_com_link:
-        if sync_clinic_data(cliente):
-            success_count += 1
+    resultados = run_clinics_in_pool(
+        clientes_com_link, lambda cliente: sync_clinic_data(cliente, gc=gc), max_workers
+    )
+    print_sync_summary(resultados)
     
+    success_count = sum(1 for resultado in resultados if resultado['sucesso'])
     print(f"\n🎉 Sincronização concluída!")
     print(f"✅ {success_count}/{len(clientes_com_link)} clínicas sincronizadas")
     
     return success_count > 0
 
 if __name__ == "__main__":
+    # Detalhes de cada célula processada: LOG_LEVEL=DEBUG
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
+    # Garante que a tabela de estado da sincronização exista em bancos antigos
+    db_manager.create_tables()
     sync_all_clinics()
 
@@ -38,10 +38,10 @@ def test_consolidated_metrics():
             print("❌ Métricas consolidadas não retornadas")
             return False
         
-        print(f"   📊 Total de Leads: {metrics.get('total_leads', 0)}")
-        print(f"   💰 Faturamento Total: R$ {metrics.get('total_faturamento', 0):,.0f}".replace(",", "."))
-        print(f"   📈 ROAS Médio: {metrics.get('roas_medio', 0):.1f}x")
-        print(f"   🏥 Clínicas Ativas: {metrics.get('clinicas_ativas', 0)}")
+        print(f"   📊 Total de Leads: {metrics.leads_totais}")
+        print(f"   💰 Faturamento Total: R$ {metrics.faturamento:,.0f}".replace(",", "."))
+        print(f"   📈 ROAS Médio: {metrics.roas:.1f}x")
+        print(f"   🏥 Clínicas Ativas: {metrics.clinicas_ativas}")
         
         print("✅ Métricas consolidadas: OK")
         return True
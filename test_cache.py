@@ -0,0 +1,262 @@
+"""
+Script de teste para verificar o cache de DataFrames e de gráficos por clínica e sua invalidação.
+"""
+
+from dotenv import load_dotenv
+from banco_de_teste import criar_banco_temporario, criar_clinica
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+def _create_temp_database():
+    """Cria um banco SQLite temporário com uma clínica de teste"""
+    from database import DadosDashboardCRUD, ProcedimentoCRUD
+
+    manager = criar_banco_temporario("test_cache.db")
+    cliente = criar_clinica(manager, "Clínica Cache", email="cache@clinica.com")
+    return cliente.id, DadosDashboardCRUD(manager), ProcedimentoCRUD(manager)
+
+def test_cache_hit_and_invalidation():
+    """Testa se releituras vêm da memória e se escritas invalidam a clínica"""
+    print("🔍 Testando cache por clínica...")
+
+    from cache import ClinicDataCache
+
+    cache = ClinicDataCache()
+    chamadas = []
+
+    def loader():
+        chamadas.append(1)
+        return len(chamadas)
+
+    assert cache.get_or_load(1, 'dados', loader) == 1
+    assert cache.get_or_load(1, 'dados', loader) == 1, "Segunda leitura deveria vir do cache"
+    assert cache.get_or_load(2, 'dados', loader) == 2, "Clínicas diferentes não compartilham entradas"
+
+    marcador = cache.get_write_marker(1)
+    cache.invalidate(1)
+    assert cache.get_write_marker(1) > marcador
+    assert cache.get_or_load(1, 'dados', loader) == 3, "Invalidação deveria forçar nova leitura"
+    assert cache.get_or_load(2, 'dados', loader) == 2, "Invalidação não deveria afetar outra clínica"
+
+    print("✅ Cache por clínica funcionando")
+
+def test_cache_expiracao_e_limite():
+    """Testa se os dados expiram (escritas de outros processos) e se cada clínica guarda poucas entradas"""
+    print("🔍 Testando expiração e limite do cache...")
+
+    import time
+    from cache import ClinicDataCache, FigureCache
+
+    cache = ClinicDataCache(ttl=0.05, max_entradas=2)
+    figuras = FigureCache(cache, 1024 * 1024)
+    chamadas = []
+
+    def loader():
+        chamadas.append(1)
+        return len(chamadas)
+
+    assert cache.get_or_load(1, 'dados', loader) == 1
+    assert figuras.get_or_build(1, 'filtro', 'grafico', lambda: None) is None
+    assert figuras.get_or_build(None, 'filtro', 'consolidado', lambda: None) is None
+    marcador, consolidado = cache.get_write_marker(1), cache.get_latest_marker()
+    time.sleep(0.06)
+
+    # Sem escrita neste processo, os valores expiram e são recarregados do banco
+    assert cache.get_write_marker(1) > marcador and cache.get_latest_marker() > consolidado
+    assert cache.get_or_load(1, 'dados', loader) == 2, "Entrada expirada deveria ser recarregada"
+    figuras.get_or_build(1, 'filtro', 'grafico', lambda: None)
+    figuras.get_or_build(None, 'filtro', 'consolidado', lambda: None)
+    assert (figuras.hits, figuras.misses) == (0, 4), "Figuras expiradas deveriam ser montadas de novo"
+
+    # LRU: a entrada usada há mais tempo sai quando a clínica passa do limite
+    cache = ClinicDataCache(ttl=0, max_entradas=2)
+    for filtro in ('janeiro', 'fevereiro'):
+        cache.get_or_load(1, ('dados_filtrados', filtro), loader)
+    cache.get_or_load(1, ('dados_filtrados', 'janeiro'), loader)
+    cache.get_or_load(1, ('dados_filtrados', 'março'), loader)
+    total = len(chamadas)
+    cache.get_or_load(1, ('dados_filtrados', 'janeiro'), loader)
+    assert len(chamadas) == total, "Entrada usada recentemente deveria ser mantida"
+    cache.get_or_load(1, ('dados_filtrados', 'fevereiro'), loader)
+    assert len(chamadas) == total + 1, "Entrada menos usada deveria ter sido descartada"
+
+    print("✅ Expiração e limite do cache funcionando")
+
+def test_crud_writes_invalidate_cache():
+    """Testa se as escritas do CRUD avançam o marcador da clínica"""
+    print("🔍 Testando invalidação pelas escritas do CRUD...")
+
+    from cache import clinic_cache
+
+    cliente_id, dados_crud, procedimento_crud = _create_temp_database()
+
+    def load():
+        return clinic_cache.get_or_load(
+            cliente_id, ('dados', None), lambda: dados_crud.get_dataframe_by_cliente(cliente_id)
+        )
+
+    assert load().empty
+
+    dados = dados_crud.create_dados_dashboard(cliente_id, "Janeiro", leads_totais=10, faturamento=1000.0)
+    df = load()
+    assert len(df) == 1, "Criação deveria invalidar o cache"
+    assert load() is df, "Releitura sem escrita deveria retornar o mesmo DataFrame"
+
+    dados_crud.update_dados_dashboard(dados.id, leads_totais=20)
+    assert load()['Leads_Totais'].iloc[0] == 20, "Atualização deveria invalidar o cache"
+
+    dados_crud.delete_dados_dashboard(dados.id)
+    assert load().empty, "Remoção deveria invalidar o cache"
+
+    marcador = clinic_cache.get_write_marker(cliente_id)
+    procedimento = procedimento_crud.create_procedimento(cliente_id, "Rinoplastia", "Janeiro")
+    assert clinic_cache.get_write_marker(cliente_id) > marcador
+
+    marcador = clinic_cache.get_write_marker(cliente_id)
+    procedimento_crud.update_procedimento(procedimento.id, valor_da_venda=5000.0)
+    assert clinic_cache.get_write_marker(cliente_id) > marcador
+
+    marcador = clinic_cache.get_write_marker(cliente_id)
+    procedimento_crud.delete_procedimento(procedimento.id)
+    assert clinic_cache.get_write_marker(cliente_id) > marcador
+
+    print("✅ Escritas do CRUD invalidam o cache da clínica")
+
+def test_figure_cache():
+    """Testa se figuras são reaproveitadas por filtro, invalidadas por escrita e limitadas em bytes"""
+    print("🔍 Testando cache de gráficos...")
+
+    import plotly.graph_objects as go
+    from cache import ClinicDataCache, FigureCache
+
+    dados = ClinicDataCache()
+    chamadas = []
+
+    def construir(valores):
+        def construtor():
+            chamadas.append(valores)
+            return go.Figure(go.Bar(x=list(range(len(valores))), y=valores))
+        return construtor
+
+    figuras = FigureCache(dados, max_bytes=10 ** 6)
+    figura = figuras.get_or_build(1, ('Janeiro',), 'funil', construir([1, 2, 3]))
+    assert figura.data[0].y == (1, 2, 3)
+    assert figuras.get_or_build(1, ('Janeiro',), 'funil', construir([9])) is figura, "Segunda leitura deveria vir do cache"
+    assert len(chamadas) == 1 and figuras.hits == 1
+
+    # Filtro, gráfico e clínica fazem parte da chave
+    figuras.get_or_build(1, ('Fevereiro',), 'funil', construir([4]))
+    figuras.get_or_build(1, ('Janeiro',), 'custos', construir([5]))
+    figuras.get_or_build(2, ('Janeiro',), 'funil', construir([6]))
+    assert len(chamadas) == 4 and len(figuras) == 4
+
+    # Escrita na clínica reconstrói e descarta as figuras antigas dela
+    dados.invalidate(1)
+    assert figuras.get_or_build(1, ('Janeiro',), 'funil', construir([7])).data[0].y == (7,)
+    assert len(figuras) == 2, "Figuras da clínica com marcador antigo deveriam ser removidas"
+
+    # Gráficos consolidados dependem de escritas em qualquer clínica
+    figuras.get_or_build(None, None, 'evolucao', construir([8]))
+    figuras.get_or_build(None, None, 'evolucao', construir([8]))
+    dados.invalidate(2)
+    figuras.get_or_build(None, None, 'evolucao', construir([8]))
+    assert chamadas.count([8]) == 2
+
+    # Sem dados o construtor retorna None, que também fica em cache
+    assert figuras.get_or_build(1, (), 'vazio', lambda: chamadas.append(None)) is None
+    assert figuras.get_or_build(1, (), 'vazio', lambda: chamadas.append(None)) is None
+    assert chamadas.count(None) == 1
+
+    # Limite em bytes: as figuras usadas há mais tempo saem primeiro
+    tamanho = len(go.Figure(go.Bar(x=[0], y=[0])).to_json())
+    figuras = FigureCache(ClinicDataCache(), max_bytes=3 * tamanho)
+    for grafico in ('a', 'b', 'c'):
+        figuras.get_or_build(1, None, grafico, construir([0]))
+    figuras.get_or_build(1, None, 'a', construir([0]))
+    figuras.get_or_build(1, None, 'd', construir([0]))
+    assert figuras.bytes_usados <= 3 * tamanho and len(figuras) == 3
+    antes = len(chamadas)
+    figuras.get_or_build(1, None, 'a', construir([0]))
+    assert len(chamadas) == antes, "Figura usada recentemente deveria permanecer"
+    figuras.get_or_build(1, None, 'b', construir([0]))
+    assert len(chamadas) == antes + 1, "Figura usada há mais tempo deveria ter sido removida"
+
+    print("✅ Cache de gráficos funcionando")
+
+def test_figure_cache_render():
+    """Testa se exibir uma figura do cache funciona (mesmo sem traços) e custa menos que montá-la"""
+    print("🔍 Testando exibição de gráficos do cache...")
+
+    import time
+    import statistics
+    import plotly.graph_objects as go
+    from streamlit.elements.plotly_chart import marshall
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+    from cache import ClinicDataCache, FigureCache
+
+    meses = [f"Mês {i} 2024" for i in range(12)]
+
+    def construir():
+        figura = go.Figure()
+        figura.add_trace(go.Bar(x=meses, y=list(range(12)), name='Faturamento'))
+        figura.add_trace(go.Scatter(x=meses, y=list(range(12, 0, -1)), name='Investimento', yaxis='y2'))
+        figura.update_layout(title="Faturamento vs Investimento", yaxis2=dict(overlaying='y', side='right'), height=400)
+        return figura
+
+    def exibir(figura):
+        """Mesmo caminho de st.plotly_chart"""
+        proto = PlotlyChartProto()
+        marshall(proto, figura, True, "streamlit", "streamlit")
+        return proto
+
+    figuras = FigureCache(ClinicDataCache(), max_bytes=10 ** 6)
+    esperado = exibir(construir()).figure.spec
+    assert exibir(figuras.get_or_build(1, None, 'financeiro', construir)).figure.spec == esperado
+    assert exibir(figuras.get_or_build(1, None, 'financeiro', construir)).figure.spec == esperado
+    assert figuras.hits == 1
+
+    # Gráfico sem traços também pode ser exibido a partir do cache
+    figuras.get_or_build(1, None, 'vazio', go.Figure)
+    exibir(figuras.get_or_build(1, None, 'vazio', go.Figure))
+
+    def medir(func, repeticoes=30):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            func()
+            tempos.append(time.perf_counter() - inicio)
+        return statistics.median(tempos)
+
+    sem_cache = medir(lambda: exibir(construir()))
+    com_cache = medir(lambda: exibir(figuras.get_or_build(1, None, 'financeiro', construir)))
+    assert com_cache < sem_cache, f"Cache ({com_cache * 1000:.1f} ms) deveria ser mais rápido que montar ({sem_cache * 1000:.1f} ms)"
+
+    print(f"✅ Gráfico do cache exibido em {com_cache * 1000:.1f} ms (montar: {sem_cache * 1000:.1f} ms)")
+
+def main():
+    """Executa todos os testes"""
+    print("🚀 TESTE DO CACHE DE DADOS POR CLÍNICA")
+    print("=" * 50)
+
+    tests = [
+        ("Cache por clínica", test_cache_hit_and_invalidation),
+        ("Expiração e limite", test_cache_expiracao_e_limite),
+        ("Invalidação pelo CRUD", test_crud_writes_invalidate_cache),
+        ("Cache de gráficos", test_figure_cache),
+        ("Exibição de gráficos do cache", test_figure_cache_render)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}:")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Falhou: {e}")
+
+    print(f"\n🎯 RESULTADO: {passed}/{len(tests)} testes passaram")
+
+if __name__ == "__main__":
+    main()
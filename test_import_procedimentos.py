@@ -0,0 +1,151 @@
+"""
+Script de teste para verificar a conversão da aba "Procedimentos" e a inserção em lote.
+Roda sem acesso ao Google Sheets.
+"""
+
+import io
+import contextlib
+from datetime import datetime
+from dotenv import load_dotenv
+from banco_de_teste import criar_banco_temporario, criar_clinica
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+HEADERS = [
+    'Data 1° Contato', 'Data Compareu na Consulta', 'Data Fechou Cirurgia', 'Procedimento', 'Tipo',
+    'Quantidade na Mesma Venda', 'Forma de Pagamento', 'Valor da Venda', 'Valor do Parcelado'
+]
+
+def _values(rows):
+    """Monta os valores da aba no formato de get_all_values"""
+    return [['Outubro'], HEADERS] + rows
+
+def test_process_procedimentos_values():
+    """Testa a conversão das colunas de datas, moeda e quantidade"""
+    print("🔍 Testando conversão da aba 'Procedimentos'...")
+
+    from import_procedimentos import process_procedimentos_values
+
+    rows = [
+        ['15/03/2024', '1/4/24', '2024-05-06', ' Rinoplastia ', 'Cirúrgico', '2', 'PIX', 'R$ 12.500,00', '1,5'],
+        ['09-10-2024', '', 'abc', 'Botox', '', 'abc', 'Cartão', '1,500', 'R$ -'],
+        ['', '', '', '', 'Cirúrgico', '1', 'PIX', 'R$ 100,00', ''],
+        ['31/02/2024', 'March 5, 2024', ' ', 'nan', '', '', '', '', ''],
+    ]
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = process_procedimentos_values(_values(rows))
+
+    assert len(df) == 2, "Linhas sem procedimento deveriam ser ignoradas"
+    primeiro, segundo = df.to_dict('records')
+
+    assert primeiro['procedimento'] == 'Rinoplastia'
+    assert primeiro['mes_referencia'] == 'Outubro'
+    assert primeiro['data_primeiro_contato'] == datetime(2024, 3, 15)
+    assert primeiro['data_compareceu_consulta'] == datetime(2024, 4, 1)
+    assert primeiro['data_fechou_cirurgia'] == datetime(2024, 5, 6)
+    assert primeiro['quantidade_na_mesma_venda'] == 2
+    assert primeiro['valor_da_venda'] == 12500.0
+    assert primeiro['valor_parcelado'] == 1.5
+
+    assert segundo['data_primeiro_contato'] == datetime(2024, 10, 9)
+    assert segundo['data_compareceu_consulta'] is None, "Datas vazias deveriam virar None"
+    assert segundo['data_fechou_cirurgia'] is None, "Datas inválidas deveriam virar None"
+    assert segundo['quantidade_na_mesma_venda'] == 1
+    assert segundo['valor_da_venda'] == 1500.0
+    assert segundo['valor_parcelado'] == 0.0
+
+    print("✅ Conversão das colunas funcionando")
+
+def test_bulk_create_procedimentos():
+    """Testa a inserção em lote, inclusive com datas ausentes"""
+    print("🔍 Testando inserção em lote de procedimentos...")
+
+    from database import ProcedimentoCRUD
+    from import_procedimentos import process_procedimentos_values
+
+    manager = criar_banco_temporario("test_import_procedimentos.db")
+    cliente = criar_clinica(manager, "Clínica Procedimentos", email="procedimentos@clinica.com")
+    procedimento_crud = ProcedimentoCRUD(manager)
+
+    rows = [
+        ['15/03/2024', '', '', f'Procedimento {i}', 'Cirúrgico', '1', 'PIX', f'R$ {i}.000,00', '']
+        for i in range(1, 501)
+    ]
+    rows[1][0] = ''
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = process_procedimentos_values(_values(rows))
+
+    assert procedimento_crud.bulk_create(cliente.id, df.to_dict('records')) == 500
+    procedimentos = procedimento_crud.get_procedimentos_by_cliente(cliente.id)
+    assert len(procedimentos) == 500
+    por_nome = {p.procedimento: p for p in procedimentos}
+    assert por_nome['Procedimento 1'].data_primeiro_contato == datetime(2024, 3, 15)
+    assert por_nome['Procedimento 2'].data_primeiro_contato is None
+    assert por_nome['Procedimento 500'].valor_da_venda == 500000.0
+
+    assert procedimento_crud.bulk_create(cliente.id, []) == 0
+
+    print("✅ Inserção em lote funcionando")
+
+def test_bulk_create_substituir_meses():
+    """Testa a substituição atômica dos procedimentos do mês importado"""
+    print("🔍 Testando substituição dos procedimentos do mês...")
+
+    from database import ProcedimentoCRUD
+
+    manager = criar_banco_temporario("test_substituir_meses.db")
+    cliente = criar_clinica(manager, "Clínica Meses", email="meses@clinica.com")
+    outro = criar_clinica(manager, "Outra Clínica", email="outra@clinica.com")
+    procedimento_crud = ProcedimentoCRUD(manager)
+
+    def registros(mes, quantidade, prefixo):
+        return [{'procedimento': f'{prefixo} {i}', 'mes_referencia': mes} for i in range(quantidade)]
+
+    assert procedimento_crud.bulk_create(cliente.id, registros('Outubro', 30, 'Antigo'), batch_size=7) == 30
+    assert procedimento_crud.bulk_create(cliente.id, registros('Setembro', 5, 'Setembro')) == 5
+    assert procedimento_crud.bulk_create(outro.id, registros('Outubro', 3, 'Outra')) == 3
+
+    assert procedimento_crud.bulk_create(
+        cliente.id, registros('Outubro', 12, 'Novo'), substituir_meses=True, batch_size=5
+    ) == 12
+
+    nomes = [p.procedimento for p in procedimento_crud.get_procedimentos_by_cliente(cliente.id)]
+    assert len(nomes) == 17, "Somente o mês importado deveria ser substituído"
+    assert not any(nome.startswith('Antigo') for nome in nomes)
+    assert sum(nome.startswith('Setembro') for nome in nomes) == 5
+    assert len(procedimento_crud.get_procedimentos_by_cliente(outro.id)) == 3
+
+    # Uma falha no meio da inserção desfaz também a remoção
+    invalidos = registros('Outubro', 4, 'Falha') + [{'procedimento': None, 'mes_referencia': 'Outubro'}]
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert procedimento_crud.bulk_create(cliente.id, invalidos, substituir_meses=True, batch_size=2) is None
+    nomes = [p.procedimento for p in procedimento_crud.get_procedimentos_by_cliente(cliente.id)]
+    assert len(nomes) == 17 and sum(nome.startswith('Novo') for nome in nomes) == 12
+
+    print("✅ Substituição do mês funcionando")
+
+def main():
+    """Executa todos os testes"""
+    print("🚀 TESTE DA IMPORTAÇÃO DE PROCEDIMENTOS")
+    print("=" * 50)
+
+    tests = [
+        ("Conversão das colunas", test_process_procedimentos_values),
+        ("Inserção em lote", test_bulk_create_procedimentos),
+        ("Substituição do mês", test_bulk_create_substituir_meses)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}:")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Falhou: {e}")
+
+    print(f"\n🎯 RESULTADO: {passed}/{len(tests)} testes passaram")
+
+if __name__ == "__main__":
+    main()
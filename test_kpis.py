@@ -0,0 +1,184 @@
+"""
+Script de teste para verificar o cálculo vetorizado dos KPIs.
+Compara kpis.py com as fórmulas escalares usadas antes no CRUD e nas páginas,
+em DataFrames aleatórios (inclusive com zeros, NaN e valores grandes).
+"""
+
+import gc
+import random
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+CASOS = 200
+
+def _frame_aleatorio(rng, linhas):
+    """DataFrame no formato do dashboard, com muitos zeros e negativos para exercitar as divisões"""
+    def valor(maximo, inteiro=True):
+        sorteio = rng.random()
+        if sorteio < 0.25:
+            return 0
+        if sorteio < 0.3 and not inteiro:
+            return float('nan')
+        if sorteio < 0.4:
+            # Negativos (estornos, correções na planilha) também são denominadores válidos
+            return -rng.randint(1, maximo) if inteiro else -rng.uniform(0.01, maximo)
+        return rng.randint(1, maximo) if inteiro else rng.uniform(0.01, maximo)
+
+    return pd.DataFrame({
+        'Meses': [f"Mês {i}" for i in range(linhas)],
+        'Leads_Totais': [valor(500) for _ in range(linhas)],
+        'Consultas_Marcadas_Totais': [valor(200) for _ in range(linhas)],
+        'Consultas_Comparecidas': [valor(100) for _ in range(linhas)],
+        'Fechamentos_Totais': [valor(50) for _ in range(linhas)],
+        'Faturamento': [valor(10 ** rng.randint(2, 9), inteiro=False) for _ in range(linhas)],
+        'Valor_Investido_Total': [valor(10 ** rng.randint(2, 7), inteiro=False) for _ in range(linhas)],
+    })
+
+def _referencia_calculate_kpis(df):
+    """Implementação anterior de DadosDashboardCRUD._calculate_kpis"""
+    def safe_divide(numerator, denominator):
+        return np.where(denominator != 0, numerator / denominator, 0)
+
+    df['Conversao_Csm_Leads'] = safe_divide(df['Consultas_Marcadas_Totais'], df['Leads_Totais']) * 100
+    df['Conversao_Csc_Csm'] = safe_divide(df['Consultas_Comparecidas'], df['Consultas_Marcadas_Totais']) * 100
+    df['Conversao_Fechamento_Csc'] = safe_divide(df['Fechamentos_Totais'], df['Consultas_Comparecidas']) * 100
+    df['Conversao_Fechamento_Leads'] = safe_divide(df['Fechamentos_Totais'], df['Leads_Totais']) * 100
+    df['Custo_por_Compra_Cirurgias'] = safe_divide(df['Valor_Investido_Total'], df['Fechamentos_Totais'])
+    df['ROAS'] = safe_divide(df['Faturamento'], df['Valor_Investido_Total'])
+    df['Custo_por_Lead_Total'] = safe_divide(df['Valor_Investido_Total'], df['Leads_Totais'])
+    df['Custo_por_Consulta_Marcada'] = safe_divide(df['Valor_Investido_Total'], df['Consultas_Marcadas_Totais'])
+    df['Custo_por_Consulta_Comparecida'] = safe_divide(df['Valor_Investido_Total'], df['Consultas_Comparecidas'])
+    df['Ticket_Medio'] = safe_divide(df['Faturamento'], df['Fechamentos_Totais'])
+    df['Taxa_Ideal_Csm'] = 10.0
+    df['Taxa_Ideal_Csc'] = 50.0
+    df['Taxa_Ideal_Fechamentos'] = 40.0
+    return df.replace([np.inf, -np.inf, np.nan], 0)
+
+def _referencia_totais(df):
+    """Fórmulas escalares usadas antes nas páginas (create_executive_summary, create_funnel_analysis...)"""
+    total_leads = df['Leads_Totais'].sum()
+    total_consultas_marcadas = df['Consultas_Marcadas_Totais'].sum()
+    total_consultas_comparecidas = df['Consultas_Comparecidas'].sum()
+    total_fechamentos = df['Fechamentos_Totais'].sum()
+    total_faturamento = df['Faturamento'].sum()
+    total_investimento = df['Valor_Investido_Total'].sum()
+    return {
+        'roas': total_faturamento / total_investimento if total_investimento > 0 else 0,
+        'ticket_medio': total_faturamento / total_fechamentos if total_fechamentos > 0 else 0,
+        'custo_por_lead_total': total_investimento / total_leads if total_leads > 0 else 0,
+        'conversao_csm_leads': (total_consultas_marcadas / total_leads * 100) if total_leads > 0 else 0,
+        'conversao_csc_csm': (total_consultas_comparecidas / total_consultas_marcadas * 100) if total_consultas_marcadas > 0 else 0,
+        'conversao_fechamento_csc': (total_fechamentos / total_consultas_comparecidas * 100) if total_consultas_comparecidas > 0 else 0,
+        'conversao_fechamento_leads': (total_fechamentos / total_leads * 100) if total_leads > 0 else 0,
+    }
+
+def test_kpis_por_linha_equivalentes():
+    """Testa se calcular_kpis gera as mesmas colunas que a implementação anterior"""
+    print("🔍 Testando KPIs por linha...")
+
+    from kpis import calcular_kpis
+
+    rng = random.Random(19)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for caso in range(CASOS):
+            df = _frame_aleatorio(rng, rng.randint(1, 40))
+            if caso % 2:
+                df = df.fillna(0)  # Sem NaN, como os dados vindos do banco
+            esperado = _referencia_calculate_kpis(df.copy())
+            obtido = calcular_kpis(df.copy())
+
+            assert list(obtido.columns) == list(esperado.columns)
+            pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, rtol=1e-12)
+
+    print("✅ KPIs por linha idênticos aos anteriores")
+
+def test_totais_equivalentes():
+    """Testa se os KPIs do período (razão entre as somas) batem com as fórmulas escalares"""
+    print("🔍 Testando KPIs do período...")
+
+    from kpis import totais, razao
+
+    rng = random.Random(20)
+    for _ in range(CASOS):
+        df = _frame_aleatorio(rng, rng.randint(1, 40))
+        resultado = totais(df)
+        for nome, valor in _referencia_totais(df).items():
+            assert abs(getattr(resultado, nome) - valor) <= 1e-9 * max(1.0, abs(valor)), (nome, valor)
+
+        assert isinstance(resultado.leads_totais, int), "Somas de colunas inteiras deveriam continuar inteiras"
+        assert resultado.leads_totais == df['Leads_Totais'].sum()
+
+    # Propriedades da divisão segura
+    assert razao(5, 0) == 0.0 and razao(0, 0) == 0.0 and razao(1, 4, 100) == 25.0
+    assert isinstance(razao(1, 2), float)
+    assert list(razao(pd.Series([1, 2, 3]), pd.Series([0, 4, 3]))) == [0.0, 0.5, 1.0]
+    assert razao(1000, -50) == -20.0, "Denominador negativo deveria ser dividido, como antes"
+
+    print("✅ KPIs do período idênticos aos anteriores")
+
+def test_variacao():
+    """Testa a variação percentual entre meses"""
+    print("🔍 Testando variação entre meses...")
+
+    from kpis import variacao
+
+    rng = random.Random(21)
+    for _ in range(CASOS):
+        atual = rng.choice([0, rng.uniform(-1000, 1000)])
+        anterior = rng.choice([0, rng.uniform(-1000, 1000)])
+        esperado = ((atual - anterior) / anterior * 100) if anterior > 0 else 0
+        assert abs(variacao(atual, anterior) - esperado) <= 1e-9 * max(1.0, abs(esperado))
+
+    print("✅ Variação entre meses funcionando")
+
+def test_memorizacao_por_frame():
+    """Testa se os valores derivados são calculados uma vez por DataFrame e descartados com ele"""
+    print("🔍 Testando memorização por DataFrame...")
+
+    import kpis
+
+    df = _frame_aleatorio(random.Random(22), 12)
+    ativos = kpis.meses_ativos(df)
+    assert kpis.meses_ativos(df) is ativos, "O filtro de meses ativos deveria ser reutilizado"
+    assert kpis.totais(ativos) is kpis.totais(ativos)
+    assert len(ativos) == ((df['Leads_Totais'] > 0) | (df['Faturamento'] > 0) | (df['Valor_Investido_Total'] > 0)).sum()
+
+    # Outro DataFrame com o mesmo conteúdo não compartilha a memória
+    assert kpis.meses_ativos(df.copy()) is not ativos
+
+    chaves = {id(df), id(ativos)}
+    del df, ativos
+    gc.collect()
+    assert not chaves & set(kpis._memo), "Entradas de DataFrames descartados deveriam ser removidas"
+
+    print("✅ Memorização por DataFrame funcionando")
+
+def main():
+    """Executa todos os testes"""
+    print("🚀 TESTE DO CÁLCULO DE KPIs")
+    print("=" * 50)
+
+    tests = [
+        ("KPIs por linha", test_kpis_por_linha_equivalentes),
+        ("KPIs do período", test_totais_equivalentes),
+        ("Variação entre meses", test_variacao),
+        ("Memorização por DataFrame", test_memorizacao_por_frame)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}:")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Falhou: {e}")
+
+    print(f"\n🎯 RESULTADO: {passed}/{len(tests)} testes passaram")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Script de teste para verificar os modelos somente leitura retornados pelas consultas do CRUD.
+"""
+
+import pickle
+import dataclasses
+from dotenv import load_dotenv
+from banco_de_teste import criar_banco_temporario, criar_clinica
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+def _create_temp_database():
+    """Cria um banco SQLite temporário com uma clínica de teste com dados e procedimentos"""
+    from database import DadosDashboardCRUD, ProcedimentoCRUD
+
+    manager = criar_banco_temporario("test_modelos_leitura.db")
+    cliente = criar_clinica(
+        manager, "Clínica Leitura",
+        email="leitura@clinica.com",
+        link_empresa="https://docs.google.com/spreadsheets/d/teste/edit"
+    )
+    DadosDashboardCRUD(manager).upsert_dados_meses(cliente.id, [
+        {'mes': "Janeiro", 'leads_totais': 10, 'faturamento': 1000.0},
+        {'mes': "Fevereiro", 'leads_totais': 20, 'faturamento': 2000.0},
+    ], ano=2024)
+    ProcedimentoCRUD(manager).bulk_create(cliente.id, [
+        {'procedimento': "Botox", 'mes_referencia': "Fevereiro", 'ano_referencia': 2024, 'valor_da_venda': 500.0}
+    ])
+    return manager, cliente.id
+
+
+def test_campos_dos_modelos():
+    """Testa se os modelos de leitura têm uma posição por coluna e nenhum estado do SQLAlchemy"""
+    print("🔍 Testando campos dos modelos de leitura...")
+
+    from models import Cliente, DadosDashboard, Procedimento, ClienteLeitura, DadosDashboardLeitura, ProcedimentoLeitura
+
+    for modelo, leitura in ((Cliente, ClienteLeitura), (DadosDashboard, DadosDashboardLeitura), (Procedimento, ProcedimentoLeitura)):
+        campos = [campo.name for campo in dataclasses.fields(leitura)]
+        assert campos == [coluna.key for coluna in leitura.colunas]
+        assert set(campos) <= set(modelo.__table__.columns.keys())
+        assert leitura.__slots__ == tuple(campos)
+
+    # A senha não sai do CRUD
+    assert 'senha_hash' not in ClienteLeitura.__slots__
+    assert len(DadosDashboardLeitura.colunas) == len(DadosDashboard.__table__.columns)
+
+    print("✅ Campos dos modelos de leitura corretos")
+
+def test_consultas_retornam_leitura():
+    """Testa se as consultas do CRUD retornam objetos imutáveis, sem estado e serializáveis"""
+    print("🔍 Testando consultas com modelos de leitura...")
+
+    from database import ClienteCRUD, DadosDashboardCRUD, ProcedimentoCRUD
+    from models import ClienteLeitura, DadosDashboardLeitura, ProcedimentoLeitura
+
+    manager, cliente_id = _create_temp_database()
+    cliente_crud = ClienteCRUD(manager)
+    dados_crud = DadosDashboardCRUD(manager)
+    procedimento_crud = ProcedimentoCRUD(manager)
+
+    cliente = cliente_crud.get_cliente_by_id(cliente_id)
+    assert isinstance(cliente, ClienteLeitura)
+    assert cliente.nome_da_clinica == "Clínica Leitura" and cliente.ativo is True
+    assert cliente_crud.get_cliente_by_id(cliente_id + 1000) is None
+    assert [c.id for c in cliente_crud.get_all_clientes()] == [cliente_id]
+
+    # Autenticação continua conferindo a senha, e o objeto retornado não carrega o hash
+    autenticado = cliente_crud.authenticate_cliente("leitura@clinica.com", "teste123")
+    assert autenticado == cliente
+    assert cliente_crud.authenticate_cliente("leitura@clinica.com", "errada") is None
+
+    dados = dados_crud.get_dados_by_cliente(cliente_id)
+    assert all(isinstance(d, DadosDashboardLeitura) for d in dados)
+    assert [(d.mes, d.mes_numero, d.leads_totais) for d in dados] == [("Janeiro", 1, 10), ("Fevereiro", 2, 20)]
+    assert [d.mes for d in dados_crud.get_dados_by_cliente_and_period(cliente_id, ["Fevereiro"], ano=2024)] == ["Fevereiro"]
+    assert list(dados_crud.dados_to_dataframe(dados)['Leads_Totais']) == [10, 20]
+
+    procedimentos = procedimento_crud.get_procedimentos_by_cliente(cliente_id)
+    assert all(isinstance(p, ProcedimentoLeitura) for p in procedimentos)
+    assert procedimentos == procedimento_crud.get_procedimentos_by_range(cliente_id, (2024, 2), (2024, 2))
+    assert procedimentos == procedimento_crud.get_procedimentos_by_period(cliente_id, ["Fevereiro"], 2024)
+    assert list(procedimento_crud.procedimentos_to_dataframe(procedimentos)['Procedimento']) == ["Botox"]
+
+    # Imutáveis, sem __dict__ e seguros para cache (hash e pickle)
+    for objeto in (cliente, dados[0], procedimentos[0]):
+        assert not hasattr(objeto, '__dict__') and not hasattr(objeto, '_sa_instance_state')
+        try:
+            objeto.id = 0
+            assert False, "Modelos de leitura deveriam ser imutáveis"
+        except dataclasses.FrozenInstanceError:
+            pass
+        assert hash(objeto) == hash(pickle.loads(pickle.dumps(objeto)))
+
+    # Alterações passam pelo CRUD e aparecem na próxima leitura
+    assert cliente_crud.update_cliente(cliente_id, telefone="11999999999")
+    assert cliente_crud.get_cliente_by_id(cliente_id).telefone == "11999999999"
+    assert cliente.telefone is None
+
+    print("✅ Consultas retornam modelos de leitura")
+
+def main():
+    """Executa todos os testes"""
+    print("🚀 TESTE DOS MODELOS SOMENTE LEITURA")
+    print("=" * 50)
+
+    tests = [
+        ("Campos dos modelos", test_campos_dos_modelos),
+        ("Consultas com modelos de leitura", test_consultas_retornam_leitura)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}:")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Falhou: {e}")
+
+    print(f"\n🎯 RESULTADO: {passed}/{len(tests)} testes passaram")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Script de teste para verificar a ordenação cronológica dos meses e os filtros de período feitos no banco.
+"""
+
+from dotenv import load_dotenv
+from banco_de_teste import criar_banco_temporario, criar_clinica
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+def _create_temp_database():
+    """Cria um banco SQLite temporário com uma clínica de teste"""
+    manager = criar_banco_temporario("test_periodo.db")
+    cliente = criar_clinica(manager, "Clínica Período", email="periodo@clinica.com")
+    return manager, cliente.id
+
+
+def test_mes_numero_preenchido():
+    """Testa se o número do mês é preenchido em todos os caminhos de escrita"""
+    print("🔍 Testando preenchimento do número do mês...")
+
+    from database import DadosDashboardCRUD, ProcedimentoCRUD
+
+    manager, cliente_id = _create_temp_database()
+    dados_crud = DadosDashboardCRUD(manager)
+    procedimento_crud = ProcedimentoCRUD(manager)
+
+    dados = dados_crud.create_dados_dashboard(cliente_id, "Março")
+    assert dados.mes_numero == 3
+    dados_crud.upsert_dados_dashboard(cliente_id, "Dezembro", leads_totais=1)
+    dados_crud.sync_dados_cliente(cliente_id, [{'mes': "Abril"}], ano=2023)
+    dados_crud.update_dados_dashboard(dados.id, mes="Maio")
+
+    numeros = {(d.ano, d.mes): d.mes_numero for d in dados_crud.get_dados_by_cliente(cliente_id)}
+    assert numeros == {(2023, "Abril"): 4, (2024, "Maio"): 5, (2024, "Dezembro"): 12}, numeros
+
+    procedimento_crud.create_procedimento(cliente_id, "Botox", "Fevereiro")
+    procedimento_crud.bulk_create(cliente_id, [{'procedimento': "Rinoplastia", 'mes_referencia': "Novembro"}])
+    numeros = {p.mes_referencia: p.mes_referencia_numero for p in procedimento_crud.get_procedimentos_by_cliente(cliente_id)}
+    assert numeros == {"Fevereiro": 2, "Novembro": 11}, numeros
+
+    print("✅ Número do mês preenchido")
+
+def test_ordem_cronologica():
+    """Testa se as consultas retornam os meses em ordem cronológica, inclusive entre anos"""
+    print("🔍 Testando ordem cronológica das consultas...")
+
+    from database import DadosDashboardCRUD, ProcedimentoCRUD, AdminDashboardCRUD
+
+    manager, cliente_id = _create_temp_database()
+    dados_crud = DadosDashboardCRUD(manager)
+    procedimento_crud = ProcedimentoCRUD(manager)
+
+    # Ordem alfabética seria Abril, Dezembro, Fevereiro, Janeiro
+    for ano, meses in ((2025, ["Fevereiro", "Janeiro"]), (2024, ["Dezembro", "Abril", "Janeiro"])):
+        dados_crud.upsert_dados_meses(cliente_id, [{'mes': mes, 'leads_totais': 10} for mes in meses], ano=ano)
+        procedimento_crud.bulk_create(cliente_id, [
+            {'procedimento': f"{mes} {ano}", 'mes_referencia': mes, 'ano_referencia': ano} for mes in meses
+        ])
+
+    esperado = [(2024, "Janeiro"), (2024, "Abril"), (2024, "Dezembro"), (2025, "Janeiro"), (2025, "Fevereiro")]
+
+    assert [(d.ano, d.mes) for d in dados_crud.get_dados_by_cliente(cliente_id)] == esperado
+
+    df = dados_crud.get_dataframe_by_cliente(cliente_id)
+    assert list(df['Meses']) == [mes for _, mes in esperado], list(df['Meses'])
+
+    procedimentos = procedimento_crud.get_procedimentos_by_cliente(cliente_id)
+    assert [(p.ano_referencia, p.mes_referencia) for p in procedimentos] == esperado
+
+    df = procedimento_crud.get_procedimentos_consolidados()
+    assert list(zip(df['Ano_Referencia'], df['Mes_Referencia'])) == esperado
+
+    evolucao = AdminDashboardCRUD(manager).get_monthly_evolution()
+    assert [(m['ano'], m['mes']) for m in evolucao] == esperado
+
+    evolucao = procedimento_crud.get_evolucao_procedimentos()
+    assert [(m['ano'], m['mes']) for m in evolucao] == esperado
+    assert all(m['quantidade'] == 1 for m in evolucao)
+
+    print("✅ Ordem cronológica funcionando")
+
+def test_filtro_intervalo():
+    """Testa se apenas o intervalo de períodos pedido é buscado"""
+    print("🔍 Testando filtro por intervalo de períodos...")
+
+    from sqlalchemy import event
+    from database import DadosDashboardCRUD, ProcedimentoCRUD
+    from models import MES_ORDER
+
+    manager, cliente_id = _create_temp_database()
+    dados_crud = DadosDashboardCRUD(manager)
+    procedimento_crud = ProcedimentoCRUD(manager)
+
+    for ano in (2022, 2023, 2024):
+        dados_crud.upsert_dados_meses(cliente_id, [
+            {'mes': mes, 'leads_totais': 0 if (ano, mes) == (2023, "Maio") else numero}
+            for mes, numero in MES_ORDER.items()
+        ], ano=ano)
+        procedimento_crud.bulk_create(cliente_id, [
+            {'procedimento': f"{mes} {ano}", 'mes_referencia': mes, 'ano_referencia': ano} for mes in MES_ORDER
+        ])
+
+    periodos = dados_crud.get_periodos_ativos(cliente_id)
+    assert len(periodos) == 35, "Meses sem atividade não deveriam aparecer"
+    assert periodos[0] == (2022, 1, "Janeiro") and periodos[-1] == (2024, 12, "Dezembro")
+    assert (2023, 5, "Maio") not in periodos
+
+    statements = []
+
+    @event.listens_for(manager.engine, "before_cursor_execute")
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    df = dados_crud.get_dataframe_by_cliente(cliente_id, inicio=(2023, 11), fim=(2024, 2))
+    assert list(zip(df['Ano'], df['Meses'])) == [
+        (2023, "Novembro"), (2023, "Dezembro"), (2024, "Janeiro"), (2024, "Fevereiro")
+    ]
+    assert "ano >=" in statements[-1] and "ano <=" in statements[-1], "O filtro deveria ser feito no SQL"
+
+    df = dados_crud.get_dataframe_by_cliente(cliente_id, inicio=(2024, 10))
+    assert list(df['Meses']) == ["Outubro", "Novembro", "Dezembro"]
+    df = dados_crud.get_dataframe_by_cliente(cliente_id, fim=(2022, 2))
+    assert list(df['Meses']) == ["Janeiro", "Fevereiro"]
+
+    procedimentos = procedimento_crud.get_procedimentos_by_range(cliente_id, (2022, 12), (2023, 1))
+    assert [p.procedimento for p in procedimentos] == ["Dezembro 2022", "Janeiro 2023"]
+
+    # Meses selecionados e intervalo são aplicados juntos, em todos os anos do intervalo
+    procedimentos = procedimento_crud.get_procedimentos_by_range(cliente_id, (2022, 6), (2024, 6), ["Março", "Dezembro"])
+    assert [p.procedimento for p in procedimentos] == ["Dezembro 2022", "Março 2023", "Dezembro 2023", "Março 2024"]
+
+    dados = dados_crud.get_dados_by_cliente_and_period(cliente_id, ["Março"], ano=2023)
+    assert [(d.ano, d.mes) for d in dados] == [(2023, "Março")]
+    assert len(dados_crud.get_dados_by_cliente_and_period(cliente_id, ["Março"])) == 3
+
+    print("✅ Filtro por intervalo funcionando")
+
+def test_migracao_na_inicializacao():
+    """Testa se create_tables adiciona e preenche o número do mês e cria os índices em um banco antigo"""
+    print("🔍 Testando migração na inicialização...")
+
+    from sqlalchemy import inspect, text
+    from database import DatabaseManager, DadosDashboardCRUD
+
+    # Banco no formato anterior: sem as colunas de número do mês nem os índices de período
+    antigo = criar_banco_temporario("test_periodo_antigo.db")
+    with antigo.engine.begin() as conn:
+        for indice in ('ix_dados_dashboard_cliente_periodo', 'ix_procedimentos_cliente_periodo'):
+            conn.execute(text(f"DROP INDEX {indice}"))
+        conn.execute(text("ALTER TABLE dados_dashboard DROP COLUMN mes_numero"))
+        conn.execute(text("ALTER TABLE procedimentos DROP COLUMN mes_referencia_numero"))
+        conn.execute(text(
+            "INSERT INTO clientes (nome, email, senha_hash, nome_da_clinica, is_admin, ativo) "
+            "VALUES ('Antiga', 'antiga@clinica.com', 'x', 'Clínica Antiga', 0, 1)"
+        ))
+        conn.execute(text(
+            "INSERT INTO dados_dashboard (cliente_id, mes, ano, leads_totais) VALUES (1, 'Outubro', 2024, 5)"
+        ))
+    antigo.engine.dispose()
+
+    manager = DatabaseManager(antigo.database_url)
+    manager.create_tables()
+
+    inspector = inspect(manager.engine)
+    assert 'mes_numero' in [coluna['name'] for coluna in inspector.get_columns('dados_dashboard')]
+    assert 'mes_referencia_numero' in [coluna['name'] for coluna in inspector.get_columns('procedimentos')]
+    assert 'ix_dados_dashboard_cliente_periodo' in {indice['name'] for indice in inspector.get_indexes('dados_dashboard')}
+    assert [d.mes_numero for d in DadosDashboardCRUD(manager).get_dados_by_cliente(1)] == [10]
+
+    # Inicializar de novo não altera nada
+    manager.create_tables()
+    manager.engine.dispose()
+
+    print("✅ Migração na inicialização funcionando")
+
+def test_remocao_de_duplicados():
+    """Testa se a inicialização preserva meses duplicados e só o script de migração os remove"""
+    print("🔍 Testando remoção de meses duplicados...")
+
+    from sqlalchemy import inspect, text
+    from database import DatabaseManager, DadosDashboardCRUD
+    from models import ResumoMensal
+    from migrate_database import remover_meses_duplicados
+
+    # Banco anterior ao índice único, com o mesmo mês gravado duas vezes
+    antigo, cliente_id = _create_temp_database()
+    with antigo.engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_dados_dashboard_cliente_ano_mes"))
+        for leads in (5, 8):
+            conn.execute(text(
+                "INSERT INTO dados_dashboard (cliente_id, mes, mes_numero, ano, leads_totais) "
+                f"VALUES ({cliente_id}, 'Outubro', 10, 2024, {leads})"
+            ))
+        conn.execute(text(
+            "INSERT INTO dados_dashboard (cliente_id, mes, mes_numero, ano, leads_totais) "
+            f"VALUES ({cliente_id}, 'Novembro', 11, 2024, 3)"
+        ))
+    antigo.engine.dispose()
+
+    # A inicialização não apaga dados: mantém os duplicados e não cria o índice único
+    manager = DatabaseManager(antigo.database_url)
+    manager.create_tables()
+    dados_crud = DadosDashboardCRUD(manager)
+    assert len(dados_crud.get_dados_by_cliente(cliente_id)) == 3
+    indices = {indice['name'] for indice in inspect(manager.engine).get_indexes('dados_dashboard')}
+    assert 'uq_dados_dashboard_cliente_ano_mes' not in indices
+
+    # O script mantém o registro mais recente e recalcula o resumo do mês afetado
+    assert remover_meses_duplicados(manager.engine) == 1
+    dados = dados_crud.get_dados_by_cliente(cliente_id)
+    assert [(d.mes, d.leads_totais) for d in dados] == [("Outubro", 8), ("Novembro", 3)]
+    session = manager.get_session()
+    resumo = {r.mes: r.leads_totais for r in session.query(ResumoMensal)}
+    manager.close_session(session)
+    assert resumo == {"Outubro": 8, "Novembro": 3}
+    assert remover_meses_duplicados(manager.engine) == 0
+
+    # Sem duplicados, a próxima inicialização cria o índice único
+    manager.create_tables()
+    indices = {indice['name'] for indice in inspect(manager.engine).get_indexes('dados_dashboard')}
+    assert 'uq_dados_dashboard_cliente_ano_mes' in indices
+    manager.engine.dispose()
+
+    print("✅ Remoção de meses duplicados funcionando")
+
+def main():
+    """Executa todos os testes"""
+    print("🚀 TESTE DA ORDENAÇÃO POR PERÍODO")
+    print("=" * 50)
+
+    tests = [
+        ("Número do mês", test_mes_numero_preenchido),
+        ("Ordem cronológica", test_ordem_cronologica),
+        ("Filtro por intervalo", test_filtro_intervalo),
+        ("Migração na inicialização", test_migracao_na_inicializacao),
+        ("Remoção de duplicados", test_remocao_de_duplicados)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}:")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Falhou: {e}")
+
+    print(f"\n🎯 RESULTADO: {passed}/{len(tests)} testes passaram")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Script de teste para verificar a manutenção incremental do resumo mensal e as consultas consolidadas do admin.
+"""
+
+from dotenv import load_dotenv
+from banco_de_teste import criar_banco_temporario, criar_clinica
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+def _create_temp_database():
+    """Cria um banco SQLite temporário com duas clínicas e um admin"""
+    manager = criar_banco_temporario("test_resumo_mensal.db")
+    ids = [
+        criar_clinica(manager, nome, is_admin=is_admin).id
+        for nome, is_admin in (("Clínica A", False), ("Clínica B", False), ("Admin", True))
+    ]
+    return manager, ids
+
+
+def _resumo_recalculado(manager):
+    """Resumo calculado do zero a partir de dados_dashboard, para comparar com o mantido"""
+    from database import AdminDashboardCRUD
+
+    admin_crud = AdminDashboardCRUD(manager)
+    mantido = admin_crud.get_monthly_evolution()
+    admin_crud.rebuild_resumo_mensal()
+    return mantido, admin_crud.get_monthly_evolution()
+
+def test_resumo_acompanha_escritas():
+    """Testa se cada operação de escrita mantém o resumo igual a um recálculo completo"""
+    print("🔍 Testando manutenção do resumo mensal...")
+
+    from database import ClienteCRUD, DadosDashboardCRUD, AdminDashboardCRUD
+
+    manager, (clinica_a, clinica_b, admin) = _create_temp_database()
+    cliente_crud = ClienteCRUD(manager)
+    dados_crud = DadosDashboardCRUD(manager)
+    admin_crud = AdminDashboardCRUD(manager)
+
+    def totais():
+        return {(m['ano'], m['mes']): (m['total_leads'], m['total_faturamento']) for m in admin_crud.get_monthly_evolution()}
+
+    dados_crud.sync_dados_cliente(clinica_a, [
+        {'mes': "Janeiro", 'leads_totais': 10, 'faturamento': 1000},
+        {'mes': "Fevereiro", 'leads_totais': 20, 'faturamento': 2000},
+    ], ano=2024)
+    dados_crud.upsert_dados_meses(clinica_b, [{'mes': "Janeiro", 'leads_totais': 5, 'faturamento': 500}], ano=2024)
+    dados_crud.create_dados_dashboard(admin, "Janeiro", ano=2024, leads_totais=1000)
+    assert totais() == {(2024, "Janeiro"): (15, 1500), (2024, "Fevereiro"): (20, 2000)}, totais()
+
+    # Sincronização que altera um mês e remove outro
+    dados_crud.sync_dados_cliente(clinica_a, [{'mes': "Janeiro", 'leads_totais': 12, 'faturamento': 1000}], ano=2024)
+    assert totais() == {(2024, "Janeiro"): (17, 1500)}, totais()
+
+    # Mudança de mês e remoção de um registro
+    dados = dados_crud.create_dados_dashboard(clinica_b, "Março", ano=2023, leads_totais=7)
+    dados_crud.update_dados_dashboard(dados.id, mes="Abril")
+    assert (2023, "Abril") in totais() and (2023, "Março") not in totais()
+    dados_crud.delete_dados_dashboard(dados.id)
+    assert totais() == {(2024, "Janeiro"): (17, 1500)}, totais()
+
+    # Desativar ou reativar a clínica tira e devolve seus meses do resumo
+    cliente_crud.delete_cliente(clinica_b)
+    assert totais() == {(2024, "Janeiro"): (12, 1000)}, totais()
+    cliente_crud.update_cliente(clinica_b, ativo=True)
+    assert totais() == {(2024, "Janeiro"): (17, 1500)}, totais()
+
+    cliente_crud.hard_delete_cliente(clinica_a)
+    assert totais() == {(2024, "Janeiro"): (5, 500)}, totais()
+
+    mantido, recalculado = _resumo_recalculado(manager)
+    assert mantido == recalculado, (mantido, recalculado)
+
+    print("✅ Resumo mensal acompanha as escritas")
+
+def test_escritas_concorrentes():
+    """Testa se clínicas gravando os mesmos meses em paralelo deixam o resumo igual a um recálculo"""
+    print("🔍 Testando escritas concorrentes no resumo mensal...")
+
+    from concurrent.futures import ThreadPoolExecutor
+    from database import ClienteCRUD, DadosDashboardCRUD
+    from models import MES_ORDER
+
+    manager, ids = _create_temp_database()
+    cliente_crud = ClienteCRUD(manager)
+    dados_crud = DadosDashboardCRUD(manager)
+    ids += [
+        cliente_crud.create_cliente(nome=f"Extra {i}", email=f"extra{i}@clinica.com", senha="teste123",
+                                    nome_da_clinica=f"Extra {i}").id
+        for i in range(3)
+    ]
+
+    def sincronizar(cliente_id):
+        for rodada in range(3):
+            assert dados_crud.sync_dados_cliente(cliente_id, [
+                {'mes': mes, 'leads_totais': cliente_id * 10 + rodada, 'faturamento': 100.0 * numero}
+                for mes, numero in MES_ORDER.items()
+            ], ano=2024) is not None
+
+    with ThreadPoolExecutor(max_workers=len(ids)) as executor:
+        list(executor.map(sincronizar, ids))
+
+    mantido, recalculado = _resumo_recalculado(manager)
+    assert len(mantido) == 12 and mantido == recalculado, (mantido, recalculado)
+
+    print("✅ Resumo consistente com escritas concorrentes")
+
+def test_preenchimento_na_inicializacao():
+    """Testa se a inicialização preenche um resumo mensal vazio em um banco que já tem dados"""
+    print("🔍 Testando preenchimento do resumo na inicialização...")
+
+    from sqlalchemy import text
+    from database import DadosDashboardCRUD, AdminDashboardCRUD
+
+    manager, (clinica_a, clinica_b, admin) = _create_temp_database()
+    DadosDashboardCRUD(manager).upsert_dados_meses(clinica_a, [
+        {'mes': "Janeiro", 'leads_totais': 10}, {'mes': "Fevereiro", 'leads_totais': 20}
+    ], ano=2024)
+    esperado = AdminDashboardCRUD(manager).get_monthly_evolution()
+
+    # Banco anterior ao resumo: a tabela existe (create_all) mas está vazia
+    with manager.engine.begin() as conn:
+        conn.execute(text("DELETE FROM resumo_mensal"))
+    assert AdminDashboardCRUD(manager).get_monthly_evolution() == []
+
+    manager.create_tables()
+    assert AdminDashboardCRUD(manager).get_monthly_evolution() == esperado
+
+    print("✅ Resumo preenchido na inicialização")
+
+def test_metricas_do_resumo():
+    """Testa se as métricas do admin lidas do resumo batem com a soma dos dados"""
+    print("🔍 Testando métricas consolidadas lidas do resumo...")
+
+    from sqlalchemy import event
+    from database import DadosDashboardCRUD, AdminDashboardCRUD
+
+    manager, (clinica_a, clinica_b, admin) = _create_temp_database()
+    dados_crud = DadosDashboardCRUD(manager)
+    admin_crud = AdminDashboardCRUD(manager)
+
+    vazio = admin_crud.get_consolidated_metrics()
+    assert vazio.leads_totais == 0 and vazio.clinicas_ativas == 0 and vazio.meses_ativos == 0
+
+    registros = [
+        (clinica_a, 2024, "Outubro", {'leads_totais': 100, 'leads_google_ads': 60, 'fechamentos_totais': 10,
+                                      'faturamento': 50000.0, 'valor_investido_total': 5000.0}),
+        (clinica_a, 2024, "Novembro", {'leads_totais': 50, 'leads_meta_ads': 50, 'fechamentos_totais': 5,
+                                       'faturamento': 10000.0, 'valor_investido_total': 5000.0}),
+        (clinica_b, 2024, "Outubro", {'leads_totais': 30, 'leads_google_ads': 30, 'fechamentos_totais': 0,
+                                      'faturamento': 0.0, 'valor_investido_total': 2000.0}),
+        (admin, 2024, "Outubro", {'leads_totais': 999, 'faturamento': 999999.0}),
+    ]
+    for cliente_id, ano, mes, valores in registros:
+        dados_crud.upsert_dados_dashboard(cliente_id, mes, ano=ano, **valores)
+
+    metricas = admin_crud.get_consolidated_metrics()
+    assert metricas.leads_totais == 180
+    assert metricas.fechamentos_totais == 15
+    assert metricas.faturamento == 60000.0
+    assert metricas.valor_investido_total == 12000.0
+    assert metricas.roas == 5.0
+    assert metricas.ticket_medio == 4000.0
+    assert metricas.clinicas_ativas == 2
+    assert metricas.meses_ativos == 2
+
+    # Filtro de meses aplicado no banco, em uma única consulta
+    statements = []
+
+    @event.listens_for(manager.engine, "before_cursor_execute")
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    novembro = admin_crud.get_consolidated_metrics(["Novembro"])
+    assert len(statements) == 1, statements
+    assert novembro.leads_totais == 50 and novembro.clinicas_ativas == 1 and novembro.meses_ativos == 1
+    assert novembro.roas == 2.0 and novembro.custo_por_lead_total == 100.0
+    event.remove(manager.engine, "before_cursor_execute", registrar)
+
+    assert admin_crud.get_consolidated_metrics([]).meses_ativos == 0
+
+    canais = admin_crud.get_channel_analysis()
+    assert canais['leads_google'] == 90 and canais['leads_meta'] == 50
+
+    evolucao = admin_crud.get_monthly_evolution()
+    assert [(m['mes'], m['total_leads']) for m in evolucao] == [("Outubro", 130), ("Novembro", 50)]
+
+    # Evolução e canais usam o mesmo filtro de meses das métricas
+    assert [m['mes'] for m in admin_crud.get_monthly_evolution(["Novembro"])] == ["Novembro"]
+    canais = admin_crud.get_channel_analysis(["Outubro"])
+    assert canais['leads_google'] == 90 and canais['leads_meta'] == 0
+
+    # Clínicas diferentes ativas em meses diferentes: conta as clínicas distintas do período
+    dados_crud.upsert_dados_dashboard(clinica_b, "Dezembro", ano=2024, leads_totais=10)
+    dados_crud.upsert_dados_dashboard(clinica_a, "Setembro", ano=2024, leads_totais=10)
+    assert admin_crud.get_consolidated_metrics(["Novembro", "Dezembro"]).clinicas_ativas == 2
+    assert admin_crud.get_consolidated_metrics(["Dezembro"]).clinicas_ativas == 1
+    assert admin_crud.get_consolidated_metrics(["Setembro", "Novembro"]).clinicas_ativas == 1
+
+    print("✅ Métricas consolidadas corretas")
+
+def test_comparacao_clinicas():
+    """Testa se os KPIs por clínica são razões entre as somas do período filtrado"""
+    print("🔍 Testando comparação entre clínicas...")
+
+    from database import DadosDashboardCRUD, AdminDashboardCRUD
+
+    manager, (clinica_a, clinica_b, admin) = _create_temp_database()
+    dados_crud = DadosDashboardCRUD(manager)
+    admin_crud = AdminDashboardCRUD(manager)
+
+    # Média das razões mensais da clínica A seria (10 + 1) / 2 = 5.5; a razão das somas é 11000 / 2000
+    dados_crud.upsert_dados_meses(clinica_a, [
+        {'mes': "Outubro", 'leads_totais': 100, 'fechamentos_totais': 4,
+         'faturamento': 10000.0, 'valor_investido_total': 1000.0},
+        {'mes': "Novembro", 'leads_totais': 10, 'fechamentos_totais': 1,
+         'faturamento': 1000.0, 'valor_investido_total': 1000.0},
+    ], ano=2024)
+    dados_crud.upsert_dados_meses(clinica_b, [
+        {'mes': "Outubro", 'leads_totais': 20, 'fechamentos_totais': 0,
+         'faturamento': 0.0, 'valor_investido_total': 0.0},
+    ], ano=2024)
+    dados_crud.upsert_dados_meses(admin, [{'mes': "Outubro", 'leads_totais': 999}], ano=2024)
+
+    clinicas = {c['nome_da_clinica']: c for c in admin_crud.get_clinics_comparison()}
+    assert set(clinicas) == {"Clínica A", "Clínica B"}
+
+    a = clinicas["Clínica A"]
+    assert a['total_leads'] == 110 and a['total_faturamento'] == 11000.0
+    assert a['roas_medio'] == 5.5
+    assert a['custo_por_lead_medio'] == 2000.0 / 110
+    assert a['ticket_medio'] == 2200.0
+
+    # Sem investimento ou fechamentos os KPIs ficam em zero em vez de dividir por zero
+    b = clinicas["Clínica B"]
+    assert b['roas_medio'] == 0 and b['ticket_medio'] == 0 and b['custo_por_lead_medio'] == 0
+
+    clinicas = {c['nome_da_clinica']: c for c in admin_crud.get_clinics_comparison(["Novembro"])}
+    assert set(clinicas) == {"Clínica A"}
+    assert clinicas["Clínica A"]['roas_medio'] == 1.0 and clinicas["Clínica A"]['ticket_medio'] == 1000.0
+
+    print("✅ Comparação entre clínicas correta")
+
+def main():
+    """Executa todos os testes"""
+    print("🚀 TESTE DO RESUMO MENSAL DO ADMIN")
+    print("=" * 50)
+
+    tests = [
+        ("Manutenção do resumo", test_resumo_acompanha_escritas),
+        ("Escritas concorrentes", test_escritas_concorrentes),
+        ("Preenchimento na inicialização", test_preenchimento_na_inicializacao),
+        ("Métricas do resumo", test_metricas_do_resumo),
+        ("Comparação entre clínicas", test_comparacao_clinicas)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}:")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Falhou: {e}")
+
+    print(f"\n🎯 RESULTADO: {passed}/{len(tests)} testes passaram")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Script de teste para verificar a sincronização incremental dos meses de uma clínica.
+"""
+
+from dotenv import load_dotenv
+from banco_de_teste import criar_banco_temporario, criar_clinica
+from sqlalchemy import event
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+def _create_temp_database():
+    """Cria um banco SQLite temporário com uma clínica de teste"""
+    from database import DadosDashboardCRUD
+
+    manager = criar_banco_temporario("test_sync.db")
+    cliente = criar_clinica(manager, "Clínica Sync", email="sync@clinica.com")
+    return manager, cliente.id, DadosDashboardCRUD(manager)
+
+
+def _registro(mes, leads, faturamento):
+    """Monta um registro no formato gerado por process_controle_leads_data"""
+    from database import CAMPOS_SINCRONIZADOS
+
+    registro = {campo: 0 for campo in CAMPOS_SINCRONIZADOS}
+    registro.update({'mes': mes, 'leads_totais': leads, 'faturamento': faturamento})
+    return registro
+
+def test_incremental_sync():
+    """Testa se apenas os meses alterados são gravados"""
+    print("🔍 Testando sincronização incremental...")
+
+    manager, cliente_id, dados_crud = _create_temp_database()
+
+    statements = []
+
+    @event.listens_for(manager.engine, "before_cursor_execute")
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    registros = [_registro("Janeiro", 10, 1000.0), _registro("Fevereiro", 20, 2000.0)]
+
+    resultado = dados_crud.sync_dados_cliente(cliente_id, registros)
+    assert resultado['inseridos'] == 2, resultado
+    assert len(dados_crud.get_dados_by_cliente(cliente_id)) == 2
+
+    # Sincronização sem mudanças: uma leitura e nenhuma escrita
+    statements.clear()
+    resultado = dados_crud.sync_dados_cliente(cliente_id, registros)
+    assert resultado == {'inseridos': 0, 'atualizados': 0, 'removidos': 0, 'inalterados': 2}, resultado
+    assert statements == ['SELECT'], statements
+
+    # Altera um mês, remove outro e adiciona um novo
+    registros = [_registro("Janeiro", 15, 1000.0), _registro("Março", 30, 3000.0)]
+    resultado = dados_crud.sync_dados_cliente(cliente_id, registros)
+    assert resultado == {'inseridos': 1, 'atualizados': 1, 'removidos': 1, 'inalterados': 0}, resultado
+
+    dados = {d.mes: d for d in dados_crud.get_dados_by_cliente(cliente_id)}
+    assert set(dados) == {"Janeiro", "Março"}
+    assert dados["Janeiro"].leads_totais == 15
+    assert dados["Março"].faturamento == 3000.0
+
+    print("✅ Sincronização incremental funcionando")
+
+def test_upsert_dados_dashboard():
+    """Testa a gravação idempotente dos meses com ON CONFLICT DO UPDATE"""
+    print("🔍 Testando upsert dos meses...")
+
+    manager, cliente_id, dados_crud = _create_temp_database()
+
+    statements = []
+
+    @event.listens_for(manager.engine, "before_cursor_execute")
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()[:3]).upper())
+
+    registros = [_registro("Janeiro", 10, 1000.0), _registro("Fevereiro", 20, 2000.0)]
+    assert dados_crud.upsert_dados_meses(cliente_id, registros) == 2
+
+    # Gravar de novo atualiza os mesmos meses em um único comando
+    statements.clear()
+    registros[0]['leads_totais'] = 12
+    assert dados_crud.upsert_dados_meses(cliente_id, registros) == 2
+    assert statements.count('INSERT INTO DADOS_DASHBOARD') == 1, statements
+
+    assert dados_crud.upsert_dados_dashboard(cliente_id, "Fevereiro", faturamento=2500.0)
+    assert dados_crud.upsert_dados_dashboard(cliente_id, "Fevereiro", ano=2025, leads_totais=5)
+
+    dados = dados_crud.get_dados_by_cliente(cliente_id)
+    assert len(dados) == 3, "Meses existentes não deveriam ser duplicados"
+    por_mes = {(d.ano, d.mes): d for d in dados}
+    assert por_mes[(2024, "Janeiro")].leads_totais == 12
+    assert por_mes[(2024, "Fevereiro")].faturamento == 2500.0
+    assert por_mes[(2024, "Fevereiro")].leads_totais == 20, "Campos não informados deveriam ser mantidos"
+    assert por_mes[(2025, "Fevereiro")].leads_totais == 5
+
+    # O índice único impede inserir um mês repetido
+    assert dados_crud.create_dados_dashboard(cliente_id, "Janeiro") is None
+
+    print("✅ Upsert dos meses funcionando")
+
+def test_upsert_sem_on_conflict():
+    """Testa a gravação dos meses em bancos sem ON CONFLICT (busca e UPDATE/INSERT em lote)"""
+    print("🔍 Testando upsert sem ON CONFLICT...")
+
+    import database
+
+    manager, cliente_id, dados_crud = _create_temp_database()
+    dialetos = database.INSERT_ON_CONFLICT
+    database.INSERT_ON_CONFLICT = {}
+    try:
+        registros = [_registro("Janeiro", 10, 1000.0), _registro("Fevereiro", 20, 2000.0)]
+        assert dados_crud.upsert_dados_meses(cliente_id, registros) == 2
+
+        registros[0]['leads_totais'] = 12
+        assert dados_crud.upsert_dados_meses(cliente_id, registros + [_registro("Março", 30, 3000.0)]) == 3
+        assert dados_crud.upsert_dados_dashboard(cliente_id, "Fevereiro", faturamento=2500.0)
+    finally:
+        database.INSERT_ON_CONFLICT = dialetos
+
+    por_mes = {d.mes: d for d in dados_crud.get_dados_by_cliente(cliente_id)}
+    assert list(por_mes) == ["Janeiro", "Fevereiro", "Março"], "Meses existentes não deveriam ser duplicados"
+    assert por_mes["Janeiro"].leads_totais == 12
+    assert por_mes["Fevereiro"].faturamento == 2500.0 and por_mes["Fevereiro"].leads_totais == 20
+
+    print("✅ Upsert sem ON CONFLICT funcionando")
+
+def test_gravar_meses_clinica():
+    """Testa se o importador grava os meses e remove os que saíram da planilha em uma única transação"""
+    print("🔍 Testando gravação dos meses pelo importador...")
+
+    import re
+    import pandas as pd
+    import import_multiple_sheets
+
+    manager, cliente_id, dados_crud = _create_temp_database()
+    dados_crud.create_dados_dashboard(cliente_id, "Março", ano=2023, leads_totais=7)
+
+    original = import_multiple_sheets.dados_crud
+    import_multiple_sheets.dados_crud = dados_crud
+    try:
+        meses = pd.DataFrame([_registro(mes, 10, 1000.0) for mes in ("Janeiro", "Fevereiro", "Março")])
+        assert import_multiple_sheets.gravar_meses_clinica(cliente_id, meses, ano=2024) == 3
+
+        statements, commits = [], []
+
+        @event.listens_for(manager.engine, "before_cursor_execute")
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            escrita = re.match(r"(INSERT INTO|DELETE FROM|UPDATE) (\w+)", statement)
+            if escrita and escrita.group(2) == "dados_dashboard":
+                statements.append(escrita.group(1).split()[0])
+
+        @event.listens_for(manager.engine, "commit")
+        def registrar_commit(conn):
+            commits.append(conn)
+
+        # Janeiro mudou e Março saiu da planilha de 2024: gravados juntos, sem tocar em 2023
+        atualizados = meses.iloc[:2].copy()
+        atualizados.loc[0, 'leads_totais'] = 15
+        assert import_multiple_sheets.gravar_meses_clinica(cliente_id, atualizados, ano=2024) == 2
+        event.remove(manager.engine, "before_cursor_execute", registrar)
+        event.remove(manager.engine, "commit", registrar_commit)
+    finally:
+        import_multiple_sheets.dados_crud = original
+
+    assert statements == ["DELETE", "UPDATE"], statements
+    assert len(commits) == 1, "Gravação e remoção deveriam estar na mesma transação"
+    assert [(d.mes, d.ano, d.leads_totais) for d in dados_crud.get_dados_by_cliente(cliente_id)] == [
+        ("Março", 2023, 7), ("Janeiro", 2024, 15), ("Fevereiro", 2024, 10)
+    ]
+
+    print("✅ Gravação dos meses em uma única transação")
+
+def main():
+    """Executa todos os testes"""
+    print("🚀 TESTE DA SINCRONIZAÇÃO INCREMENTAL")
+    print("=" * 50)
+
+    try:
+        test_incremental_sync()
+        test_upsert_dados_dashboard()
+        test_upsert_sem_on_conflict()
+        test_gravar_meses_clinica()
+        print("\n🎉 Testes passaram!")
+    except AssertionError as e:
+        print(f"\n❌ Teste falhou: {e}")
+
+if __name__ == "__main__":
+    main()
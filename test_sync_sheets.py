@@ -0,0 +1,440 @@
+"""
+Script de teste para verificar a sincronização com o Google Sheets usando uma planilha falsa.
+Roda sem acesso à rede nem credenciais.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+from dotenv import load_dotenv
+from banco_de_teste import criar_banco_temporario
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+SHEET_ID = "1hJDvihxFPWnqjGlp-QFOB6vjExlskBHPNbA3j7SxgPA"
+
+class FakeWorksheet:
+    """Aba falsa que conta quantas vezes seus valores foram lidos"""
+
+    def __init__(self, title, values):
+        self.title = title
+        self.values = values
+        self.reads = 0
+
+    def get_all_values(self):
+        self.reads += 1
+        return [list(row) for row in self.values]
+
+class FakeSpreadsheet:
+    """Planilha falsa com uma lista de abas"""
+
+    def __init__(self, worksheets):
+        self._worksheets = worksheets
+
+    def worksheets(self):
+        return list(self._worksheets)
+
+    def worksheet(self, title):
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise KeyError(title)
+
+class FakeSheetsClient:
+    """Cliente gspread falso que serve planilhas por ID e conta quantas vezes cada uma foi aberta"""
+
+    def __init__(self, spreadsheets):
+        self.spreadsheets = spreadsheets
+        self.opens = {}
+
+    def open_by_key(self, sheet_id):
+        self.opens[sheet_id] = self.opens.get(sheet_id, 0) + 1
+        return self.spreadsheets[sheet_id]
+
+def controle_de_leads(leads_janeiro=10):
+    """Valores de uma aba 'Controle de Leads' mínima"""
+    return [
+        ['Meses', 'Janeiro', 'Fevereiro'],
+        ['Leads Totais', str(leads_janeiro), '20'],
+        ['Faturamento', 'R$ 1.000,00', 'R$ 2.500,50'],
+    ]
+
+def _use_temp_database():
+    """Aponta os CRUDs usados pela sincronização e pela importação de procedimentos para um banco temporário"""
+    import sync_sheets
+    import import_procedimentos
+    from database import ClienteCRUD, DadosDashboardCRUD, ProcedimentoCRUD, SincronizacaoCRUD
+
+    manager = criar_banco_temporario("test_sync_sheets.db")
+
+    originais = (
+        sync_sheets.cliente_crud, sync_sheets.dados_crud, sync_sheets.sincronizacao_crud,
+        import_procedimentos.procedimento_crud, import_procedimentos.sincronizacao_crud
+    )
+    sync_sheets.cliente_crud = ClienteCRUD(manager)
+    sync_sheets.dados_crud = DadosDashboardCRUD(manager)
+    sync_sheets.sincronizacao_crud = import_procedimentos.sincronizacao_crud = SincronizacaoCRUD(manager)
+    import_procedimentos.procedimento_crud = ProcedimentoCRUD(manager)
+    return originais
+
+def _restore_database(originais):
+    import sync_sheets
+    import import_procedimentos
+    (sync_sheets.cliente_crud, sync_sheets.dados_crud, sync_sheets.sincronizacao_crud,
+     import_procedimentos.procedimento_crud, import_procedimentos.sincronizacao_crud) = originais
+
+def _create_clinica(nome, sheet_id=SHEET_ID):
+    """Cria uma clínica de teste apontando para a planilha informada"""
+    import sync_sheets
+
+    email = nome.lower().replace(" ", "") + "@clinica.com"
+    return sync_sheets.cliente_crud.create_cliente(
+        nome=nome,
+        email=email,
+        senha="teste123",
+        nome_da_clinica=nome,
+        link_empresa=f"https://docs.google.com/spreadsheets/d/{sheet_id}/edit"
+    )
+
+def _rate_limit_error():
+    """Erro 429 no formato retornado pelo gspread"""
+    from gspread.exceptions import APIError
+
+    response = SimpleNamespace(status_code=429, text="Quota exceeded")
+    return APIError(response)
+
+def test_unchanged_sheet_is_skipped():
+    """Testa se uma planilha sem mudanças é lida uma vez e não é reimportada"""
+    print("🔍 Testando hash persistido das abas...")
+
+    import sync_sheets
+
+    originais = _use_temp_database()
+    try:
+        cliente = _create_clinica("Clínica Planilha")
+        aba = FakeWorksheet("Controle de Leads", controle_de_leads())
+        gc = FakeSheetsClient({SHEET_ID: FakeSpreadsheet([aba, FakeWorksheet("Procedimentos", [])])})
+
+        assert sync_sheets.sync_clinic_data(cliente, gc=gc)
+        assert aba.reads == 1, "A aba deveria ser lida uma única vez"
+        dados = {d.mes: d for d in sync_sheets.dados_crud.get_dados_by_cliente(cliente.id)}
+        assert dados["Fevereiro"].faturamento == 2500.50
+        assert sync_sheets.sincronizacao_crud.get_hash(cliente.id, "Controle de Leads")
+
+        # Sem mudanças: nenhuma escrita
+        data_atualizacao = dados["Janeiro"].data_atualizacao
+        assert sync_sheets.sync_clinic_data(cliente, gc=gc)
+        assert aba.reads == 2
+        dados = {d.mes: d for d in sync_sheets.dados_crud.get_dados_by_cliente(cliente.id)}
+        assert dados["Janeiro"].data_atualizacao == data_atualizacao
+
+        # Com mudanças: reimporta apenas o mês alterado
+        aba.values = controle_de_leads(leads_janeiro=15)
+        assert sync_sheets.sync_clinic_data(cliente, gc=gc)
+        dados = {d.mes: d for d in sync_sheets.dados_crud.get_dados_by_cliente(cliente.id)}
+        assert dados["Janeiro"].leads_totais == 15
+    finally:
+        _restore_database(originais)
+
+    print("✅ Planilhas sem mudanças são puladas")
+
+def test_backoff_on_rate_limit():
+    """Testa se erros 429 são repetidos com espera e outros erros não"""
+    print("🔍 Testando nova tentativa após limite de requisições...")
+
+    import sync_sheets
+    from gspread.exceptions import APIError
+
+    chamadas = []
+
+    def chamada_limitada():
+        chamadas.append(1)
+        if len(chamadas) < 3:
+            raise _rate_limit_error()
+        return "ok"
+
+    delay_original = sync_sheets.RATE_LIMIT_BASE_DELAY
+    sync_sheets.RATE_LIMIT_BASE_DELAY = 0
+    try:
+        assert sync_sheets.call_with_backoff(chamada_limitada) == "ok"
+        assert len(chamadas) == 3
+
+        def chamada_invalida():
+            chamadas.append(1)
+            raise APIError(SimpleNamespace(status_code=404, text="Not found"))
+
+        chamadas.clear()
+        try:
+            sync_sheets.call_with_backoff(chamada_invalida)
+            assert False, "Erro 404 deveria ser propagado"
+        except APIError:
+            pass
+        assert len(chamadas) == 1, "Erro 404 não deveria ser repetido"
+    finally:
+        sync_sheets.RATE_LIMIT_BASE_DELAY = delay_original
+
+    print("✅ Limite de requisições tratado com nova tentativa")
+
+def test_parallel_sync_all_clinics():
+    """Testa a sincronização paralela com cliente compartilhado e resumo por clínica"""
+    print("🔍 Testando sincronização paralela das clínicas...")
+
+    import sync_sheets
+
+    ativas = []
+    pico = []
+    lock = threading.Lock()
+
+    class SlowWorksheet(FakeWorksheet):
+        """Aba que simula latência de rede e registra o paralelismo"""
+
+        def __init__(self, title, values, rate_limited=False):
+            super().__init__(title, values)
+            self.rate_limited = rate_limited
+
+        def get_all_values(self):
+            if self.rate_limited:
+                self.rate_limited = False
+                raise _rate_limit_error()
+            with lock:
+                ativas.append(1)
+                pico.append(len(ativas))
+            time.sleep(0.05)
+            with lock:
+                ativas.pop()
+            return super().get_all_values()
+
+    originais = _use_temp_database()
+    delay_original = sync_sheets.RATE_LIMIT_BASE_DELAY
+    sync_sheets.RATE_LIMIT_BASE_DELAY = 0
+    try:
+        planilhas = {}
+        for i in range(4):
+            sheet_id = f"{SHEET_ID[:-1]}{i}"
+            _create_clinica(f"Clínica {i}", sheet_id)
+            aba = SlowWorksheet("Controle de Leads", controle_de_leads(10 + i), rate_limited=(i == 0))
+            planilhas[sheet_id] = FakeSpreadsheet([aba])
+        _create_clinica("Clínica Sem Planilha", "planilha-inexistente-000000000000000000000000")
+
+        gc = FakeSheetsClient(planilhas)
+        assert sync_sheets.sync_all_clinics(max_workers=3, gc=gc)
+        assert 1 < max(pico) <= 3, f"Paralelismo fora do limite: {max(pico)}"
+
+        for cliente in sync_sheets.cliente_crud.get_all_clientes():
+            dados = sync_sheets.dados_crud.get_dados_by_cliente(cliente.id)
+            if cliente.nome_da_clinica == "Clínica Sem Planilha":
+                assert not dados
+            else:
+                indice = int(cliente.nome_da_clinica.split()[-1])
+                assert {d.mes: d.leads_totais for d in dados}["Janeiro"] == 10 + indice
+
+        resultados = sync_sheets.run_clinics_in_pool(
+            sync_sheets.cliente_crud.get_all_clientes(),
+            lambda cliente: sync_sheets.sync_clinic_data(cliente, gc=gc),
+            max_workers=2
+        )
+        resumo = {r['clinica']: r for r in resultados}
+        assert not resumo["Clínica Sem Planilha"]['sucesso']
+        assert all(r['sucesso'] for nome, r in resumo.items() if nome != "Clínica Sem Planilha")
+    finally:
+        sync_sheets.RATE_LIMIT_BASE_DELAY = delay_original
+        _restore_database(originais)
+
+    print("✅ Sincronização paralela funcionando")
+
+def test_background_sync_service():
+    """Testa a sincronização em segundo plano usada pelo botão do app"""
+    print("🔍 Testando serviço de sincronização em segundo plano...")
+
+    import sync_service
+    import sync_sheets
+
+    originais = _use_temp_database()
+    cliente_crud_original = sync_service.cliente_crud
+    sync_service.cliente_crud = sync_sheets.cliente_crud
+    try:
+        liberar = threading.Event()
+
+        class BlockingWorksheet(FakeWorksheet):
+            """Aba que só responde depois que o teste libera"""
+
+            def get_all_values(self):
+                liberar.wait(5)
+                return super().get_all_values()
+
+        cliente = _create_clinica("Clínica Serviço")
+        aba = BlockingWorksheet("Controle de Leads", controle_de_leads())
+        gc = FakeSheetsClient({SHEET_ID: FakeSpreadsheet([aba])})
+
+        job = sync_service.start_sync(gc=gc)
+        assert job.em_execucao, "A sincronização não deveria bloquear quem a iniciou"
+        assert sync_service.start_sync(gc=gc) is job, "Não deveria iniciar uma segunda sincronização"
+
+        liberar.set()
+        job.join(5)
+
+        estado = job.snapshot()
+        assert estado['status'] == 'concluido', estado
+        assert estado['progresso'] == 1.0
+        leads = estado['resultados']['leads']
+        assert len(leads) == 1 and leads[0]['sucesso']
+        assert leads[0]['cliente_id'] == cliente.id
+        assert leads[0]['meses_atualizados'] == 2
+        assert len(sync_sheets.dados_crud.get_dados_by_cliente(cliente.id)) == 2
+    finally:
+        sync_service.cliente_crud = cliente_crud_original
+        _restore_database(originais)
+
+    print("✅ Serviço de sincronização funcionando")
+
+def procedimentos(valor="R$ 1.000,00"):
+    """Valores de uma aba 'Procedimentos' mínima"""
+    return [
+        ['Outubro'],
+        ['Data 1° Contato', 'Procedimento', 'Tipo', 'Quantidade na Mesma Venda', 'Valor da Venda'],
+        ['15/10/2024', 'Rinoplastia', 'Cirúrgico', '1', valor],
+    ]
+
+def test_procedimentos_open_once_and_skip_unchanged():
+    """Testa se a sincronização abre a planilha uma vez por clínica e pula a aba 'Procedimentos' sem mudanças"""
+    print("🔍 Testando abertura única da planilha e hash da aba 'Procedimentos'...")
+
+    import sync_service
+    import sync_sheets
+    import import_procedimentos
+
+    originais = _use_temp_database()
+    cliente_crud_original = sync_service.cliente_crud
+    sync_service.cliente_crud = sync_sheets.cliente_crud
+    try:
+        cliente = _create_clinica("Clínica Procedimentos")
+        aba = FakeWorksheet("Procedimentos", procedimentos())
+        gc = FakeSheetsClient({SHEET_ID: FakeSpreadsheet([FakeWorksheet("Controle de Leads", controle_de_leads()), aba])})
+
+        job = sync_service.start_sync(gc=gc)
+        job.join(5)
+        estado = job.snapshot()
+        assert estado['status'] == 'concluido', estado
+        assert gc.opens == {SHEET_ID: 1}, "As duas etapas deveriam reaproveitar a planilha aberta"
+        assert estado['resultados']['procedimentos'][0]['procedimentos_importados'] == 1
+        assert aba.reads == 1
+
+        # Aba sem mudanças: lida, mas sem escritas
+        procedimento = import_procedimentos.procedimento_crud.get_procedimentos_by_cliente(cliente.id)[0]
+        resultado = import_procedimentos.load_procedimentos_for_cliente(cliente, gc=gc)
+        assert resultado == {'procedimentos_importados': 0, 'sem_alteracoes': True}, resultado
+        assert gc.opens == {SHEET_ID: 2} and aba.reads == 2
+        assert import_procedimentos.procedimento_crud.get_procedimentos_by_cliente(cliente.id)[0].id == procedimento.id
+
+        # Aba alterada: reimporta os procedimentos do mês
+        aba.values = procedimentos("R$ 2.000,00")
+        resultado = import_procedimentos.load_procedimentos_for_cliente(cliente, gc=gc)
+        assert resultado == {'procedimentos_importados': 1, 'sem_alteracoes': False}, resultado
+        valores = [p.valor_da_venda for p in import_procedimentos.procedimento_crud.get_procedimentos_by_cliente(cliente.id)]
+        assert valores == [2000.0]
+    finally:
+        sync_service.cliente_crud = cliente_crud_original
+        _restore_database(originais)
+
+    print("✅ Planilha aberta uma vez e aba 'Procedimentos' sem mudanças pulada")
+
+def test_targeted_sync_and_scheduler():
+    """Testa a sincronização de uma clínica, o agrupamento de cliques e o agendador"""
+    print("🔍 Testando sincronização por clínica e agendador...")
+
+    import sync_service
+    import sync_sheets
+
+    originais = _use_temp_database()
+    crud_originais = (sync_service.cliente_crud, sync_service.sincronizacao_crud)
+    sync_service.cliente_crud, sync_service.sincronizacao_crud = sync_sheets.cliente_crud, sync_sheets.sincronizacao_crud
+    try:
+        liberar = threading.Event()
+
+        class BlockingWorksheet(FakeWorksheet):
+            """Aba que só responde depois que o teste libera"""
+
+            def get_all_values(self):
+                liberar.wait(5)
+                return super().get_all_values()
+
+        abas = {}
+        planilhas = {}
+        clinicas = []
+        for i in range(3):
+            sheet_id = f"{SHEET_ID[:-1]}{i}"
+            clinicas.append(_create_clinica(f"Clínica Agenda {i}", sheet_id))
+            abas[i] = BlockingWorksheet("Controle de Leads", controle_de_leads(10 + i))
+            planilhas[sheet_id] = FakeSpreadsheet([abas[i]])
+        gc = FakeSheetsClient(planilhas)
+
+        # Cliques simultâneos na mesma clínica viram uma única sincronização
+        job = sync_service.sync_clinic(clinicas[0].id, gc=gc)
+        assert sync_service.sync_clinic(clinicas[0].id, gc=gc) is job
+        liberar.set()
+        job.join(5)
+
+        assert [r['cliente_id'] for r in job.snapshot()['resultados']['leads']] == [clinicas[0].id]
+        assert abas[0].reads == 1
+        assert abas[1].reads == 0 and abas[2].reads == 0, "Só a clínica visualizada deveria ser lida"
+
+        # O agendador pula clínicas sincronizadas dentro do intervalo mínimo
+        scheduler = sync_service.SyncScheduler(interval_minutes=60, min_interval_minutes=30, jitter_seconds=0, gc=gc)
+        pendentes = scheduler.clinicas_pendentes()
+        assert clinicas[0].id not in pendentes
+        assert {clinicas[1].id, clinicas[2].id} <= set(pendentes)
+
+        job = scheduler.run_once()
+        assert job.snapshot()['status'] == 'concluido'
+        assert abas[0].reads == 1 and abas[1].reads == 1 and abas[2].reads == 1
+        assert scheduler.run_once() is None, "Nenhuma clínica deveria estar pendente"
+
+        # Após um reinício do processo, o intervalo mínimo vem do estado persistido no banco
+        with sync_service._ultima_sincronizacao_lock:
+            for cliente in clinicas:
+                sync_service._ultima_sincronizacao.pop(cliente.id, None)
+        scheduler = sync_service.SyncScheduler(interval_minutes=60, min_interval_minutes=30, jitter_seconds=0, gc=gc)
+        assert not set(scheduler.clinicas_pendentes()) & {c.id for c in clinicas}
+        assert 0 <= sync_service.segundos_desde_ultima_sincronizacao(clinicas[0].id) < 60
+
+        # Clínicas inativas não são sincronizadas, mesmo quando pedidas pelo ID
+        assert sync_sheets.cliente_crud.update_cliente(clinicas[1].id, ativo=False)
+        job = sync_service.sync_clinic(clinicas[1].id, gc=gc, force=True)
+        job.join(5)
+        estado = job.snapshot()
+        assert estado['total'] == 0 and estado['resultados'] == {'leads': [], 'procedimentos': []}, estado
+        assert abas[1].reads == 1
+    finally:
+        sync_service.cliente_crud, sync_service.sincronizacao_crud = crud_originais
+        _restore_database(originais)
+
+    print("✅ Sincronização por clínica e agendador funcionando")
+
+def main():
+    """Executa todos os testes"""
+    print("🚀 TESTE DA SINCRONIZAÇÃO COM PLANILHA FALSA")
+    print("=" * 50)
+
+    tests = [
+        ("Hash persistido", test_unchanged_sheet_is_skipped),
+        ("Limite de requisições", test_backoff_on_rate_limit),
+        ("Sincronização paralela", test_parallel_sync_all_clinics),
+        ("Serviço em segundo plano", test_background_sync_service),
+        ("Procedimentos sem mudanças", test_procedimentos_open_once_and_skip_unchanged),
+        ("Sincronização por clínica", test_targeted_sync_and_scheduler),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}:")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Falhou: {e}")
+
+    print(f"\n🎯 RESULTADO: {passed}/{len(tests)} testes passaram")
+
+if __name__ == "__main__":
+    main()
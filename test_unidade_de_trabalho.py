@@ -0,0 +1,224 @@
+"""
+Script de teste para verificar a unidade de trabalho (uma sessão por renderização ou sincronização)
+e a contagem de consultas por renderização.
+"""
+
+from dotenv import load_dotenv
+from banco_de_teste import criar_banco_temporario, criar_clinica
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Consultas esperadas para carregar os dados da página de uma clínica (ver _renderizar_clinica).
+# Se o número subir, alguma mudança adicionou consultas à renderização.
+CONSULTAS_RENDERIZACAO_CLINICA = 4
+
+def _create_temp_database():
+    """Cria um banco SQLite temporário com uma clínica de teste com dados e procedimentos"""
+    from database import DadosDashboardCRUD, ProcedimentoCRUD
+
+    manager = criar_banco_temporario("test_unidade_de_trabalho.db")
+    cliente = criar_clinica(manager, "Clínica Unidade", email="unidade@clinica.com")
+    DadosDashboardCRUD(manager).upsert_dados_meses(cliente.id, [
+        {'mes': mes, 'leads_totais': 10, 'faturamento': 1000.0} for mes in ("Janeiro", "Fevereiro", "Março")
+    ], ano=2024)
+    ProcedimentoCRUD(manager).bulk_create(cliente.id, [
+        {'procedimento': "Botox", 'mes_referencia': "Fevereiro", 'ano_referencia': 2024, 'valor_da_venda': 500.0}
+    ])
+    return manager, cliente.id
+
+
+def _renderizar_clinica(manager, cliente_id):
+    """Consultas feitas pela página da clínica (app.main_dashboard) sem cache: cabeçalho, filtros e dados"""
+    from database import ClienteCRUD, DadosDashboardCRUD, ProcedimentoCRUD
+
+    contexto = ClienteCRUD(manager).get_contexto_clinica(cliente_id)
+    dados_crud = DadosDashboardCRUD(manager)
+    periodos = dados_crud.get_periodos_ativos(cliente_id)
+    inicio, fim = periodos[0][:2], periodos[-1][:2]
+    df = dados_crud.get_dataframe_by_cliente(cliente_id, inicio=inicio, fim=fim)
+    procedimentos = ProcedimentoCRUD(manager).get_procedimentos_by_range(cliente_id, inicio, fim)
+    return contexto, df, procedimentos
+
+def test_sessao_compartilhada():
+    """Testa se as operações do bloco usam uma única sessão e uma única conexão"""
+    print("🔍 Testando sessão compartilhada...")
+
+    from database import ClienteCRUD, DadosDashboardCRUD
+
+    manager, cliente_id = _create_temp_database()
+    cliente_crud = ClienteCRUD(manager)
+    dados_crud = DadosDashboardCRUD(manager)
+
+    checkouts = manager.get_pool_metrics()['checkouts']
+    with manager.unidade_de_trabalho() as unidade:
+        cliente = cliente_crud.get_cliente_by_id(cliente_id)
+        dados = dados_crud.get_dados_by_cliente(cliente_id)
+        assert manager.get_session() is unidade.session
+
+        # Blocos aninhados reaproveitam a unidade externa
+        with manager.unidade_de_trabalho() as interna:
+            assert interna is unidade
+            dados_crud.get_periodos_ativos(cliente_id)
+
+        # A sessão também pode ser passada explicitamente
+        assert cliente_crud.get_cliente_by_id(cliente_id, session=unidade.session).id == cliente_id
+
+    assert manager.get_pool_metrics()['checkouts'] == checkouts + 1, "O bloco deveria usar uma única conexão"
+    assert unidade.statements == 4, unidade.statements
+    assert manager.get_session() is not unidade.session
+
+    # Objetos retornados continuam legíveis depois do bloco, como antes
+    assert cliente.nome_da_clinica == "Clínica Unidade"
+    assert [d.mes for d in dados] == ["Janeiro", "Fevereiro", "Março"]
+
+    print("✅ Sessão compartilhada funcionando")
+
+def test_escritas_na_unidade():
+    """Testa se as escritas são confirmadas dentro do bloco e se um erro não invalida a unidade"""
+    print("🔍 Testando escritas na unidade de trabalho...")
+
+    from database import ClienteCRUD, DadosDashboardCRUD
+
+    manager, cliente_id = _create_temp_database()
+    cliente_crud = ClienteCRUD(manager)
+    dados_crud = DadosDashboardCRUD(manager)
+
+    with manager.unidade_de_trabalho():
+        assert cliente_crud.update_cliente(cliente_id, telefone="11999999999")
+        dados = dados_crud.create_dados_dashboard(cliente_id, "Abril", ano=2024, leads_totais=5)
+        assert dados is not None and dados.mes_numero == 4
+
+        # Mês duplicado viola o índice único: o método desfaz apenas a própria transação
+        assert dados_crud.create_dados_dashboard(cliente_id, "Abril", ano=2024) is None
+        assert dados_crud.update_dados_dashboard(dados.id, leads_totais=7)
+        assert cliente_crud.get_cliente_by_id(cliente_id).telefone == "11999999999"
+
+    # Visível em sessões novas, fora do bloco
+    assert cliente_crud.get_cliente_by_id(cliente_id).telefone == "11999999999"
+    assert {d.mes: d.leads_totais for d in dados_crud.get_dados_by_cliente(cliente_id)}["Abril"] == 7
+
+    print("✅ Escritas confirmadas na unidade de trabalho")
+
+def _simular_transacao_abortada(manager):
+    """
+    Reproduz no SQLite o comportamento do PostgreSQL: depois de um erro, a transação recusa
+    qualquer consulta (InFailedSqlTransaction) até o rollback. A primeira leitura de
+    dados_dashboard falha; as demais passam a falhar só se a transação não for desfeita.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.exc import OperationalError
+
+    estado = {'falhar': True}
+
+    @event.listens_for(manager.engine, 'before_cursor_execute')
+    def recusar(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get('transacao_abortada'):
+            raise OperationalError(statement, parameters, Exception("current transaction is aborted"))
+        if estado['falhar'] and 'FROM dados_dashboard' in statement:
+            estado['falhar'] = False
+            conn.info['transacao_abortada'] = True
+            raise OperationalError(statement, parameters, Exception("falha simulada"))
+
+    @event.listens_for(manager.engine, 'rollback')
+    def desfazer(conn):
+        conn.info.pop('transacao_abortada', None)
+
+def test_leitura_apos_erro():
+    """Testa se uma leitura que falha desfaz a transação da sessão compartilhada e não derruba as seguintes"""
+    print("🔍 Testando leitura após erro na unidade de trabalho...")
+
+    from database import ClienteCRUD, DadosDashboardCRUD
+
+    manager, cliente_id = _create_temp_database()
+    _simular_transacao_abortada(manager)
+    dados_crud = DadosDashboardCRUD(manager)
+
+    with manager.unidade_de_trabalho() as unidade:
+        assert ClienteCRUD(manager).get_cliente_by_id(cliente_id) is not None
+        assert dados_crud.get_dados_by_cliente(cliente_id) == [], "A leitura com erro deveria retornar vazio"
+        assert not unidade.session.in_transaction(), "A transação com erro deveria ter sido desfeita"
+
+        # As leituras seguintes da mesma renderização continuam funcionando
+        assert ClienteCRUD(manager).get_cliente_by_id(cliente_id).nome_da_clinica == "Clínica Unidade"
+        assert [d.mes for d in dados_crud.get_dados_by_cliente(cliente_id)] == ["Janeiro", "Fevereiro", "Março"]
+
+    print("✅ Leituras seguintes funcionando após o erro")
+
+def test_consultas_por_renderizacao():
+    """Testa o número de consultas feitas ao carregar a página de uma clínica"""
+    print("🔍 Testando consultas por renderização...")
+
+    manager, cliente_id = _create_temp_database()
+
+    checkouts = manager.get_pool_metrics()['checkouts']
+    with manager.unidade_de_trabalho() as unidade:
+        contexto, df, procedimentos = _renderizar_clinica(manager, cliente_id)
+
+    assert len(df) == 3 and len(procedimentos) == 1 and contexto.nome_da_clinica == "Clínica Unidade"
+    assert unidade.statements == CONSULTAS_RENDERIZACAO_CLINICA, (
+        f"Renderização fez {unidade.statements} consultas (esperado: {CONSULTAS_RENDERIZACAO_CLINICA})"
+    )
+    assert manager.get_pool_metrics()['checkouts'] == checkouts + 1
+
+    print(f"✅ {unidade.statements} consultas por renderização")
+
+def test_contexto_clinica():
+    """Testa o contexto da clínica (nome e última atualização) e seu cache até a próxima escrita"""
+    print("🔍 Testando contexto da clínica...")
+
+    from cache import clinic_cache
+    from database import ClienteCRUD, DadosDashboardCRUD
+
+    manager, cliente_id = _create_temp_database()
+    cliente_crud = ClienteCRUD(manager)
+
+    contexto = cliente_crud.get_contexto_clinica(cliente_id)
+    dados = DadosDashboardCRUD(manager).get_dados_by_cliente(cliente_id)
+    assert contexto.cliente_id == cliente_id and contexto.nome_da_clinica == "Clínica Unidade"
+    assert contexto.ultima_atualizacao == max(d.data_atualizacao or d.data_criacao for d in dados)
+    assert cliente_crud.get_contexto_clinica(cliente_id + 1000) is None
+
+    # Sem dados, a clínica não tem data de atualização
+    vazia = cliente_crud.create_cliente(nome="Vazia", email="vazia@clinica.com", senha="teste123", nome_da_clinica="Vazia")
+    assert cliente_crud.get_contexto_clinica(vazia.id).ultima_atualizacao is None
+
+    # Em cache, renderizações seguintes não consultam o banco; editar a clínica invalida o contexto
+    clinic_cache.invalidate(cliente_id)  # O cache é global e os IDs se repetem entre bancos de teste
+    carregar = lambda: clinic_cache.get_or_load(cliente_id, 'contexto', lambda: cliente_crud.get_contexto_clinica(cliente_id))
+    assert carregar() is carregar()
+    with manager.unidade_de_trabalho() as unidade:
+        carregar()
+    assert unidade.statements == 0
+
+    assert cliente_crud.update_cliente(cliente_id, nome_da_clinica="Clínica Renomeada")
+    assert carregar().nome_da_clinica == "Clínica Renomeada"
+
+    print("✅ Contexto da clínica funcionando")
+
+def main():
+    """Executa todos os testes"""
+    print("🚀 TESTE DA UNIDADE DE TRABALHO")
+    print("=" * 50)
+
+    tests = [
+        ("Sessão compartilhada", test_sessao_compartilhada),
+        ("Escritas na unidade", test_escritas_na_unidade),
+        ("Leitura após erro", test_leitura_apos_erro),
+        ("Consultas por renderização", test_consultas_por_renderizacao),
+        ("Contexto da clínica", test_contexto_clinica)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}:")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Falhou: {e}")
+
+    print(f"\n🎯 RESULTADO: {passed}/{len(tests)} testes passaram")
+
+if __name__ == "__main__":
+    main()
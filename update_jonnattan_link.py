@@ -42,20 +42,13 @@ def update_jonnattan_link():
     """
     novo_link = "https://docs.google.com/spreadsheets/d/NOVO_ID/edit"
     
-    # Atualizar no banco
-    session = db_manager.get_session()
-    try:
-        jonnattan.link_empresa = novo_link
-        session.commit()
+    # Atualizar no banco (os clientes retornados pelo CRUD são somente leitura)
+    if cliente_crud.update_cliente(jonnattan.id, link_empresa=novo_link):
         print(f"✅ Link atualizado com sucesso!")
         print(f"🔗 Novo link: {novo_link}")
         return True
-    except Exception as e:
-        print(f"❌ Erro ao atualizar: {e}")
-        session.rollback()
-        return False
-    finally:
-        session.close()
+    print(f"❌ Erro ao atualizar o link")
+    return False
     """
     
     return False